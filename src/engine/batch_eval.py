@@ -0,0 +1,154 @@
+"""Vectorized evaluation of many positions at once (needs NumPy, which the server doesn't).
+
+Positions are encoded as an (N, 64) uint8 array of fen.PIECE_CODES nibbles (0 = empty,
+square = row*8+col) plus an (N,) bool array that is True where black is to move. Scores are
+the same integers evaluation.evaluate() returns for each position, side to move's view.
+
+Score a FEN/EPD file (one position per line) and save the scores:
+    python -m src.engine.batch_eval positions.epd --out scores.npy
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .evaluation import DOUBLED_PAWN, EG_TABLE, ISOLATED_PAWN, MAX_PHASE, MG_TABLE, PHASE
+from .fen import PACKED_SIZE, PIECE_CODES
+
+#value + PST per nibble code and square (unused codes stay zero)
+MG_BY_CODE = np.zeros((15, 64), dtype=np.int64)
+EG_BY_CODE = np.zeros((15, 64), dtype=np.int64)
+PHASE_BY_CODE = np.zeros(15, dtype=np.int64)
+for _piece, _code in PIECE_CODES.items():
+    MG_BY_CODE[_code] = MG_TABLE[_piece]
+    EG_BY_CODE[_code] = EG_TABLE[_piece]
+    PHASE_BY_CODE[_code] = PHASE[_piece]
+
+#plane order for to_planes: white P N B R Q K, then black
+PLANE_CODES = np.array([PIECE_CODES[c + k] for c in "wb" for k in "PNBRQK"], dtype=np.uint8)
+
+_SQUARES = np.arange(64)
+_BOARD_CODES = {**PIECE_CODES, "--": 0}
+#FEN placement characters (digits expanded to runs of "1") -> nibble codes
+_FEN_CODES = bytes.maketrans(b"1PNBRQKpnbrqk", bytes([0, 1, 2, 3, 4, 5, 6, 9, 10, 11, 12, 13, 14]))
+#anything left after deleting these wasn't a piece letter
+_CODE_BYTES = bytes(range(15))
+
+Encoded = Tuple[np.ndarray, np.ndarray]
+
+
+def encode_boards(boards: Iterable) -> Encoded:
+    """Boards (either backend) -> (codes, black)."""
+    codes, black = bytearray(), []
+    for board_obj in boards:
+        codes += bytes(_BOARD_CODES[piece] for row in board_obj.board for piece in row)
+        black.append(board_obj.color == "b")
+    return np.frombuffer(bytes(codes), dtype=np.uint8).reshape(-1, 64), np.array(black, dtype=bool)
+
+
+def encode_fens(fens: Iterable[str]) -> Encoded:
+    """FEN/EPD strings -> (codes, black). Only placement and side to move are read."""
+    codes, black = bytearray(), []
+    for fen in fens:
+        fields = fen.split()
+        placement = fields[0].replace("/", "")
+        for digit in "2345678":
+            placement = placement.replace(digit, "1" * int(digit))
+        row = placement.encode().translate(_FEN_CODES)
+        if len(row) != 64 or row.translate(None, _CODE_BYTES):
+            raise ValueError(f"invalid FEN placement: {fields[0]!r}")
+        codes += row
+        black.append(len(fields) > 1 and fields[1] == "b")
+    return np.frombuffer(bytes(codes), dtype=np.uint8).reshape(-1, 64), np.array(black, dtype=bool)
+
+
+def encode_packed(blobs: Iterable[bytes]) -> Encoded:
+    """Packed positions (fen.pack, e.g. stored game snapshots) -> (codes, black), without a
+    Python loop per position."""
+    data = np.frombuffer(b"".join(blobs), dtype=np.uint8)
+    if data.size % PACKED_SIZE:
+        raise ValueError(f"packed positions must be {PACKED_SIZE} bytes each")
+    data = data.reshape(-1, PACKED_SIZE)
+    # big-endian occupancy: the last byte holds squares 0-7
+    occupied = np.unpackbits(data[:, 7::-1], axis=1, bitorder="little").astype(bool)
+    nibbles = np.empty((len(data), 32), dtype=np.uint8)
+    nibbles[:, 0::2] = data[:, 8:24] >> 4
+    nibbles[:, 1::2] = data[:, 8:24] & 15
+    # the k-th occupied square takes the k-th nibble
+    slot = np.clip(np.cumsum(occupied, axis=1) - 1, 0, 31)
+    codes = np.where(occupied, np.take_along_axis(nibbles, slot, axis=1), 0).astype(np.uint8)
+    return codes, (data[:, 24] & 1).astype(bool)
+
+
+def to_planes(codes: np.ndarray) -> np.ndarray:
+    """(N, 64) codes -> (N, 12, 64) one-hot planes in PLANE_CODES order, for tuning features."""
+    return (codes[:, None, :] == PLANE_CODES[None, :, None]).astype(np.uint8)
+
+
+def pawn_structure(files: np.ndarray) -> np.ndarray:
+    """evaluation.pawn_structure for an (N, 8) array of pawn counts per file."""
+    doubled = np.maximum(files - 1, 0).sum(axis=1) * DOUBLED_PAWN
+    padded = np.pad(files, ((0, 0), (1, 1)))
+    isolated = (padded[:, :-2] == 0) & (padded[:, 2:] == 0)
+    return doubled + (files * isolated).sum(axis=1) * ISOLATED_PAWN
+
+
+def evaluate_batch(codes: np.ndarray, black: np.ndarray) -> np.ndarray:
+    """evaluate() for every row of `codes`, as an int64 array."""
+    mg = MG_BY_CODE[codes, _SQUARES].sum(axis=1)
+    eg = EG_BY_CODE[codes, _SQUARES].sum(axis=1)
+    phase = np.minimum(PHASE_BY_CODE[codes].sum(axis=1), MAX_PHASE)
+    # numpy's // floors like Python's, so negative scores round the same way
+    score = (mg * phase + eg * (MAX_PHASE - phase)) // MAX_PHASE
+    by_col = codes.reshape(-1, 8, 8)
+    white_files = (by_col == PIECE_CODES["wP"]).sum(axis=1)
+    black_files = (by_col == PIECE_CODES["bP"]).sum(axis=1)
+    score += pawn_structure(white_files) - pawn_structure(black_files)
+    return np.where(black, -score, score)
+
+
+def evaluate_fens(fens: Iterable[str], batch_size: int = 65536) -> Iterator[np.ndarray]:
+    """Scores for a stream of FENs, one array per batch, so memory stays bounded."""
+    batch: List[str] = []
+    for fen in fens:
+        batch.append(fen)
+        if len(batch) == batch_size:
+            yield evaluate_batch(*encode_fens(batch))
+            batch = []
+    if batch:
+        yield evaluate_batch(*encode_fens(batch))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Score positions with the static evaluator, vectorized")
+    parser.add_argument("path", help="FEN/EPD file, one position per line, or - for stdin")
+    parser.add_argument("--out", help="save the scores as a .npy array")
+    parser.add_argument("--batch-size", type=int, default=65536)
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8")
+    start = time.perf_counter()
+    try:
+        lines = (line.split(";")[0] for line in source if line.strip() and not line.startswith("#"))
+        scores = list(evaluate_fens(lines, args.batch_size))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    scores = np.concatenate(scores) if scores else np.zeros(0, dtype=np.int64)
+    seconds = time.perf_counter() - start
+    if args.out:
+        np.save(args.out, scores)
+    print(json.dumps({
+        "positions": int(scores.size),
+        "seconds": round(seconds, 4),
+        "positions_per_sec": int(scores.size / seconds) if seconds > 0 else None,
+        "mean": round(float(scores.mean()), 2) if scores.size else None,
+    }))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
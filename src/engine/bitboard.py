@@ -0,0 +1,102 @@
+from typing import List, Tuple
+
+#squares are numbered row*8 + col, so bit 0 is a8 and bit 63 is h1 (same orientation as Chess_Board.board)
+
+PIECES = ["wP", "wN", "wB", "wR", "wQ", "wK", "bP", "bN", "bB", "bR", "bQ", "bK"]
+
+KNIGHT_MOVES = [(1,2), (1,-2), (2,1), (2,-1), (-1,2), (-1,-2), (-2,1), (-2,-1)]
+KING_MOVES = [(1,0), (0,1), (-1,0), (0,-1), (1,1), (1,-1), (-1,1), (-1,-1)]
+ROOK_DIRECTIONS = [(1,0), (0,1), (-1,0), (0,-1)]
+BISHOP_DIRECTIONS = [(1,1), (1,-1), (-1,1), (-1,-1)]
+
+
+def _leaper_table(offsets: List[Tuple[int, int]]) -> List[int]:
+    table = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        mask = 0
+        for dr, dc in offsets:
+            r, c = row + dr, col + dc
+            if 0 <= r < 8 and 0 <= c < 8:
+                mask |= 1 << (r * 8 + c)
+        table.append(mask)
+    return table
+
+
+def _ray_table(dr: int, dc: int) -> List[int]:
+    table = []
+    for sq in range(64):
+        r, c = divmod(sq, 8)
+        r, c = r + dr, c + dc
+        mask = 0
+        while 0 <= r < 8 and 0 <= c < 8:
+            mask |= 1 << (r * 8 + c)
+            r, c = r + dr, c + dc
+        table.append(mask)
+    return table
+
+
+def _between_table() -> List[List[int]]:
+    # BETWEEN[a][b]: squares strictly between a and b when they share a rank, file or diagonal, else 0
+    table = [[0] * 64 for _ in range(64)]
+    for sq in range(64):
+        for dr, dc in ROOK_DIRECTIONS + BISHOP_DIRECTIONS:
+            r, c = divmod(sq, 8)
+            r, c = r + dr, c + dc
+            mask = 0
+            while 0 <= r < 8 and 0 <= c < 8:
+                table[sq][r * 8 + c] = mask
+                mask |= 1 << (r * 8 + c)
+                r, c = r + dr, c + dc
+    return table
+
+
+KNIGHT_ATTACKS = _leaper_table(KNIGHT_MOVES)
+KING_ATTACKS = _leaper_table(KING_MOVES)
+#squares a pawn of the given color attacks from each square (white moves towards row 0)
+PAWN_ATTACKS = {"w": _leaper_table([(-1,1), (-1,-1)]), "b": _leaper_table([(1,1), (1,-1)])}
+
+BETWEEN = _between_table()
+ALL_SQUARES = (1 << 64) - 1
+
+#RANK_MASKS[row] has every square of that row set
+RANK_MASKS = [0xFF << (8 * row) for row in range(8)]
+
+RAYS = {(dr, dc): _ray_table(dr, dc) for dr, dc in ROOK_DIRECTIONS + BISHOP_DIRECTIONS}
+#a ray is "positive" when it walks towards higher square numbers; the nearest blocker is then the lowest set bit
+_ROOK_RAYS = [(RAYS[d], d[0] > 0 or (d[0] == 0 and d[1] > 0)) for d in ROOK_DIRECTIONS]
+_BISHOP_RAYS = [(RAYS[d], d[0] > 0) for d in BISHOP_DIRECTIONS]
+
+
+def _slide(sq: int, occupied: int, rays) -> int:
+    attacks = 0
+    for table, positive in rays:
+        ray = table[sq]
+        blockers = ray & occupied
+        if blockers:
+            if positive:
+                first = (blockers & -blockers).bit_length() - 1
+            else:
+                first = blockers.bit_length() - 1
+            ray ^= table[first]
+        attacks |= ray
+    return attacks
+
+
+def rook_attacks(sq: int, occupied: int) -> int:
+    return _slide(sq, occupied, _ROOK_RAYS)
+
+
+def bishop_attacks(sq: int, occupied: int) -> int:
+    return _slide(sq, occupied, _BISHOP_RAYS)
+
+
+def squares(bb: int) -> List[Tuple[int, int]]:
+    """Return the (row, col) of every set bit, lowest square first."""
+    out = []
+    while bb:
+        low = bb & -bb
+        sq = low.bit_length() - 1
+        out.append((sq >> 3, sq & 7))
+        bb ^= low
+    return out
@@ -0,0 +1,270 @@
+from typing import Dict, List, Optional, Tuple
+from .chess_board import Chess_Board
+from .bitboard import (PIECES, KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, BETWEEN, ALL_SQUARES,
+                       RANK_MASKS, rook_attacks, bishop_attacks)
+
+#(king square or None, checkers mask, evasions mask, {pinned square: allowed mask})
+Check_Info = Tuple[Optional[int], int, int, Dict[int, int]]
+#castling: (has_moved rook key, squares that must be empty, squares the king crosses, king target), per color
+CASTLES = {
+    color: [("R2", (1 << row * 8 + 5) | (1 << row * 8 + 6), (row * 8 + 5, row * 8 + 6), row * 8 + 6),
+            ("R1", (1 << row * 8 + 1) | (1 << row * 8 + 2) | (1 << row * 8 + 3), (row * 8 + 3, row * 8 + 2), row * 8 + 2)]
+    for color, row in (("w", 7), ("b", 0))
+}
+
+
+class Bitboard_Board(Chess_Board):
+    """Chess_Board that also keeps one 64-bit int per piece plus occupancy masks.
+
+    The 8x8 `board` list is still maintained so the GUI/server can read it unchanged, but
+    legal move generation (check_info, legal_moves) works from the masks alone; Legality
+    hands positions of this backend to it.
+    """
+    backend = "bitboard"
+
+    def __init__(self):
+        super().__init__()
+        self.sync_bitboards()
+
+    def sync_bitboards(self) -> None:
+        """Rebuild every bitboard from the 8x8 board."""
+        self.pieces: Dict[str, int] = {piece: 0 for piece in PIECES}
+        self.occupancy: Dict[str, int] = {"w": 0, "b": 0}
+        for row in range(8):
+            for col in range(8):
+                piece = self.board[row][col]
+                if piece != "--":
+                    bit = 1 << (row * 8 + col)
+                    self.pieces[piece] |= bit
+                    self.occupancy[piece[0]] |= bit
+        self.occupied = self.occupancy["w"] | self.occupancy["b"]
+
+    def reset_board(self):
+        super().reset_board()
+        self.sync_bitboards()
+        return self.board
+
+    def set_square(self, row: int, col: int, piece: str) -> None:
+        bit = 1 << (row * 8 + col)
+        old = self.board[row][col]
+        if old != "--":
+            self.pieces[old] ^= bit
+            self.occupancy[old[0]] ^= bit
+            self.occupied ^= bit
+        if piece != "--":
+            self.pieces[piece] |= bit
+            self.occupancy[piece[0]] |= bit
+            self.occupied |= bit
+        super().set_square(row, col, piece)
+
+    def king_square(self, color: str) -> Optional[int]:
+        king = self.pieces[color + "K"]
+        return king.bit_length() - 1 if king else None
+
+    def is_attacked(self, color: str, sq: int, occupied: Optional[int] = None) -> bool:
+        """True if square `sq` is attacked by the opponent of `color`, optionally as if the
+        board had the given `occupied` mask (for a king stepping off its square)."""
+        enemy = "w" if color == "b" else "b"
+        pieces = self.pieces
+        if KNIGHT_ATTACKS[sq] & pieces[enemy + "N"]:
+            return True
+        if KING_ATTACKS[sq] & pieces[enemy + "K"]:
+            return True
+        # an enemy pawn attacks sq exactly when our pawn on sq would attack it
+        if PAWN_ATTACKS[color][sq] & pieces[enemy + "P"]:
+            return True
+        if occupied is None:
+            occupied = self.occupied
+        queens = pieces[enemy + "Q"]
+        rooks = pieces[enemy + "R"] | queens
+        if rooks and rook_attacks(sq, occupied) & rooks:
+            return True
+        bishops = pieces[enemy + "B"] | queens
+        if bishops and bishop_attacks(sq, occupied) & bishops:
+            return True
+        return False
+
+    def attackers(self, color: str, sq: int, occupied: int) -> int:
+        """Mask of the opponent's pieces attacking `sq` when the board has `occupied`."""
+        enemy = "w" if color == "b" else "b"
+        pieces = self.pieces
+        queens = pieces[enemy + "Q"]
+        return (KNIGHT_ATTACKS[sq] & pieces[enemy + "N"]
+                | KING_ATTACKS[sq] & pieces[enemy + "K"]
+                | PAWN_ATTACKS[color][sq] & pieces[enemy + "P"]
+                | rook_attacks(sq, occupied) & (pieces[enemy + "R"] | queens)
+                | bishop_attacks(sq, occupied) & (pieces[enemy + "B"] | queens))
+
+    def check_info(self, color: str) -> Check_Info:
+        """What restricts `color`'s moves, as masks: (king square, checkers, evasions, pins).
+        evasions is where a non-king piece may go (every square when not in check, the checker
+        and the squares between for a single check, none for a double check); pins maps each
+        pinned piece's square to its pin ray, pinner included.
+        """
+        king = self.king_square(color)
+        if king is None:
+            return None, 0, ALL_SQUARES, {}
+        enemy = "w" if color == "b" else "b"
+        pieces = self.pieces
+        own = self.occupancy[color]
+        occupied = self.occupied
+        checkers = self.attackers(color, king, occupied)
+        if not checkers:
+            evasions = ALL_SQUARES
+        elif checkers & (checkers - 1):
+            evasions = 0
+        else:
+            evasions = checkers | BETWEEN[king][checkers.bit_length() - 1]
+        pins = {}
+        queens = pieces[enemy + "Q"]
+        for attacks, sliders in ((rook_attacks, pieces[enemy + "R"] | queens),
+                                 (bishop_attacks, pieces[enemy + "B"] | queens)):
+            if not sliders:
+                continue
+            # sliders that see the king once our nearest pieces on its lines are lifted off are pinners
+            near = attacks(king, occupied)
+            pinners = attacks(king, occupied ^ (near & own)) & ~near & sliders
+            while pinners:
+                low = pinners & -pinners
+                ray = BETWEEN[king][low.bit_length() - 1]
+                pins[(ray & own).bit_length() - 1] = ray | low
+                pinners ^= low
+        return king, checkers, evasions, pins
+
+    def piece_targets(self, row: int, col: int) -> int:
+        """Pseudo-legal destination mask for the piece on (row, col), castling excluded."""
+        piece = self.board[row][col]
+        return self.targets(piece[1], piece[0], row * 8 + col)
+
+    def targets(self, kind: str, color: str, sq: int) -> int:
+        own = self.occupancy[color]
+        if kind == "N":
+            return KNIGHT_ATTACKS[sq] & ~own
+        if kind == "K":
+            return KING_ATTACKS[sq] & ~own
+        if kind == "B":
+            return bishop_attacks(sq, self.occupied) & ~own
+        if kind == "R":
+            return rook_attacks(sq, self.occupied) & ~own
+        if kind == "Q":
+            return (rook_attacks(sq, self.occupied) | bishop_attacks(sq, self.occupied)) & ~own
+        return self.pawn_targets(sq >> 3, sq & 7, color)
+
+    def pawn_targets(self, row: int, col: int, color: str) -> int:
+        sq = row * 8 + col
+        enemy = "w" if color == "b" else "b"
+        empty = ~self.occupied
+        targets = 0
+        if color == "w":
+            one = (1 << (sq - 8)) & empty if row > 0 else 0
+            if one:
+                targets |= one
+                if row == 6:
+                    targets |= (1 << (sq - 16)) & empty
+        else:
+            one = (1 << (sq + 8)) & empty if row < 7 else 0
+            if one:
+                targets |= one
+                if row == 1:
+                    targets |= (1 << (sq + 16)) & empty
+        attacks = PAWN_ATTACKS[color][sq]
+        targets |= attacks & self.occupancy[enemy]
+        ep = self.en_passant_target
+        if ep:
+            ep_sq = ep[0] * 8 + ep[1]
+            # the double-pushed pawn sits beside us on our own row
+            if attacks & (1 << ep_sq) & empty and self.board[row][ep[1]] == enemy + "P":
+                targets |= 1 << ep_sq
+        return targets
+
+    #legal move generation straight from the masks; Legality hands bitboard positions to these
+    def king_targets(self, color: str, sq: int) -> int:
+        """Legal king destinations, castles included."""
+        # test steps with the king lifted off, so a slider can't "hide" behind it
+        occupied = self.occupied ^ (1 << sq)
+        steps = KING_ATTACKS[sq] & ~self.occupancy[color]
+        targets = 0
+        while steps:
+            low = steps & -steps
+            if not self.is_attacked(color, low.bit_length() - 1, occupied):
+                targets |= low
+            steps ^= low
+        has_moved = self.has_moved
+        if has_moved[color + "K"] == 0 and not self.is_attacked(color, sq):
+            for rook, empty, path, target in CASTLES[color]:
+                if has_moved[color + rook] == 0 and not self.occupied & empty and \
+                        not any(self.is_attacked(color, step) for step in path):
+                    targets |= 1 << target
+        return targets
+
+    def legal_targets(self, sq: int, info: Check_Info) -> int:
+        """Legal destination mask for the piece on `sq`, given check_info() for its side."""
+        piece = self.board[sq >> 3][sq & 7]
+        kind, color = piece[1], piece[0]
+        king, checkers, evasions, pins = info
+        if kind == "K":
+            return self.king_targets(color, sq)
+        targets = self.targets(kind, color, sq)
+        if king is None:
+            return targets
+        ep = self.en_passant_target
+        ep_bit = targets & (1 << (ep[0] * 8 + ep[1])) if kind == "P" and ep else 0
+        targets &= evasions & pins.get(sq, ALL_SQUARES) & ~ep_bit
+        if ep_bit and self.en_passant_is_legal(color, sq, king):
+            targets |= ep_bit
+        return targets
+
+    def en_passant_is_legal(self, color: str, sq: int, king: int) -> bool:
+        # en passant takes two pieces off one rank, so replay the occupancy and look again
+        ep_sq = self.en_passant_target[0] * 8 + self.en_passant_target[1]
+        captured = 1 << (ep_sq + 8 if color == "w" else ep_sq - 8)
+        occupied = (self.occupied ^ (1 << sq) ^ captured) | (1 << ep_sq)
+        return not self.attackers(color, king, occupied) & ~captured
+
+    def legal_moves(self, color: str, captures_only: bool = False) -> List[Tuple[int, int, int, int]]:
+        """Every legal (row, col, new_row, new_col) for `color`; with `captures_only`, just
+        captures (en passant included) and promotions."""
+        info = self.check_info(color)
+        king, checkers, _, _ = info
+        moves = []
+        enemy = self.occupancy["b" if color == "w" else "w"]
+        for kind in ("P", "N", "B", "R", "Q", "K"):
+            if kind != "K" and checkers & (checkers - 1):
+                continue    # double check: only the king can move
+            mask = enemy
+            if kind == "P":
+                mask |= RANK_MASKS[0] | RANK_MASKS[7]
+                if self.en_passant_target:
+                    mask |= 1 << (self.en_passant_target[0] * 8 + self.en_passant_target[1])
+            bb = self.pieces[color + kind]
+            while bb:
+                low = bb & -bb
+                sq = low.bit_length() - 1
+                bb ^= low
+                targets = self.legal_targets(sq, info)
+                if captures_only:
+                    targets &= mask
+                row, col = sq >> 3, sq & 7
+                while targets:
+                    t = targets & -targets
+                    target = t.bit_length() - 1
+                    moves.append((row, col, target >> 3, target & 7))
+                    targets ^= t
+        return moves
+
+    def has_legal_move(self, color: str) -> bool:
+        info = self.check_info(color)
+        king, checkers, _, _ = info
+        # the king first: it is the piece most likely to have a move when the side is in trouble
+        if king is not None and self.king_targets(color, king):
+            return True
+        if checkers & (checkers - 1):
+            return False
+        for kind in ("P", "N", "B", "R", "Q"):
+            bb = self.pieces[color + kind]
+            while bb:
+                low = bb & -bb
+                if self.legal_targets(low.bit_length() - 1, info):
+                    return True
+                bb ^= low
+        return False
@@ -0,0 +1,238 @@
+"""Polyglot opening books.
+
+A book is a file of 16-byte big-endian entries (key u64, move u16, weight u16, learn u32)
+sorted by key. Opening_Book memory-maps it and binary-searches the keys, so lookups touch a
+handful of pages and every worker process shares the same page cache.
+
+Build a book from PGN and probe it:
+    python -m src.engine.book build games.pgn book.bin --max-ply 20
+    python -m src.engine.book probe book.bin --fen "<fen>"
+"""
+import argparse
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .chess_board import create_board
+from .fen import START_FEN
+from .legality import Legality
+from .notation import move_name, parse_san
+from .polyglot_random import RANDOM64
+from .zobrist import castle_rights
+
+ENTRY = struct.Struct(">QHHI")
+ENTRY_SIZE = ENTRY.size
+_KEY = struct.Struct(">Q")
+
+#polyglot piece order: black pawn 0, white pawn 1, black knight 2, ... white king 11
+_KIND_INDEX = {kind: i for i, kind in enumerate("PNBRQK")}
+_PIECE_OFFSET = {color + kind: 64 * (2 * i + (color == "w")) for kind, i in _KIND_INDEX.items() for color in "wb"}
+_CASTLE_OFFSET = 768
+_EP_OFFSET = 772
+_TURN_OFFSET = 780
+#our castling bits (K=1, Q=2, k=4, q=8) line up with polyglot's castle keys 0..3
+_CASTLE_BITS = (1, 2, 4, 8)
+_PROMOTIONS = {1: "N", 2: "B", 3: "R", 4: "Q"}
+_PROMOTION_CODES = {piece: code for code, piece in _PROMOTIONS.items()}
+
+#book path for Engine; empty means no book
+BOOK_PATH = os.getenv("CHESS_BOOK", "")
+
+Move = Tuple[int, int, int, int, Optional[str]]
+
+
+def polyglot_key(board_obj) -> int:
+    """Polyglot hash of the position (different keys from zobrist.py, which stay engine-internal)."""
+    key = 0
+    for row in range(8):
+        for col in range(8):
+            piece = board_obj.board[row][col]
+            if piece != "--":
+                # polyglot squares count from a1, rows from rank 1
+                key ^= RANDOM64[_PIECE_OFFSET[piece] + 8 * (7 - row) + col]
+    rights = castle_rights(board_obj.has_moved)
+    for i, bit in enumerate(_CASTLE_BITS):
+        if rights & bit:
+            key ^= RANDOM64[_CASTLE_OFFSET + i]
+    ep = board_obj.en_passant_target
+    if ep is not None:
+        # only hashed when a pawn of the side to move stands ready to take
+        color = board_obj.color
+        pawn_row = ep[0] + 1 if color == "w" else ep[0] - 1
+        for col in (ep[1] - 1, ep[1] + 1):
+            if 0 <= col < 8 and board_obj.board[pawn_row][col] == color + "P":
+                key ^= RANDOM64[_EP_OFFSET + ep[1]]
+                break
+    if board_obj.color == "w":
+        key ^= RANDOM64[_TURN_OFFSET]
+    return key
+
+
+def decode_move(board_obj, code: int) -> Move:
+    """Polyglot move word -> (row, col, new_row, new_col, promotion) on this board."""
+    nc, nr = code & 7, 7 - (code >> 3 & 7)
+    c, r = code >> 6 & 7, 7 - (code >> 9 & 7)
+    promotion = _PROMOTIONS.get(code >> 12 & 7)
+    # castling is stored as the king taking its own rook
+    if board_obj.board[r][c][1] == "K" and board_obj.board[nr][nc] == board_obj.board[r][c][0] + "R":
+        nc = 6 if nc > c else 2
+    return r, c, nr, nc, promotion
+
+
+def encode_move(board_obj, move: Move) -> int:
+    r, c, nr, nc = move[:4]
+    promotion = move[4] if len(move) > 4 else None
+    if board_obj.board[r][c][1] == "K" and abs(nc - c) == 2:
+        nc = 7 if nc > c else 0
+    return nc | (7 - nr) << 3 | c << 6 | (7 - r) << 9 | _PROMOTION_CODES.get(promotion, 0) << 12
+
+
+class Opening_Book:
+    """Read-only view of a Polyglot book file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self.count = size // ENTRY_SIZE
+            # an empty file can't be mapped
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.count else b""
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _first(self, key: int) -> int:
+        # lower bound: index of the first entry with entry.key >= key
+        lo, hi = 0, self.count
+        data = self.data
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _KEY.unpack_from(data, mid * ENTRY_SIZE)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def entries(self, board_obj) -> List[Tuple[Move, int]]:
+        """(move, weight) for every book move in this position, in file order."""
+        key = polyglot_key(board_obj)
+        found = []
+        i = self._first(key)
+        while i < self.count:
+            entry_key, code, weight, _ = ENTRY.unpack_from(self.data, i * ENTRY_SIZE)
+            if entry_key != key:
+                break
+            found.append((decode_move(board_obj, code), weight))
+            i += 1
+        return found
+
+    def pick(self, board_obj, legality: Legality, rng: Optional[random.Random] = None) -> Optional[Move]:
+        """A legal book move chosen with probability proportional to its weight, or None."""
+        choices = []
+        for move, weight in self.entries(board_obj):
+            r, c, nr, nc, promotion = move
+            piece = board_obj.board[r][c]
+            if piece == "--" or piece[0] != board_obj.color or (nr, nc) not in legality.filter_move(r, c):
+                continue    # key collision or a broken book
+            choices.append((move, weight))
+        if not choices:
+            return None
+        weights = [w for _, w in choices]
+        if not any(weights):
+            weights = [1] * len(choices)
+        return (rng or random).choices([m for m, _ in choices], weights)[0]
+
+    def close(self) -> None:
+        if self.count:
+            self.data.close()
+
+
+_shared_book = None
+
+
+def shared_book() -> Optional[Opening_Book]:
+    """Process-wide book from CHESS_BOOK, opened on first use; None when unset."""
+    global _shared_book
+    if _shared_book is None and BOOK_PATH:
+        _shared_book = Opening_Book(BOOK_PATH)
+    return _shared_book
+
+
+def build_book(lines: Iterable[str], out_path: str, max_ply: int = 20, min_games: int = 1) -> dict:
+    """Write a Polyglot book from the main lines of a PGN archive.
+
+    Each move played in the first `max_ply` plies scores 2 for a win by the side that played
+    it, 0 for a loss and 1 otherwise (draws, unfinished games); moves seen in fewer than
+    `min_games` games are dropped. A game with an unreadable move contributes nothing.
+    """
+    from .pgn import read_games, san_moves
+
+    board = create_board("bitboard")
+    legality = Legality(board)
+    scores: Dict[Tuple[int, int], List[int]] = {}   # (key, move code) -> [weight, games]
+    games = skipped = 0
+    for _, tags, movetext in read_games(lines):
+        moves, result = san_moves(movetext)
+        result = tags.get("Result", result)
+        seen = []
+        try:
+            board.load_fen(tags["FEN"] if "FEN" in tags else START_FEN)
+            for san in moves[:max_ply]:
+                move = parse_san(board, legality, san)
+                if result in ("1-0", "0-1"):
+                    points = 2 if result == ("1-0" if board.color == "w" else "0-1") else 0
+                else:
+                    points = 1
+                seen.append((polyglot_key(board), encode_move(board, move), points))
+                board.save_move(*move)
+        except ValueError:
+            skipped += 1
+            continue
+        games += 1
+        for key, code, points in seen:
+            slot = scores.setdefault((key, code), [0, 0])
+            slot[0] += points
+            slot[1] += 1
+
+    kept = [(key, code, weight) for (key, code), (weight, seen) in scores.items() if seen >= min_games]
+    # weights are u16; scale down together so relative preferences survive
+    top = max((w for _, _, w in kept), default=0)
+    scale = 65535 / top if top > 65535 else 1
+    kept.sort(key=lambda e: (e[0], -e[2]))
+    with open(out_path, "wb") as f:
+        for key, code, weight in kept:
+            f.write(ENTRY.pack(key, code, int(weight * scale), 0))
+    return {"games": games, "skipped": skipped, "entries": len(kept), "positions": len({k for k, _, _ in kept}),
+            "bytes": len(kept) * ENTRY_SIZE}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Polyglot opening books")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="build a book from a PGN archive")
+    build.add_argument("pgn")
+    build.add_argument("out")
+    build.add_argument("--max-ply", type=int, default=20)
+    build.add_argument("--min-games", type=int, default=1)
+    probe = sub.add_parser("probe", help="list the book moves for a position")
+    probe.add_argument("book")
+    probe.add_argument("--fen", default=START_FEN)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        with open(args.pgn, encoding="utf-8", errors="replace") as f:
+            print(json.dumps(build_book(f, args.out, args.max_ply, args.min_games), indent=2))
+        return 0
+    board = create_board().load_fen(args.fen)
+    book = Opening_Book(args.book)
+    moves = [{"move": move_name(m), "weight": w} for m, w in book.entries(board)]
+    print(json.dumps({"fen": args.fen, "key": f"{polyglot_key(board):016x}", "moves": moves}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
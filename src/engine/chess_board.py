@@ -1,9 +1,17 @@
-import copy
+import os
 from typing import Optional, List, Tuple, Dict, Any, Union
 from .make_unmake import Make_Unmake
 from .legality import Legality
+from . import zobrist
+from . import evaluation
+from . import fen
 
 class Chess_Board:
+    #position representation, used by Legality to pick a move generator
+    backend = "list"
+    #recompute the zobrist key from scratch after every make/undo and fail loudly on a mismatch
+    debug_zobrist = os.getenv("CHESS_DEBUG_ZOBRIST", "0") == "1"
+
     def __init__(self):
         #starting board
         self.board = [
@@ -17,16 +25,26 @@ class Chess_Board:
             ["wR","wN","wB","wQ","wK","wB","wN","wR"]
         ]
         self.color = "w"
-        #board history
+        #undo records of the moves played (see Make_Unmake.make_move)
         self.history = []
         # en passant target square (row, col) valid only for the immediate next move
         self.en_passant_target = None
+        #FEN move counters; clock_history holds the halfmove clock before each played move
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.clock_history = []
         
         #R1 is queen side rook
         #R2 is king side rook
         self.has_moved = {"bR1":0, "bR2":0, "bK":0,
                           "wR1":0, "wR2":0, "wK":0
                           }
+        #one mover per board; it reads the board live and hands back undo records
+        self.make_unmake = Make_Unmake(self)
+        #64-bit position key, kept up to date by set_square and Make_Unmake
+        self.zobrist_key = zobrist.compute_key(self)
+        #running material/PST totals for evaluation, also kept up to date by set_square
+        evaluation.init_eval(self)
     
     #print the chess board
     def __str__(self):
@@ -47,27 +65,105 @@ class Chess_Board:
         self.color = "w"
         self.history = []
         self.en_passant_target = None
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.clock_history = []
         self.has_moved = {"bR1":0, "bR2":0, "bK":0,
                         "wR1":0, "wR2":0, "wK":0}
+        self.zobrist_key = zobrist.compute_key(self)
+        evaluation.init_eval(self)
         return self.board
     
     
+    def set_square(self, row: int, col: int, piece: str) -> None:
+        """Place `piece` ("--" for empty) on a square. All board writes go through here."""
+        old = self.board[row][col]
+        if old != "--":
+            self.zobrist_key ^= zobrist.PIECE_KEYS[old][row * 8 + col]
+            evaluation.remove_piece(self, old, row, col)
+        if piece != "--":
+            self.zobrist_key ^= zobrist.PIECE_KEYS[piece][row * 8 + col]
+            evaluation.add_piece(self, piece, row, col)
+        self.board[row][col] = piece
+
+    def rehash(self) -> int:
+        """Recompute the zobrist key after editing color/has_moved/en_passant_target directly."""
+        self.zobrist_key = zobrist.compute_key(self)
+        return self.zobrist_key
+
+    def verify_zobrist(self) -> None:
+        expected = zobrist.compute_key(self)
+        if self.zobrist_key != expected:
+            raise RuntimeError(f"zobrist key drifted: incremental {self.zobrist_key:016x}, recomputed {expected:016x}")
+    
+    def load_position(self, position: fen.Position) -> "Chess_Board":
+        """Replace the whole game with (board rows, color, has_moved, en_passant_target,
+        halfmove, fullmove), as returned by fen.parse_fen / fen.unpack. History is cleared."""
+        rows, color, has_moved, en_passant_target, halfmove, fullmove = position
+        for row in range(8):
+            for col in range(8):
+                if self.board[row][col] != rows[row][col]:
+                    self.set_square(row, col, rows[row][col])
+        self.color = color
+        #update in place: Engine keeps a reference to this dict
+        self.has_moved.update(has_moved)
+        self.en_passant_target = en_passant_target
+        self.halfmove_clock = halfmove
+        self.fullmove_number = fullmove
+        self.history = []
+        self.clock_history = []
+        self.rehash()
+        return self
+
+    def load_fen(self, text: str) -> "Chess_Board":
+        return self.load_position(fen.parse_fen(text))
+
+    def to_fen(self) -> str:
+        return fen.to_fen(self)
+
+    def pack(self) -> bytes:
+        """Fixed-size binary position (fen.PACKED_SIZE bytes)."""
+        return fen.pack(self)
+
+    def load_packed(self, data: bytes) -> "Chess_Board":
+        return self.load_position(fen.unpack(data))
+
     def save_move(self, row: int, col: int, new_row: int, new_col: int, promotion: Optional[str] = None) -> List[List[str]]:
-        move = Make_Unmake(self)  # pass board object for full state access
-        (self.history).append((copy.deepcopy(self.board), copy.deepcopy(self.has_moved), self.color, self.en_passant_target))
-        self.board = move.make_move(row, col, new_row, new_col, promotion)
-        self.color = move.color
+        #pawn moves and captures (en passant lands on an empty square, but is a pawn move) reset the clock
+        self.clock_history.append(self.halfmove_clock)
+        if self.board[row][col][1] == "P" or self.board[new_row][new_col] != "--":
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if self.color == "b":
+            self.fullmove_number += 1
+        self.board = self.make_unmake.make_move(row, col, new_row, new_col, promotion)
+        self.color = self.make_unmake.color
+        (self.history).append(self.make_unmake.record)
+        if self.debug_zobrist:
+            self.verify_zobrist()
         return self.board
     
     def undo_move(self):
         if self.history:
-            last_board, last_has_moved, last_color, last_ep = self.history.pop()
-            self.board = last_board
-            self.has_moved = last_has_moved
-            self.color = last_color
-            self.en_passant_target = last_ep
+            self.make_unmake.unmake_move(self.history.pop())
+            self.halfmove_clock = self.clock_history.pop()
+            if self.color == "b":
+                self.fullmove_number -= 1
+            if self.debug_zobrist:
+                self.verify_zobrist()
         return self.board
     
+
+def create_board(backend: str = "list") -> Chess_Board:
+    """Return a new board using the requested position backend ("list" or "bitboard")."""
+    if backend == "list":
+        return Chess_Board()
+    if backend == "bitboard":
+        from .bitboard_board import Bitboard_Board
+        return Bitboard_Board()
+    raise ValueError(f"unknown board backend: {backend}")
+
 if __name__ == "__main__": 
     board = Chess_Board()
     legal = Legality(board)
@@ -48,4 +48,30 @@ class Chess_Utils:
             if 0 <= new_row < len(board) and 0 <= new_col < len(board[0]):
                 if  board[new_row][new_col] != "--" and board[new_row][new_col][0] != piece_color:
                     (valid_moves).append((new_row, new_col))
-        return valid_moves
\ No newline at end of file
+        return valid_moves
+    def capture_noSlide(board, piece_move, piece_color, row, col):
+        valid_moves = []
+        for i in range(len(piece_move)):
+            new_row = row+piece_move[i][0]
+            new_col = col+piece_move[i][1]
+            if 0 <= new_row < len(board) and 0 <= new_col < len(board[0]):
+                target = board[new_row][new_col]
+                if target != "--" and target[0] != piece_color:
+                    (valid_moves).append((new_row, new_col))
+        return valid_moves
+
+    def capture_slide(board, piece_move, piece_color, row, col):
+        # only the first piece met along each line can be taken
+        valid_moves = []
+        for i in range(len(piece_move)):
+            new_row = row+piece_move[i][0]
+            new_col = col+piece_move[i][1]
+            while 0 <= new_row < len(board) and 0 <= new_col < len(board[0]):
+                target = board[new_row][new_col]
+                if target != "--":
+                    if target[0] != piece_color:
+                        (valid_moves).append((new_row, new_col))
+                    break
+                new_row = new_row+piece_move[i][0]
+                new_col = new_col+piece_move[i][1]
+        return valid_moves
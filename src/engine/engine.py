@@ -1,16 +1,41 @@
+import time
 from typing import Optional, Tuple
 from .legality import Legality
 from .make_unmake import Make_Unmake
 from .chess_utils import Chess_Utils
 from .chess_board import Chess_Board
+from .search import Search
+from .notation import move_name, square_name
+from .book import Opening_Book, shared_book
+from .tablebase import Tablebase, shared_tablebase
 
 
 class Engine:
-    def __init__(self, board):
+    def __init__(self, board, book: Optional[Opening_Book] = None, tablebase: Optional[Tablebase] = None):
         self.board = board
+        # opening book consulted before searching; defaults to the CHESS_BOOK one
+        self.book = book
+        # endgame tables; defaults to the CHESS_TB_DIR ones
+        self.tablebase = tablebase or shared_tablebase()
         self.has_moved = board.has_moved
         self.legality = Legality(self.board)
         self.utils = Chess_Utils()
+        # created on first search; idle games don't carry move-ordering tables
+        self._searcher = None
+        # (zobrist key, move map) for the last position asked about
+        self._move_map = None
+        # (zobrist key, status) likewise for get_game_status
+        self._status = None
+
+    @property
+    def searcher(self) -> Search:
+        if self._searcher is None:
+            self._searcher = Search(self.board, self.legality, tablebase=self.tablebase)
+        return self._searcher
+
+    @property
+    def has_searcher(self) -> bool:
+        return self._searcher is not None
     
     def play_turn(self, row: int, col: int, new_row: int, new_col: int, promotion: Optional[str] = None) -> Tuple[bool, str]:
         legal_moves = self.legality.filter_move(row,col)
@@ -34,15 +59,97 @@ class Engine:
         """Return a tuple (status, info) where:
         - status is one of: 'in_progress', 'checkmate', 'stalemate'
         - info for checkmate is the winner color: 'w' or 'b'; otherwise None
+        Remembered per position, so asking again before the next move is free.
         """
+        cached = self.cached_game_status()
+        if cached is not None:
+            return cached
         color_to_move = self.board.color
-        if self.legality.is_checkmate(color_to_move):
-            winner = 'w' if color_to_move == 'b' else 'b'
-            return 'checkmate', winner
-        if self.legality.is_stalemate(color_to_move):
-            return 'stalemate', None
-        return 'in_progress', None
-        
+        hit = self.tablebase.probe(self.board) if self.tablebase is not None else None
+        if hit is not None and hit != (0, 0):
+            # a won or lost table position: only "lost in 0" is mate
+            status = ('checkmate', ('w' if color_to_move == 'b' else 'b')) if hit == (-1, 0) else ('in_progress', None)
+        elif self.legality.has_any_legal_move(color_to_move):
+            status = 'in_progress', None
+        elif self.legality.is_check(color_to_move):
+            status = 'checkmate', ('w' if color_to_move == 'b' else 'b')
+        else:
+            status = 'stalemate', None
+        self.remember_game_status(status)
+        return status
+
+    def cached_game_status(self):
+        """The status of the current position if already known, else None."""
+        if self._status is not None and self._status[0] == self.board.zobrist_key:
+            return self._status[1]
+        return None
+
+    def remember_game_status(self, status) -> None:
+        self._status = (self.board.zobrist_key, tuple(status))
+
+    def probe_tablebase(self) -> Optional[dict]:
+        """{"result": "win"/"draw"/"loss" for the side to move, "dtm": plies to mate} from the
+        endgame tables, or None when the position isn't covered."""
+        hit = self.tablebase.probe(self.board) if self.tablebase is not None else None
+        if hit is None:
+            return None
+        wdl, dtm = hit
+        return {"result": ("loss", "draw", "win")[wdl + 1], "dtm": dtm if wdl else None}
+
+    def get_legal_move_map(self) -> dict:
+        """Every legal move for the side to move, keyed by origin square name ("e2").
+
+        Each origin maps to {"from": [row, col], "targets": [...]}; a target has "to" [row, col],
+        "square", "flags" (capture, en_passant, castle, double_push, promotion) and, for
+        promotions, the "promotions" to choose from. Built once per position (zobrist key).
+        """
+        key = self.board.zobrist_key
+        if self._move_map is not None and self._move_map[0] == key:
+            return self._move_map[1]
+        board = self.board.board
+        move_map = {}
+        for r, c, nr, nc in self.legality.get_all_legal_moves_for_color(self.board.color):
+            kind = board[r][c][1]
+            flags = []
+            if board[nr][nc] != "--":
+                flags.append("capture")
+            elif kind == "P" and c != nc:
+                flags.extend(("capture", "en_passant"))
+            if kind == "K" and abs(nc - c) == 2:
+                flags.append("castle")
+            if kind == "P" and abs(nr - r) == 2:
+                flags.append("double_push")
+            target = {"to": [nr, nc], "square": square_name(nr, nc), "flags": flags}
+            if kind == "P" and (nr == 0 or nr == 7):
+                flags.append("promotion")
+                target["promotions"] = ["Q", "R", "B", "N"]
+            origin = square_name(r, c)
+            if origin not in move_map:
+                move_map[origin] = {"from": [r, c], "targets": []}
+            move_map[origin]["targets"].append(target)
+        self._move_map = (key, move_map)
+        return move_map
+
+    def search(self, depth: Optional[int] = None, movetime: Optional[float] = None, use_book: bool = True) -> dict:
+        """Pick a move for the side to move without playing it.
+        Returns best_move (row, col, new_row, new_col, promotion), score, pv and per-iteration stats.
+        A book move, when there is one, is returned straight away with "book" set. In a
+        tablebase position one ply is enough: every reply is scored exactly.
+        """
+        if use_book:
+            start = time.perf_counter()
+            book = self.book or shared_book()
+            move = book.pick(self.board, self.legality) if book is not None else None
+            if move is not None:
+                return {
+                    "best_move": move, "move": move_name(move), "score": 0, "depth": 0,
+                    "pv": [move_name(move)], "nodes": 0, "qnodes": 0, "nps": None,
+                    "time": round(time.perf_counter() - start, 4), "iterations": [], "book": True,
+                }
+        if self.tablebase is not None and self.tablebase.probe(self.board) is not None:
+            depth, movetime = 1, None
+        return self.searcher.search(depth=depth, movetime=movetime)
+
     def reset(self):
         """Reset the game to the initial state."""
         self.board.reset_board()
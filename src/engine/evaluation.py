@@ -0,0 +1,168 @@
+"""Tapered material + piece-square evaluation.
+
+Material and PST sums for the middlegame and endgame, the game phase and the pawn count per
+file are running totals on the board (Chess_Board.set_square calls add_piece/remove_piece),
+so evaluate() is O(1) apart from the pawn-structure term, which reads the 16 file counts.
+"""
+
+#centipawn values (checklist: queen=9, rook=5, bishop=3, knight=3, pawn=1)
+PIECE_VALUES = {"P": 100, "N": 320, "B": 330, "R": 500, "Q": 900, "K": 0}
+#pawns and rooks gain in the endgame, minor pieces lose a little
+EG_VALUES = {"P": 120, "N": 300, "B": 320, "R": 520, "Q": 920, "K": 0}
+
+#game phase: 24 with all pieces on, 0 with only kings and pawns
+PHASE_WEIGHTS = {"P": 0, "N": 1, "B": 1, "R": 2, "Q": 4, "K": 0}
+MAX_PHASE = 24
+
+DOUBLED_PAWN = -15      #per extra pawn on a file
+ISOLATED_PAWN = -12     #per pawn with no friendly pawn on a neighbouring file
+
+#piece-square tables from white's side, row 0 = rank 8 (same layout as Chess_Board.board)
+PAWN_MG = [
+      0,  0,  0,  0,  0,  0,  0,  0,
+     50, 50, 50, 50, 50, 50, 50, 50,
+     10, 10, 20, 30, 30, 20, 10, 10,
+      5,  5, 10, 25, 25, 10,  5,  5,
+      0,  0,  0, 20, 20,  0,  0,  0,
+      5, -5,-10,  0,  0,-10, -5,  5,
+      5, 10, 10,-20,-20, 10, 10,  5,
+      0,  0,  0,  0,  0,  0,  0,  0,
+]
+PAWN_EG = [
+      0,  0,  0,  0,  0,  0,  0,  0,
+     80, 80, 80, 80, 80, 80, 80, 80,
+     50, 50, 50, 50, 50, 50, 50, 50,
+     30, 30, 30, 30, 30, 30, 30, 30,
+     20, 20, 20, 20, 20, 20, 20, 20,
+     10, 10, 10, 10, 10, 10, 10, 10,
+      0,  0,  0,  0,  0,  0,  0,  0,
+      0,  0,  0,  0,  0,  0,  0,  0,
+]
+KNIGHT = [
+    -50,-40,-30,-30,-30,-30,-40,-50,
+    -40,-20,  0,  0,  0,  0,-20,-40,
+    -30,  0, 10, 15, 15, 10,  0,-30,
+    -30,  5, 15, 20, 20, 15,  5,-30,
+    -30,  0, 15, 20, 20, 15,  0,-30,
+    -30,  5, 10, 15, 15, 10,  5,-30,
+    -40,-20,  0,  5,  5,  0,-20,-40,
+    -50,-40,-30,-30,-30,-30,-40,-50,
+]
+BISHOP = [
+    -20,-10,-10,-10,-10,-10,-10,-20,
+    -10,  0,  0,  0,  0,  0,  0,-10,
+    -10,  0,  5, 10, 10,  5,  0,-10,
+    -10,  5,  5, 10, 10,  5,  5,-10,
+    -10,  0, 10, 10, 10, 10,  0,-10,
+    -10, 10, 10, 10, 10, 10, 10,-10,
+    -10,  5,  0,  0,  0,  0,  5,-10,
+    -20,-10,-10,-10,-10,-10,-10,-20,
+]
+ROOK = [
+      0,  0,  0,  0,  0,  0,  0,  0,
+      5, 10, 10, 10, 10, 10, 10,  5,
+     -5,  0,  0,  0,  0,  0,  0, -5,
+     -5,  0,  0,  0,  0,  0,  0, -5,
+     -5,  0,  0,  0,  0,  0,  0, -5,
+     -5,  0,  0,  0,  0,  0,  0, -5,
+     -5,  0,  0,  0,  0,  0,  0, -5,
+      0,  0,  0,  5,  5,  0,  0,  0,
+]
+QUEEN = [
+    -20,-10,-10, -5, -5,-10,-10,-20,
+    -10,  0,  0,  0,  0,  0,  0,-10,
+    -10,  0,  5,  5,  5,  5,  0,-10,
+     -5,  0,  5,  5,  5,  5,  0, -5,
+      0,  0,  5,  5,  5,  5,  0, -5,
+    -10,  5,  5,  5,  5,  5,  0,-10,
+    -10,  0,  5,  0,  0,  0,  0,-10,
+    -20,-10,-10, -5, -5,-10,-10,-20,
+]
+KING_MG = [
+    -30,-40,-40,-50,-50,-40,-40,-30,
+    -30,-40,-40,-50,-50,-40,-40,-30,
+    -30,-40,-40,-50,-50,-40,-40,-30,
+    -30,-40,-40,-50,-50,-40,-40,-30,
+    -20,-30,-30,-40,-40,-30,-30,-20,
+    -10,-20,-20,-20,-20,-20,-20,-10,
+     20, 20,  0,  0,  0,  0, 20, 20,
+     20, 30, 10,  0,  0, 10, 30, 20,
+]
+KING_EG = [
+    -50,-40,-30,-20,-20,-30,-40,-50,
+    -30,-20,-10,  0,  0,-10,-20,-30,
+    -30,-10, 20, 30, 30, 20,-10,-30,
+    -30,-10, 30, 40, 40, 30,-10,-30,
+    -30,-10, 30, 40, 40, 30,-10,-30,
+    -30,-10, 20, 30, 30, 20,-10,-30,
+    -30,-30,  0,  0,  0,  0,-30,-30,
+    -50,-30,-30,-30,-30,-30,-30,-50,
+]
+PST_MG = {"P": PAWN_MG, "N": KNIGHT, "B": BISHOP, "R": ROOK, "Q": QUEEN, "K": KING_MG}
+PST_EG = {"P": PAWN_EG, "N": KNIGHT, "B": BISHOP, "R": ROOK, "Q": QUEEN, "K": KING_EG}
+
+
+def _signed_tables(values, pst):
+    #value + PST per piece code and square, positive for white; black reads the table mirrored
+    tables = {}
+    for kind in "PNBRQK":
+        tables["w" + kind] = [values[kind] + pst[kind][sq] for sq in range(64)]
+        tables["b" + kind] = [-(values[kind] + pst[kind][sq ^ 56]) for sq in range(64)]
+    return tables
+
+
+MG_TABLE = _signed_tables(PIECE_VALUES, PST_MG)
+EG_TABLE = _signed_tables(EG_VALUES, PST_EG)
+PHASE = {color + kind: weight for kind, weight in PHASE_WEIGHTS.items() for color in "wb"}
+
+
+def add_piece(board_obj, piece: str, row: int, col: int) -> None:
+    sq = row * 8 + col
+    board_obj.eval_mg += MG_TABLE[piece][sq]
+    board_obj.eval_eg += EG_TABLE[piece][sq]
+    board_obj.phase += PHASE[piece]
+    if piece[1] == "P":
+        board_obj.pawn_files[piece[0]][col] += 1
+
+
+def remove_piece(board_obj, piece: str, row: int, col: int) -> None:
+    sq = row * 8 + col
+    board_obj.eval_mg -= MG_TABLE[piece][sq]
+    board_obj.eval_eg -= EG_TABLE[piece][sq]
+    board_obj.phase -= PHASE[piece]
+    if piece[1] == "P":
+        board_obj.pawn_files[piece[0]][col] -= 1
+
+
+def init_eval(board_obj) -> None:
+    """Rebuild the running totals from the 8x8 board."""
+    board_obj.eval_mg = 0
+    board_obj.eval_eg = 0
+    board_obj.phase = 0
+    board_obj.pawn_files = {"w": [0] * 8, "b": [0] * 8}
+    for row in range(8):
+        for col in range(8):
+            piece = board_obj.board[row][col]
+            if piece != "--":
+                add_piece(board_obj, piece, row, col)
+
+
+def pawn_structure(files) -> int:
+    """Doubled/isolated pawn score for one side's pawn count per file."""
+    score = 0
+    for col in range(8):
+        count = files[col]
+        if count:
+            if count > 1:
+                score += DOUBLED_PAWN * (count - 1)
+            if (col == 0 or not files[col - 1]) and (col == 7 or not files[col + 1]):
+                score += ISOLATED_PAWN * count
+    return score
+
+
+def evaluate(board_obj) -> int:
+    """Static score in centipawns from the point of view of the side to move."""
+    phase = min(board_obj.phase, MAX_PHASE)
+    score = (board_obj.eval_mg * phase + board_obj.eval_eg * (MAX_PHASE - phase)) // MAX_PHASE
+    score += pawn_structure(board_obj.pawn_files["w"]) - pawn_structure(board_obj.pawn_files["b"])
+    return score if board_obj.color == "w" else -score
@@ -0,0 +1,182 @@
+"""FEN and packed binary positions.
+
+The packed form is a fixed 30 bytes (PACKED_SIZE):
+  8  occupancy bitboard, bit row*8+col set for every occupied square
+  16 one nibble per occupied square in bitboard order (PIECE_CODES), zero-padded
+  1  bit 0 side to move (1 = black), bits 1-4 castling rights as in zobrist.castle_rights
+  1  en passant file + 1, 0 for none (the rank follows from the side to move)
+  2  halfmove clock
+  2  fullmove number
+"""
+import struct
+from typing import Dict, List, Optional, Tuple
+
+from .notation import FILES, square_name
+from .zobrist import castle_rights
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+PACKED_FORMAT = ">Q16sBBHH"
+PACKED_SIZE = struct.calcsize(PACKED_FORMAT)
+
+#nibble per piece; bit 3 is black
+PIECE_CODES = {"wP": 1, "wN": 2, "wB": 3, "wR": 4, "wQ": 5, "wK": 6,
+               "bP": 9, "bN": 10, "bB": 11, "bR": 12, "bQ": 13, "bK": 14}
+CODE_PIECES = {code: piece for piece, code in PIECE_CODES.items()}
+
+#castling bits (K=1, Q=2, k=4, q=8) and FEN letters, in FEN order
+CASTLE_LETTERS = (("K", 1), ("Q", 2), ("k", 4), ("q", 8))
+#castling bit -> the king and rook squares it needs
+CASTLE_HOMES = {1: ((7, 4, "wK"), (7, 7, "wR")), 2: ((7, 4, "wK"), (7, 0, "wR")),
+                4: ((0, 4, "bK"), (0, 7, "bR")), 8: ((0, 4, "bK"), (0, 0, "bR"))}
+
+Position = Tuple[List[List[str]], str, Dict[str, int], Optional[Tuple[int, int]], int, int]
+
+
+def has_moved_from_rights(rights: int) -> Dict[str, int]:
+    """has_moved flags for a 4-bit castling rights mask (inverse of zobrist.castle_rights)."""
+    has_moved = {}
+    for color, king_side, queen_side in (("w", 1, 2), ("b", 4, 8)):
+        has_moved[color + "R2"] = 0 if rights & king_side else 1
+        has_moved[color + "R1"] = 0 if rights & queen_side else 1
+        has_moved[color + "K"] = 0 if rights & (king_side | queen_side) else 1
+    return has_moved
+
+
+def check_placement(rows: List[List[str]]) -> None:
+    """Raise ValueError unless the board has at most 32 pieces and one king per side."""
+    pieces = [piece for row in rows for piece in row if piece != "--"]
+    if len(pieces) > 32:
+        raise ValueError(f"invalid position: {len(pieces)} pieces (at most 32)")
+    for king in ("wK", "bK"):
+        if pieces.count(king) != 1:
+            raise ValueError(f"invalid position: expected one {king}, found {pieces.count(king)}")
+
+
+def home_rights(rows: List[List[str]], rights: int) -> int:
+    """`rights` without the castlings whose king or rook is off its home square."""
+    for bit, homes in CASTLE_HOMES.items():
+        if rights & bit and any(rows[row][col] != piece for row, col, piece in homes):
+            rights &= ~bit
+    return rights
+
+
+def parse_fen(fen: str) -> Position:
+    """FEN -> (board rows, color, has_moved, en_passant_target, halfmove, fullmove).
+    Missing trailing fields default to "w - - 0 1"; malformed input or an impossible position
+    (see check_placement) raises ValueError. Castling rights without their king and rook are dropped.
+    """
+    fields = fen.split()
+    if not fields or len(fields) > 6:
+        raise ValueError(f"invalid FEN: {fen!r}")
+    fields += ["w", "-", "-", "0", "1"][len(fields) - 1:]
+    placement, color, castling, ep, halfmove, fullmove = fields
+
+    ranks = placement.split("/")
+    if len(ranks) != 8:
+        raise ValueError(f"invalid FEN placement (expected 8 ranks): {placement!r}")
+    rows = []
+    for rank in ranks:
+        row = []
+        for ch in rank:
+            if ch in "12345678":
+                row.extend(["--"] * int(ch))
+            elif ch.upper() in "PNBRQK":
+                row.append(("w" if ch.isupper() else "b") + ch.upper())
+            else:
+                raise ValueError(f"invalid FEN piece {ch!r}")
+        if len(row) != 8:
+            raise ValueError(f"invalid FEN rank (expected 8 squares): {rank!r}")
+        rows.append(row)
+
+    if color not in ("w", "b"):
+        raise ValueError(f"invalid FEN side to move: {color!r}")
+    rights = 0
+    if castling != "-":
+        for ch in castling:
+            bit = dict(CASTLE_LETTERS).get(ch)
+            if bit is None:
+                raise ValueError(f"invalid FEN castling field: {castling!r}")
+            rights |= bit
+    if ep == "-":
+        ep_target = None
+    elif len(ep) == 2 and ep[0] in FILES and ep[1] == ("6" if color == "w" else "3"):
+        # behind the pawn the side not to move just pushed two squares
+        ep_target = (8 - int(ep[1]), FILES.index(ep[0]))
+    else:
+        raise ValueError(f"invalid FEN en passant square: {ep!r}")
+    try:
+        halfmove, fullmove = int(halfmove), int(fullmove)
+    except ValueError:
+        raise ValueError(f"invalid FEN move counters: {halfmove!r} {fullmove!r}") from None
+    if halfmove < 0 or fullmove < 1:
+        raise ValueError(f"invalid FEN move counters: {halfmove} {fullmove}")
+    check_placement(rows)
+    return rows, color, has_moved_from_rights(home_rights(rows, rights)), ep_target, halfmove, fullmove
+
+
+def to_fen(board_obj) -> str:
+    ranks = []
+    for row in board_obj.board:
+        rank, empty = "", 0
+        for piece in row:
+            if piece == "--":
+                empty += 1
+                continue
+            if empty:
+                rank += str(empty)
+                empty = 0
+            rank += piece[1] if piece[0] == "w" else piece[1].lower()
+        ranks.append(rank + (str(empty) if empty else ""))
+    rights = castle_rights(board_obj.has_moved)
+    castling = "".join(letter for letter, bit in CASTLE_LETTERS if rights & bit) or "-"
+    ep = square_name(*board_obj.en_passant_target) if board_obj.en_passant_target else "-"
+    return f"{'/'.join(ranks)} {board_obj.color} {castling} {ep} {board_obj.halfmove_clock} {board_obj.fullmove_number}"
+
+
+def pack(board_obj) -> bytes:
+    occupancy = 0
+    nibbles = []
+    for row in range(8):
+        for col in range(8):
+            piece = board_obj.board[row][col]
+            if piece != "--":
+                occupancy |= 1 << (row * 8 + col)
+                nibbles.append(PIECE_CODES[piece])
+    if len(nibbles) > 32:
+        raise ValueError("cannot pack a position with more than 32 pieces")
+    nibbles += [0] * (32 - len(nibbles))
+    pieces = bytes((nibbles[i] << 4) | nibbles[i + 1] for i in range(0, 32, 2))
+    flags = (board_obj.color == "b") | (castle_rights(board_obj.has_moved) << 1)
+    ep = board_obj.en_passant_target[1] + 1 if board_obj.en_passant_target else 0
+    return struct.pack(PACKED_FORMAT, occupancy, pieces, flags, ep,
+                       min(board_obj.halfmove_clock, 0xFFFF), min(board_obj.fullmove_number, 0xFFFF))
+
+
+def unpack(data: bytes) -> Position:
+    """Packed bytes -> the same tuple parse_fen returns, checked the same way."""
+    if len(data) != PACKED_SIZE:
+        raise ValueError(f"packed position must be {PACKED_SIZE} bytes, got {len(data)}")
+    occupancy, pieces, flags, ep, halfmove, fullmove = struct.unpack(PACKED_FORMAT, data)
+    if bin(occupancy).count("1") > 32:
+        raise ValueError("invalid packed position: more than 32 occupied squares")
+    nibbles = [n for byte in pieces for n in (byte >> 4, byte & 15)]
+    rows = [["--"] * 8 for _ in range(8)]
+    i = 0
+    for sq in range(64):
+        if occupancy >> sq & 1:
+            piece = CODE_PIECES.get(nibbles[i])
+            if piece is None:
+                raise ValueError(f"invalid piece code {nibbles[i]} in packed position")
+            rows[sq >> 3][sq & 7] = piece
+            i += 1
+    check_placement(rows)
+    color = "b" if flags & 1 else "w"
+    ep_target = None
+    if ep > 8:
+        raise ValueError(f"invalid en passant file {ep - 1} in packed position")
+    if ep:
+        # the pawn that just double-pushed belongs to the side not to move
+        ep_target = (2 if color == "w" else 5, ep - 1)
+    rights = home_rights(rows, flags >> 1 & 15)
+    return rows, color, has_moved_from_rights(rights), ep_target, halfmove, max(fullmove, 1)
@@ -0,0 +1,95 @@
+"""Hot-path counters for the engine, off unless ENGINE_METRICS=1.
+
+install() swaps counting wrappers onto the engine classes. It runs once, when this module is
+first imported with the flag set; with the flag unset nothing is wrapped and the engine runs
+its original methods, so the disabled cost is zero rather than a branch per call.
+Counts are per process: in process-pool mode the workers' counts stay in the workers, except
+for search totals, which Engine_Pool adds from the results it gets back (record_search).
+"""
+import functools
+import os
+from typing import Dict
+
+ENABLED = os.getenv("ENGINE_METRICS", "0") == "1"
+
+#name -> count; plain ints, a rare lost increment between threads is acceptable for metrics
+COUNTERS: Dict[str, float] = {
+    "moves_generated": 0,
+    "captures_generated": 0,
+    "filter_move_calls": 0,
+    "is_square_attacked_calls": 0,
+    "is_attacked_calls": 0,
+    "make_moves": 0,
+    "undo_moves": 0,
+    "searches": 0,
+    "search_nodes": 0,
+    "search_qnodes": 0,
+    "search_seconds": 0.0,
+}
+#nps of the last search anywhere in the process
+LAST = {"search_nps": 0}
+
+_installed = False
+
+
+def _count_calls(fn, name: str):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        COUNTERS[name] += 1
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+def _count_results(fn, name: str):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        result = fn(*args, **kwargs)
+        COUNTERS[name] += len(result)
+        return result
+    return wrapper
+
+
+def record_search(result: dict) -> None:
+    """Add one finished search (a Search.search result) to the totals."""
+    if result.get("book"):
+        return
+    COUNTERS["searches"] += 1
+    COUNTERS["search_nodes"] += result["nodes"]
+    COUNTERS["search_qnodes"] += result["qnodes"]
+    COUNTERS["search_seconds"] += result["time"]
+    if result.get("nps"):
+        LAST["search_nps"] = result["nps"]
+
+
+def _recording_search(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        result = fn(*args, **kwargs)
+        record_search(result)
+        return result
+    return wrapper
+
+
+def install() -> None:
+    global _installed
+    if _installed:
+        return
+    from .bitboard_board import Bitboard_Board
+    from .chess_board import Chess_Board
+    from .legality import Legality
+    from .search import Search
+
+    Legality.get_all_legal_moves_for_color = _count_results(Legality.get_all_legal_moves_for_color, "moves_generated")
+    Legality.get_all_legal_captures = _count_results(Legality.get_all_legal_captures, "captures_generated")
+    Legality.filter_move = _count_calls(Legality.filter_move, "filter_move_calls")
+    Legality.is_square_attacked = _count_calls(Legality.is_square_attacked, "is_square_attacked_calls")
+    Bitboard_Board.is_attacked = _count_calls(Bitboard_Board.is_attacked, "is_attacked_calls")
+    # Bitboard_Board inherits these, so one wrap covers both backends
+    Chess_Board.save_move = _count_calls(Chess_Board.save_move, "make_moves")
+    Chess_Board.undo_move = _count_calls(Chess_Board.undo_move, "undo_moves")
+    Search.search = _recording_search(Search.search)
+    _installed = True
+
+
+if ENABLED:
+    install()
@@ -1,9 +1,12 @@
 from .chess_utils import Chess_Utils
+from . import bitboard
 
 class Legality:
     
     def __init__(self, board_obj):
         self.board_obj = board_obj            # full Chess_Board
+        # bitboard backends get the mask-based generators, list boards keep the square walkers
+        self.use_bitboards = getattr(board_obj, "backend", "list") == "bitboard"
     @property
     def board(self):
         return self.board_obj.board           # always fetch live board
@@ -15,6 +18,8 @@ class Legality:
         piece = self.board[row][col]
         if piece == "--":
             return []
+        elif self.use_bitboards:
+            return self.get_move_bitboard(row,col)
         elif piece[1] == "P":
             return self.get_move_pawn(row,col)
         elif piece[1] == "R":
@@ -63,18 +68,30 @@ class Legality:
         piece_color = self.board[row][col][0]
         valid_moves = Chess_Utils.move_noSlide(self.board,king_moves,piece_color, row, col)
         if include_castle:
-            # Only add castle squares that are not through check and king not in check
-            for r,c in self.get_castle(row, col):
-                # Determine intermediate squares the king passes through (including destination)
-                path = []
-                if c == 6:  # king side
-                    path = [(row, 5), (row, 6)]
-                elif c == 2:  # queen side
-                    path = [(row, 3), (row, 2)]
-                color = piece_color
-                # King cannot castle out of, through, or into check
-                if not self.is_square_attacked(color, (row, col)) and all(not self.is_square_attacked(color, sq) for sq in path):
-                    valid_moves.append((r, c))
+            valid_moves += self.get_safe_castle(row, col)
+        return valid_moves
+
+    #return castle moves that don't start in, pass through or land in check
+    def get_safe_castle(self, row, col):
+        valid_moves = []
+        color = self.board[row][col][0]
+        for r,c in self.get_castle(row, col):
+            # Determine intermediate squares the king passes through (including destination)
+            path = []
+            if c == 6:  # king side
+                path = [(row, 5), (row, 6)]
+            elif c == 2:  # queen side
+                path = [(row, 3), (row, 2)]
+            # King cannot castle out of, through, or into check
+            if not self.is_square_attacked(color, (row, col)) and all(not self.is_square_attacked(color, sq) for sq in path):
+                valid_moves.append((r, c))
+        return valid_moves
+
+    #return valid moves from the bitboard backend (same results as the per-piece walkers)
+    def get_move_bitboard(self, row, col):
+        valid_moves = bitboard.squares(self.board_obj.piece_targets(row, col))
+        if self.board[row][col][1] == "K":
+            valid_moves += self.get_safe_castle(row, col)
         return valid_moves
     
     #return valid castle moves
@@ -158,22 +175,30 @@ class Legality:
             return moves
         return []
 
-    def is_check(self, color):
-        # Find king position
-        king_pos = None
+    def find_king(self, color):
+        """Return (row, col) of `color`'s king, or None if it isn't on the board."""
+        if self.use_bitboards:
+            king_sq = self.board_obj.king_square(color)
+            return None if king_sq is None else (king_sq >> 3, king_sq & 7)
         for r in range(8):
             for c in range(8):
                 if self.board[r][c] == color + "K":
-                    king_pos = (r, c)
-                    break
-            if king_pos:
-                break
+                    return (r, c)
+        return None
+
+    def is_check(self, color):
+        if self.use_bitboards:
+            king_sq = self.board_obj.king_square(color)
+            return king_sq is not None and self.board_obj.is_attacked(color, king_sq)
+        king_pos = self.find_king(color)
         if king_pos is None:
             return False
         return self.is_square_attacked(color, king_pos)
 
     def is_square_attacked(self, color, square):
         # Returns True if square for side `color` is attacked by opponent
+        if self.use_bitboards:
+            return self.board_obj.is_attacked(color, square[0] * 8 + square[1])
         enemy = "w" if color == "b" else "b"
         rK, cK = square
         # Check knight attacks
@@ -210,49 +235,220 @@ class Legality:
                     break
                 r += dr
                 c += dc
-        # Check pawn attacks (white pawns attack up: row-1; black pawns attack down: row+1)
-        pawn_dirs = [(-1,1), (-1,-1)] if enemy == "w" else [(1,1), (1,-1)]
+        # Check pawn attacks (white pawns attack up: row-1, so an attacking white pawn sits at row+1)
+        pawn_dirs = [(1,1), (1,-1)] if enemy == "w" else [(-1,1), (-1,-1)]
         for dr, dc in pawn_dirs:
             r, c = rK + dr, cK + dc
             if 0 <= r < 8 and 0 <= c < 8 and self.board[r][c] == enemy + "P":
                 return True
         return False
         
-    def filter_move(self, row, col):
-        moves = self.get_legal_moves(row,col)
-        color = self.board[row][col][0]
+    def get_check_info(self, color):
+        """Work out, once per position, what restricts `color`'s moves.
+        Returns (king_pos, checkers, block, pins):
+        - checkers: squares of enemy pieces giving check
+        - block: squares that answer a single check (the checker plus the squares between)
+        - pins: {square of pinned piece: squares on its pin ray, pinner included}
+        Bitboard positions get Bitboard_Board.check_info instead, the same facts as masks.
+        """
+        if self.use_bitboards:
+            return self.board_obj.check_info(color)
+        king_pos = self.find_king(color)
+        checkers, block, pins = [], set(), {}
+        if king_pos is None:
+            return king_pos, checkers, block, pins
+        enemy = "w" if color == "b" else "b"
+        kr, kc = king_pos
+        # Walk out from the king: an enemy slider is a checker if nothing is in between,
+        # or a pinner if exactly one of our pieces is
+        for dr, dc in [(1,0), (0,1), (-1,0), (0,-1), (1,1), (1,-1), (-1,1), (-1,-1)]:
+            sliders = ("B", "Q") if dr and dc else ("R", "Q")
+            ray = []
+            own = None
+            r, c = kr + dr, kc + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                sq = self.board[r][c]
+                ray.append((r, c))
+                if sq != "--":
+                    if sq[0] == color:
+                        if own is not None:
+                            break
+                        own = (r, c)
+                    else:
+                        if sq[1] in sliders:
+                            if own is None:
+                                checkers.append((r, c))
+                                block.update(ray)
+                            else:
+                                pins[own] = set(ray)
+                        break
+                r += dr
+                c += dc
+        for dr, dc in [(1,2), (1,-2), (2,1), (2,-1), (-1,2), (-1,-2), (-2,1), (-2,-1)]:
+            r, c = kr + dr, kc + dc
+            if 0 <= r < 8 and 0 <= c < 8 and self.board[r][c] == enemy + "N":
+                checkers.append((r, c))
+                block.add((r, c))
+        # an attacking white pawn sits one row below the king, a black one a row above
+        pr = kr + 1 if enemy == "w" else kr - 1
+        for c in (kc - 1, kc + 1):
+            if 0 <= pr < 8 and 0 <= c < 8 and self.board[pr][c] == enemy + "P":
+                checkers.append((pr, c))
+                block.add((pr, c))
+        return king_pos, checkers, block, pins
+
+    #return pseudo-legal captures (en passant included) and promotion pushes, no quiet moves
+    def get_capture_moves(self, row, col):
+        piece = self.board[row][col]
+        if piece == "--":
+            return []
+        color = piece[0]
+        if self.use_bitboards:
+            enemy = "b" if color == "w" else "w"
+            targets = self.board_obj.piece_targets(row, col)
+            mask = self.board_obj.occupancy[enemy]
+            if piece[1] == "P":
+                mask |= bitboard.RANK_MASKS[0] | bitboard.RANK_MASKS[7]
+                ep = self.board_obj.en_passant_target
+                if ep:
+                    mask |= 1 << (ep[0] * 8 + ep[1])
+            return bitboard.squares(targets & mask)
+        if piece[1] == "P":
+            promotions = [m for m in self.basic_pawn(row, col) if m[0] == 0 or m[0] == 7]
+            return self.take_pawn(row, col) + promotions
+        elif piece[1] == "N":
+            return Chess_Utils.capture_noSlide(self.board, bitboard.KNIGHT_MOVES, color, row, col)
+        elif piece[1] == "K":
+            return Chess_Utils.capture_noSlide(self.board, bitboard.KING_MOVES, color, row, col)
+        elif piece[1] == "B":
+            return Chess_Utils.capture_slide(self.board, bitboard.BISHOP_DIRECTIONS, color, row, col)
+        elif piece[1] == "R":
+            return Chess_Utils.capture_slide(self.board, bitboard.ROOK_DIRECTIONS, color, row, col)
+        return Chess_Utils.capture_slide(self.board, bitboard.ROOK_DIRECTIONS + bitboard.BISHOP_DIRECTIONS, color, row, col)
+
+    def filter_move(self, row, col, check_info=None):
+        """Legal destinations for the piece on (row, col).
+        Pass `check_info` from get_check_info when filtering several pieces of one position.
+        """
+        if self.use_bitboards:
+            if check_info is None:
+                check_info = self.board_obj.check_info(self.board[row][col][0])
+            return bitboard.squares(self.board_obj.legal_targets(row * 8 + col, check_info))
+        return self.filter_targets(row, col, self.get_legal_moves(row,col), check_info)
+
+    def filter_targets(self, row, col, moves, check_info=None):
+        """Keep the destinations in `moves` that don't leave the mover's king in check."""
+        piece = self.board[row][col]
+        color = piece[0]
+        if check_info is None:
+            check_info = self.get_check_info(color)
+        if self.use_bitboards:
+            legal = self.board_obj.legal_targets(row * 8 + col, check_info)
+            return [m for m in moves if legal >> (m[0] * 8 + m[1]) & 1]
+        king_pos, checkers, block, pins = check_info
+        if king_pos is None:
+            return moves
+
+        if piece[1] == "K":
+            # castles were already checked by get_safe_castle; test steps with the king lifted off
+            # its square so a slider can't "hide" behind it
+            self.board_obj.set_square(row, col, "--")
+            legal_moves = [m for m in moves if abs(m[1] - col) == 2 or not self.is_square_attacked(color, m)]
+            self.board_obj.set_square(row, col, piece)
+            return legal_moves
+
+        if len(checkers) > 1:
+            return []   # double check: only the king can move
+        allowed = pins.get((row, col))
+        if checkers:
+            allowed = block if allowed is None else allowed & block
         legal_moves = []
-        for i in range(len(moves)):
-            self.board_obj.save_move(row, col, moves[i][0], moves[i][1])
-    
-            if not self.is_check(color):
-                legal_moves.append(moves[i])
-            self.board_obj.undo_move()
+        for move in moves:
+            if piece[1] == "P" and move[1] != col and self.board[move[0]][move[1]] == "--":
+                # en passant removes two pieces from a line, so just try it
+                self.board_obj.save_move(row, col, move[0], move[1])
+                if not self.is_check(color):
+                    legal_moves.append(move)
+                self.board_obj.undo_move()
+            elif allowed is None or move in allowed:
+                legal_moves.append(move)
         return legal_moves
 
     def get_all_legal_moves_for_color(self, color):
         """Return a list of all legal moves for the side to move `color`.
         Each move is represented as a tuple: (row, col, new_row, new_col).
         """
+        if self.use_bitboards:
+            return self.board_obj.legal_moves(color)
         moves = []
+        check_info = self.get_check_info(color)
         for r in range(8):
             for c in range(8):
                 piece = self.board[r][c]
                 if piece != "--" and piece[0] == color:
-                    for nr, nc in self.filter_move(r, c):
+                    for nr, nc in self.filter_move(r, c, check_info):
                         moves.append((r, c, nr, nc))
         return moves
 
+    def get_all_legal_moves_with_promotions(self, color):
+        """Like get_all_legal_moves_for_color, but as (row, col, new_row, new_col, promotion)
+        with one entry per promotion piece; promotion is None for every other move.
+        """
+        moves = []
+        for r, c, nr, nc in self.get_all_legal_moves_for_color(color):
+            if (nr == 0 or nr == 7) and self.board[r][c][1] == "P":
+                for promotion in ("Q", "R", "B", "N"):
+                    moves.append((r, c, nr, nc, promotion))
+            else:
+                moves.append((r, c, nr, nc, None))
+        return moves
+
+    def get_all_legal_captures(self, color):
+        """Legal captures and promotions for `color` as (row, col, new_row, new_col, promotion),
+        generated directly rather than by filtering the full move list.
+        """
+        moves = []
+        if self.use_bitboards:
+            legal = self.board_obj.legal_moves(color, captures_only=True)
+        else:
+            check_info = self.get_check_info(color)
+            legal = []
+            for r in range(8):
+                for c in range(8):
+                    if self.board[r][c][0] == color:
+                        targets = self.get_capture_moves(r, c)
+                        if targets:
+                            legal += [(r, c, nr, nc) for nr, nc in self.filter_targets(r, c, targets, check_info)]
+        for r, c, nr, nc in legal:
+            if (nr == 0 or nr == 7) and self.board[r][c][1] == "P":
+                for promotion in ("Q", "R", "B", "N"):
+                    moves.append((r, c, nr, nc, promotion))
+            else:
+                moves.append((r, c, nr, nc, None))
+        return moves
+
+    def has_any_legal_move(self, color):
+        """True as soon as one legal move for `color` is found; the king is tried first since
+        it is the piece most likely to have a move when the side is in trouble.
+        """
+        if self.use_bitboards:
+            return self.board_obj.has_legal_move(color)
+        check_info = self.get_check_info(color)
+        king_pos = check_info[0]
+        if king_pos is not None and self.filter_move(king_pos[0], king_pos[1], check_info):
+            return True
+        if len(check_info[1]) > 1:
+            return False    # double check: only the king can move
+        origins = ((r, c) for r in range(8) for c in range(8) if self.board[r][c][0] == color)
+        for r, c in origins:
+            if (r, c) != king_pos and self.filter_move(r, c, check_info):
+                return True
+        return False
+
     def is_checkmate(self, color):
         """Return True if `color` is currently checkmated."""
-        # If there are any legal moves, it's not mate
-        if self.get_all_legal_moves_for_color(color):
-            return False
-        # No legal moves: if in check, it's checkmate
-        return self.is_check(color)
+        return not self.has_any_legal_move(color) and self.is_check(color)
 
     def is_stalemate(self, color):
         """Return True if `color` is stalemated (no legal moves and not in check)."""
-        if self.get_all_legal_moves_for_color(color):
-            return False
-        return not self.is_check(color)
\ No newline at end of file
+        return not self.has_any_legal_move(color) and not self.is_check(color)
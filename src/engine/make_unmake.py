@@ -1,14 +1,29 @@
 from typing import Optional, List, Tuple, Dict, Any, Union
+from . import zobrist
+
+#rook home squares and the has_moved flag that tracks each of them
+ROOK_HOMES = {(0, 0): "bR1", (0, 7): "bR2", (7, 0): "wR1", (7, 7): "wR2"}
 
 class Make_Unmake:
-    
+
     def __init__(self, board_obj):
         # board_obj is Chess_Board
         self.board_obj = board_obj
-        self.board = board_obj.board
-        self.has_moved = board_obj.has_moved
         self.color = board_obj.color
-        
+        # undo record of the last make_move:
+        # (changed squares, changed has_moved flags, color, en passant, zobrist key)
+        self.record = None
+        self.changed = []
+        self.rights_changed = []
+        self.prev_ep = None
+
+    @property
+    def board(self):
+        return self.board_obj.board           # always fetch live board
+    @property
+    def has_moved(self):
+        return self.board_obj.has_moved
+
     def turn(self, row, col):
         if self.board[row][col][0] == "b" and self.color == "b":
             self.color = "b"
@@ -19,11 +34,11 @@ class Make_Unmake:
             self.color = "w"
             self.color_change()
             return "w"
-        
+
         else:
             return "n"
-        
-    
+
+
     def color_change(self):
         if self.color == "b":
             self.color = "w"
@@ -32,64 +47,89 @@ class Make_Unmake:
             self.color = "b"
             return self.color
 
-                
+
     def make_move(self, row: int, col: int, new_row: int, new_col: int, promotion: Optional[str] = None) -> List[List[str]]:
+        """Play a move in place. Only the squares and flags it touches are recorded in `self.record`."""
+        board_obj = self.board_obj
+        self.color = board_obj.color
+        self.changed = []
+        self.rights_changed = []
+        self.prev_ep = board_obj.en_passant_target
+        prev_key = board_obj.zobrist_key
+        prev_rights = zobrist.castle_rights(self.has_moved)
         # Clear en passant target by default (will set if a double pawn push occurs)
-        self.board_obj.en_passant_target = None
-        if self.board[row][col][0] == "b" and self.color == "b":
-            self.check_move(row, col, new_row, new_col, promotion)
-            self.color_change()
-            return self.board
-        elif self.board[row][col][0] == "w" and self.color == "w":
-            self.check_move(row, col, new_row, new_col, promotion)
-            self.color_change()
-            return self.board
-        else:
-            self.check_move(row, col, new_row, new_col, promotion)
-            self.color_change()
-            return self.board
-                
-            
-        
+        board_obj.en_passant_target = None
+        self.check_move(row, col, new_row, new_col, promotion)
+        self.record = (self.changed, self.rights_changed, self.color, self.prev_ep, prev_key)
+        self.color_change()
+
+        # squares were hashed by set_square; fold in side, castling and en passant changes
+        key = board_obj.zobrist_key ^ zobrist.SIDE_KEY
+        if self.rights_changed:
+            key ^= zobrist.CASTLE_KEYS[prev_rights] ^ zobrist.CASTLE_KEYS[zobrist.castle_rights(self.has_moved)]
+        if self.prev_ep is not None:
+            key ^= zobrist.EP_KEYS[self.prev_ep[1]]
+        if board_obj.en_passant_target is not None:
+            key ^= zobrist.EP_KEYS[board_obj.en_passant_target[1]]
+        board_obj.zobrist_key = key
+        return self.board
+
+    def unmake_move(self, record) -> List[List[str]]:
+        """Restore the position from an undo record produced by make_move."""
+        changed, rights_changed, color, ep, key = record
+        for i in range(len(changed) - 1, -1, -1):
+            row, col, piece = changed[i]
+            self.board_obj.set_square(row, col, piece)
+        for flag, value in rights_changed:
+            self.has_moved[flag] = value
+        self.board_obj.color = color
+        self.board_obj.en_passant_target = ep
+        self.board_obj.zobrist_key = key
+        self.color = color
+        return self.board
+
+    #write a square and remember what was there
+    def put(self, row, col, piece):
+        self.changed.append((row, col, self.board[row][col]))
+        self.board_obj.set_square(row, col, piece)
+
+    #set a has_moved flag and remember its old value
+    def mark_moved(self, key):
+        if self.has_moved[key] != 1:
+            self.rights_changed.append((key, self.has_moved[key]))
+            self.has_moved[key] = 1
+
+
     def check_move(self, row: int, col: int, new_row: int, new_col: int, promotion: Optional[str] = None) -> None:
         peice = self.board[row][col]
-        self.board[row][col] = "--"
-        
+        captured = self.board[new_row][new_col]
+        self.put(row, col, "--")
+
         # En passant capture: moving pawn diagonally to empty square that equals en_passant_target
-        if peice[1] == "P" and self.board[new_row][new_col] == "--" and col != new_col and self.board_obj.en_passant_target == (new_row, new_col):
+        if peice[1] == "P" and captured == "--" and col != new_col and self.prev_ep == (new_row, new_col):
             # Capture the pawn that moved two steps last move
             if peice[0] == "w":
-                self.board[new_row+1][new_col] = "--"
+                self.put(new_row+1, new_col, "--")
             else:
-                self.board[new_row-1][new_col] = "--"
-            self.board[new_row][new_col] = peice
-            # Handle promotion after en passant (rare/impossible in standard, but keep consistent)
-            if peice[0] == "w" and new_row == 0:
-                self.board[new_row][new_col] = "w" + (promotion or "Q")
-            elif peice[0] == "b" and new_row == 7:
-                self.board[new_row][new_col] = "b" + (promotion or "Q")
+                self.put(new_row-1, new_col, "--")
+            self.put(new_row, new_col, peice)
             return self.board
 
-        if self.board[new_row][new_col] != "--":
-            captured = self.board[new_row][new_col] 
-            self.board[new_row][new_col] = peice
-                
-        elif peice[1] == "K":
-            if abs(new_col-col) == 2:
-                self.check_castle(peice, row, col, new_row, new_col)
-            else:
-                if peice[0] == "b":
-                    self.board[new_row][new_col] = peice
-                    self.has_moved["bK"] = 1
-                elif peice[0] == "w":
-                    self.board[new_row][new_col] = peice
-                    self.has_moved["wK"] = 1
+        # a rook taken on its home square can no longer castle
+        flag = ROOK_HOMES.get((new_row, new_col))
+        if flag is not None and captured == flag[:2]:
+            self.mark_moved(flag)
+
+        if peice[1] == "K":
+            if abs(new_col-col) == 2 and self.check_castle(peice, row, col, new_row, new_col):
+                return self.board
+            self.mark_moved(peice[0] + "K")
+            self.put(new_row, new_col, peice)
         elif peice[1] == "R":
             self.check_rook(peice, row, col, new_row, new_col)
-            
+
         else:
             # normal move, also handle pawn promotion
-            self.board[new_row][new_col] = peice
             if peice[1] == "P":
                 # Set en passant target if double advance
                 if peice[0] == "w" and row == 6 and new_row == 4 and col == new_col:
@@ -97,65 +137,33 @@ class Make_Unmake:
                 elif peice[0] == "b" and row == 1 and new_row == 3 and col == new_col:
                     self.board_obj.en_passant_target = (2, col)
                 # promotion ranks: black to row 7, white to row 0
-                if peice[0] == "b" and new_row == 7:
-                    self.board[new_row][new_col] = "b" + (promotion or "Q")
-                elif peice[0] == "w" and new_row == 0:
-                    self.board[new_row][new_col] = "w" + (promotion or "Q")
-        
+                if (peice[0] == "b" and new_row == 7) or (peice[0] == "w" and new_row == 0):
+                    peice = peice[0] + (promotion or "Q")
+            self.put(new_row, new_col, peice)
+
         return self.board
-        
+
     def check_castle(self, peice, row, col, new_row, new_col):
-        
-        if peice[0] == "b":
-            if self.has_moved["bK"] == 0 and self.has_moved["bR1"] == 0 and new_col - col == -2:
-                self.board[0][0] = "--"
-                self.board[new_row][new_col] = peice
-                self.board[0][3] = "bR"
-                self.has_moved["bK"] = 1
-                self.has_moved["bR1"] = 1
-            elif self.has_moved["bK"] == 0 and self.has_moved["bR2"] == 0 and new_col - col == 2:
-                self.board[0][7] = "--"
-                self.board[new_row][new_col] = peice
-                self.board[0][5] = "bR"
-                self.has_moved["bK"] = 1
-                self.has_moved["bR2"] = 1
-                
-            
-        elif peice[0] == "w":
-            if self.has_moved["wK"] == 0 and self.has_moved["wR1"] == 0 and new_col - col == -2:
-                self.board[7][0] = "--"
-                self.board[new_row][new_col] = peice
-                self.board[7][3] = "wR"
-                self.has_moved["wK"] = 1
-                self.has_moved["wR1"] = 1
-            elif self.has_moved["wK"] == 0 and self.has_moved["wR2"] == 0 and new_col - col == 2:
-                self.board[7][7] = "--"
-                self.board[new_row][new_col] = peice
-                self.board[7][5] = "wR"
-                self.has_moved["wK"] = 1
-                self.has_moved["wR2"] = 1
-    
+        """Move king and rook for a castle. Returns False if castling rights are gone."""
+        back = 0 if peice[0] == "b" else 7
+        king = peice[0] + "K"
+        if new_col - col == -2:
+            rook_flag, rook_from, rook_to = peice[0] + "R1", 0, 3
+        else:
+            rook_flag, rook_from, rook_to = peice[0] + "R2", 7, 5
+        if self.has_moved[king] != 0 or self.has_moved[rook_flag] != 0:
+            return False
+        self.put(back, rook_from, "--")
+        self.put(new_row, new_col, peice)
+        self.put(back, rook_to, peice[0] + "R")
+        self.mark_moved(king)
+        self.mark_moved(rook_flag)
+        return True
+
     def check_rook(self, peice, row, col, new_row, new_col):
-        if peice[0] == "b":
-            if self.has_moved["bR1"] == 0 and col == 0:
-                self.board[new_row][new_col] = peice
-                self.has_moved["bR1"] = 1
-                
-            elif self.has_moved["bR2"] == 0 and col == 7:
-                self.board[new_row][new_col] = peice
-                self.has_moved["bR2"] = 1
-            else:
-                self.board[new_row][new_col] = peice
-            
-        elif peice[0] == "w":     
-            if self.has_moved["wR1"] == 0 and col == 0:
-                self.board[new_row][new_col] = peice
-                self.has_moved["wR1"] = 1
-                
-            elif self.has_moved["wR2"] == 0 and col == 7:
-                self.board[new_row][new_col] = peice
-                self.has_moved["wR2"] = 1  
-            else:
-                self.board[new_row][new_col] = peice 
-                    
+        # moving a rook off its home square gives up castling on that side
+        flag = ROOK_HOMES.get((row, col))
+        if flag is not None and flag[:2] == peice:
+            self.mark_moved(flag)
+        self.put(new_row, new_col, peice)
         return self.board
@@ -0,0 +1,374 @@
+"""Engine-vs-engine matches played in parallel, with a running Elo estimate.
+
+Every opening is played once with each engine as white (per round). Games run in a process
+pool, each with its own boards, engines and transposition tables, and results stream out as
+JSON lines while the match runs:
+    python -m src.engine.match --engine new:depth=4 --engine old:depth=3 --openings suite.epd
+    python -m src.engine.match --engine a:movetime=0.1 --engine b:movetime=0.1,book=none --pgn out.pgn
+
+An engine is "name:key=value,...": depth, movetime (seconds per move), backend (list or
+bitboard), hash (transposition table MB) and book (a Polyglot file, or "none").
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, TextIO
+
+from .book import Opening_Book
+from .chess_board import create_board
+from .engine import Engine
+from .fen import START_FEN
+from .notation import move_san
+from .transposition import Transposition_Table
+
+#what a game ends with when the engines don't settle it themselves
+DEFAULT_ADJUDICATION = {
+    "max_plies": 400,
+    # resign: the side to move has seen <= -resign_score for resign_moves of its own moves in a row
+    "resign_score": 1000,
+    "resign_moves": 4,
+    # draw: after draw_after plies, both sides within draw_score for draw_moves moves each
+    "draw_after": 80,
+    "draw_score": 10,
+    "draw_moves": 8,
+}
+
+ENGINE_KEYS = {"depth": int, "movetime": float, "backend": str, "hash": float, "book": str}
+
+
+def parse_engine(spec: str) -> dict:
+    """"name:depth=4,movetime=0.1" -> {"name": "name", "depth": 4, "movetime": 0.1}."""
+    name, _, options = spec.partition(":")
+    if not name:
+        raise ValueError(f"engine needs a name: {spec!r}")
+    config = {"name": name}
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        if key not in ENGINE_KEYS or not value:
+            raise ValueError(f"invalid engine option {option!r} (known: {', '.join(ENGINE_KEYS)})")
+        config[key] = ENGINE_KEYS[key](value)
+    if config.get("backend", "list") not in ("list", "bitboard"):
+        raise ValueError(f"unknown board backend: {config['backend']}")
+    return config
+
+
+def read_openings(path: str) -> List[str]:
+    """Start positions from an EPD/FEN file (one per line) or from the main lines of a PGN file."""
+    if path.endswith(".pgn"):
+        from .legality import Legality
+        from .notation import parse_san
+        from .pgn import read_games, san_moves
+
+        board = create_board()
+        legality = Legality(board)
+        fens = []
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for _, tags, movetext in read_games(f):
+                board.load_fen(tags.get("FEN", START_FEN))
+                for san in san_moves(movetext)[0]:
+                    board.save_move(*parse_san(board, legality, san))
+                fens.append(board.to_fen())
+        return fens
+    fens = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.lstrip().startswith("#"):
+                continue
+            fields = line.split(";")[0].split()
+            if not fields:
+                continue
+            # EPD: placement, side, castling, ep, then operations instead of move counters
+            counters = len(fields) >= 6 and fields[4].isdigit() and fields[5].isdigit()
+            fens.append(" ".join(fields[:6] if counters else fields[:4]))
+    return fens
+
+
+class Player:
+    """One engine configuration playing one game on its own board."""
+
+    def __init__(self, config: dict, fen: str):
+        self.config = config
+        self.board = create_board(config.get("backend", "list")).load_fen(fen)
+        book = config.get("book")
+        self.use_book = book != "none"
+        self.engine = Engine(self.board, book=Opening_Book(book) if self.use_book and book else None)
+        # a table of its own: the process-wide one would be shared with the opponent
+        self.engine.searcher.tt = Transposition_Table(config.get("hash", 16))
+        self.moves = self.book_moves = self.nodes = self.depth = 0
+        self.time = 0.0
+        self.scores: List[int] = []
+
+    def think(self) -> dict:
+        result = self.engine.search(self.config.get("depth"), self.config.get("movetime"), use_book=self.use_book)
+        self.moves += 1
+        if result["book"]:
+            self.book_moves += 1
+        else:
+            self.nodes += result["nodes"]
+            self.depth += result["depth"]
+            self.time += result["time"]
+        self.scores.append(result["score"])
+        return result
+
+    def stats(self) -> dict:
+        return {"moves": self.moves, "book_moves": self.book_moves, "nodes": self.nodes,
+                "depth": self.depth, "time": round(self.time, 4)}
+
+
+def _insufficient(board) -> bool:
+    minors = 0
+    for row in board:
+        for piece in row:
+            if piece[1] in "PRQ":
+                return False
+            if piece[1] in "BN":
+                minors += 1
+    return minors <= 1
+
+
+def _adjudicate(mover: Player, other: Player, plies: int, rules: dict) -> Optional[str]:
+    n = rules["resign_moves"]
+    if n and len(mover.scores) >= n and len(other.scores) >= n:
+        if all(s <= -rules["resign_score"] for s in mover.scores[-n:]) and \
+                all(s >= rules["resign_score"] for s in other.scores[-n:]):
+            return "resign"
+    n = rules["draw_moves"]
+    if n and plies >= rules["draw_after"] and len(mover.scores) >= n and len(other.scores) >= n:
+        if all(abs(s) <= rules["draw_score"] for s in mover.scores[-n:] + other.scores[-n:]):
+            return "draw"
+    return None
+
+
+def play_game(task: dict) -> dict:
+    """Play one game to a result. Process pool entry point; an illegal move loses."""
+    fen, white, black = task["fen"], task["white"], task["black"]
+    rules = {**DEFAULT_ADJUDICATION, **task.get("adjudication", {})}
+    players = {"w": Player(white, fen), "b": Player(black, fen)}
+    referee = Engine(create_board().load_fen(fen))
+    board = referee.board
+    seen: Dict[int, int] = {board.zobrist_key: 1}
+    san: List[str] = []
+    result = reason = None
+    start = time.perf_counter()
+    while result is None:
+        color = board.color
+        status, winner = referee.get_game_status()
+        if status == "checkmate":
+            result, reason = ("1-0" if winner == "w" else "0-1"), "checkmate"
+            break
+        if status == "stalemate":
+            result, reason = "1/2-1/2", "stalemate"
+            break
+        if board.halfmove_clock >= 100:
+            result, reason = "1/2-1/2", "fifty_moves"
+            break
+        if seen[board.zobrist_key] >= 3:
+            result, reason = "1/2-1/2", "repetition"
+            break
+        if _insufficient(board.board):
+            result, reason = "1/2-1/2", "insufficient_material"
+            break
+        endgame = referee.probe_tablebase()
+        if endgame is not None:
+            if endgame["result"] == "draw":
+                result = "1/2-1/2"
+            else:
+                result = "1-0" if (endgame["result"] == "win") == (color == "w") else "0-1"
+            reason = "tablebase"
+            break
+        if len(san) >= rules["max_plies"]:
+            result, reason = "1/2-1/2", "max_plies"
+            break
+
+        mover, other = players[color], players["b" if color == "w" else "w"]
+        move = mover.think()["best_move"]
+        if move is None or board.board[move[0]][move[1]][0] != color or \
+                tuple(move[2:4]) not in referee.legality.filter_move(move[0], move[1]):
+            result, reason = ("0-1" if color == "w" else "1-0"), f"illegal move {move}"
+            break
+        san.append(move_san(board, referee.legality, move))
+        for b in (board, players["w"].board, players["b"].board):
+            b.save_move(*move)
+        seen[board.zobrist_key] = seen.get(board.zobrist_key, 0) + 1
+        verdict = _adjudicate(mover, other, len(san), rules)
+        if verdict == "resign":
+            result, reason = ("0-1" if color == "w" else "1-0"), "resign"
+        elif verdict == "draw":
+            result, reason = "1/2-1/2", "draw_adjudication"
+    return {
+        "index": task["index"], "fen": fen, "white": white["name"], "black": black["name"],
+        "result": result, "reason": reason, "plies": len(san), "san": san,
+        "stats": {"w": players["w"].stats(), "b": players["b"].stats()},
+        "time": round(time.perf_counter() - start, 3),
+    }
+
+
+def elo_estimate(wins: int, draws: int, losses: int) -> dict:
+    """Elo difference from a match score with a 95% confidence margin (normal approximation)."""
+    games = wins + draws + losses
+    if not games:
+        return {"elo": None, "error": None, "score": None}
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = 1.96 * math.sqrt(variance / games)
+
+    def elo(p: float) -> float:
+        p = min(max(p, 1e-6), 1 - 1e-6)
+        return -400 * math.log10(1 / p - 1)
+
+    return {"elo": round(elo(score), 1) + 0.0, "error": round((elo(score + margin) - elo(score - margin)) / 2, 1),
+            "score": round(score, 4)}
+
+
+class Standings:
+    """Running totals from the first engine's point of view."""
+
+    def __init__(self, first: str, second: str):
+        self.names = (first, second)
+        self.wins = self.draws = self.losses = 0
+        self.reasons: Dict[str, int] = {}
+        self.engines = {name: {"moves": 0, "book_moves": 0, "nodes": 0, "depth": 0, "time": 0.0}
+                        for name in self.names}
+
+    def add(self, game: dict) -> None:
+        first_white = game["white"] == self.names[0]
+        if game["result"] == "1/2-1/2":
+            self.draws += 1
+        elif (game["result"] == "1-0") == first_white:
+            self.wins += 1
+        else:
+            self.losses += 1
+        self.reasons[game["reason"]] = self.reasons.get(game["reason"], 0) + 1
+        for color, name in (("w", game["white"]), ("b", game["black"])):
+            totals = self.engines[name]
+            for key, value in game["stats"][color].items():
+                totals[key] += value
+
+    def summary(self) -> dict:
+        engines = {}
+        for name, t in self.engines.items():
+            searched = t["moves"] - t["book_moves"]
+            engines[name] = {
+                "moves": t["moves"],
+                "book_moves": t["book_moves"],
+                "avg_nps": int(t["nodes"] / t["time"]) if t["time"] > 0 else None,
+                "avg_depth": round(t["depth"] / searched, 2) if searched else None,
+            }
+        return {
+            "games": self.wins + self.draws + self.losses,
+            "wins": self.wins, "draws": self.draws, "losses": self.losses,
+            **elo_estimate(self.wins, self.draws, self.losses),
+            "reasons": self.reasons,
+            "engines": engines,
+        }
+
+
+def schedule(engines: List[dict], openings: List[str], rounds: int, adjudication: dict) -> Iterator[dict]:
+    """Each opening twice per round, colors swapped."""
+    index = 0
+    for _ in range(rounds):
+        for fen in openings:
+            for white, black in ((engines[0], engines[1]), (engines[1], engines[0])):
+                yield {"index": index, "fen": fen, "white": white, "black": black, "adjudication": adjudication}
+                index += 1
+
+
+def pgn_text(game: dict, event: str = "Engine match") -> str:
+    """One finished game as PGN."""
+    tags = [("Event", event), ("Round", str(game["index"] + 1)), ("White", game["white"]),
+            ("Black", game["black"]), ("Result", game["result"]), ("Termination", game["reason"])]
+    fields = game["fen"].split()
+    if game["fen"] != START_FEN:
+        tags += [("SetUp", "1"), ("FEN", game["fen"])]
+    number = int(fields[5]) if len(fields) > 5 else 1
+    black_first = len(fields) > 1 and fields[1] == "b"
+    words = []
+    for i, san in enumerate(game["san"]):
+        white_move = (i % 2 == 0) != black_first
+        if white_move:
+            words.append(f"{number}.")
+        elif i == 0:
+            words.append(f"{number}...")
+        words.append(san)
+        if not white_move:
+            number += 1
+    words.append(game["result"])
+    return "".join(f'[{k} "{v}"]\n' for k, v in tags) + "\n" + " ".join(words) + "\n\n"
+
+
+def run_match(engines: List[dict], openings: List[str], rounds: int = 1, workers: int = 1,
+              adjudication: Optional[dict] = None, out: Optional[TextIO] = None,
+              pgn: Optional[TextIO] = None) -> dict:
+    """Play the match, writing a JSON line per finished game (with the standings so far) to `out`.
+    At most two games per worker are queued at a time."""
+    if len(engines) != 2:
+        raise ValueError("a match needs exactly two engines")
+    if engines[0]["name"] == engines[1]["name"]:
+        raise ValueError("engine names must differ")
+    standings = Standings(engines[0]["name"], engines[1]["name"])
+    start = time.perf_counter()
+
+    def collect(game: dict) -> None:
+        standings.add(game)
+        if pgn is not None:
+            pgn.write(pgn_text(game))
+            pgn.flush()
+        if out is not None:
+            summary = standings.summary()
+            line = {"type": "game", **{k: v for k, v in game.items() if k not in ("san", "stats")},
+                    "standings": {k: summary[k] for k in ("games", "wins", "draws", "losses", "elo", "error")}}
+            out.write(json.dumps(line) + "\n")
+            out.flush()
+
+    tasks = schedule(engines, openings, rounds, adjudication or {})
+    if workers <= 1:
+        for task in tasks:
+            collect(play_game(task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            for task in tasks:
+                pending.add(pool.submit(play_game, task))
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future.result())
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future.result())
+    return {"type": "summary", **standings.summary(), "workers": workers,
+            "seconds": round(time.perf_counter() - start, 2)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Play an engine-vs-engine match")
+    parser.add_argument("--engine", action="append", required=True, help='"name:depth=4,movetime=0.1" (twice)')
+    parser.add_argument("--openings", help="EPD/FEN file (one position per line) or PGN file; default: start position")
+    parser.add_argument("--rounds", type=int, default=1, help="times through the openings, each with both colors")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="game processes (default: CPU count; 1 = in this process)")
+    parser.add_argument("--pgn", help="append finished games to this PGN file")
+    for key, value in DEFAULT_ADJUDICATION.items():
+        parser.add_argument("--" + key.replace("_", "-"), type=int, default=value)
+    args = parser.parse_args(argv)
+
+    engines = [parse_engine(spec) for spec in args.engine]
+    openings = read_openings(args.openings) if args.openings else [START_FEN]
+    adjudication = {key: getattr(args, key) for key in DEFAULT_ADJUDICATION}
+    pgn = open(args.pgn, "a", encoding="utf-8") if args.pgn else None
+    try:
+        summary = run_match(engines, openings, args.rounds, args.workers, adjudication, sys.stdout, pgn)
+    finally:
+        if pgn is not None:
+            pgn.close()
+    print(json.dumps(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+from typing import Iterator, List, Optional, Tuple
+
+from .evaluation import PIECE_VALUES
+
+MAX_PLY = 64
+#history scores are halved at the start of each search so old cutoffs fade out
+HISTORY_DECAY = 2
+
+Move = Tuple[int, int, int, int, Optional[str]]
+
+
+class Move_Ordering:
+    """Orders moves for alpha-beta: hash move, captures/promotions by MVV-LVA, killers, then
+    quiet moves by history score. pick() is a generator that selects the next best move on
+    demand, so the moves left after a cutoff are never sorted.
+    """
+
+    def __init__(self):
+        # two killer (quiet, caused a cutoff) moves per ply
+        self.killers: List[List[Optional[Move]]] = [[None, None] for _ in range(MAX_PLY + 1)]
+        # butterfly table: color index * 4096 + from square * 64 + to square
+        self.history = [0] * (2 * 64 * 64)
+
+    def new_search(self) -> None:
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.history = [h // HISTORY_DECAY for h in self.history]
+
+    @staticmethod
+    def is_capture(board, move: Move) -> bool:
+        r, c, nr, nc = move[:4]
+        if board[nr][nc] != "--":
+            return True
+        # pawn moving diagonally onto an empty square is en passant
+        return board[r][c][1] == "P" and c != nc
+
+    @staticmethod
+    def mvv_lva(board, move: Move) -> int:
+        """Most valuable victim first, least valuable attacker breaking ties; promotions add the new piece."""
+        r, c, nr, nc, promotion = move
+        victim = board[nr][nc]
+        score = PIECE_VALUES[victim[1]] * 10 if victim != "--" else (PIECE_VALUES["P"] * 10 if c != nc else 0)
+        if promotion:
+            score += PIECE_VALUES[promotion] * 10
+        return score - PIECE_VALUES[board[r][c][1]] // 10
+
+    def history_index(self, color: str, move: Move) -> int:
+        return (0 if color == "w" else 4096) + (move[0] * 8 + move[1]) * 64 + move[2] * 8 + move[3]
+
+    def record_cutoff(self, move: Move, color: str, ply: int, depth: int) -> None:
+        """Remember a quiet move that failed high."""
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        self.history[self.history_index(color, move)] += depth * depth
+
+    def pick(self, board_obj, moves: List[Move], hash_move: Optional[Move] = None, ply: int = 0) -> Iterator[Move]:
+        board = board_obj.board
+        color = board_obj.color
+
+        # stage 1: hash move
+        if hash_move is not None and hash_move in moves:
+            yield hash_move
+        else:
+            hash_move = None
+
+        # stage 2: captures and promotions, best MVV-LVA first
+        noisy, quiet = [], []
+        for move in moves:
+            if move == hash_move:
+                continue
+            if move[4] or self.is_capture(board, move):
+                noisy.append((self.mvv_lva(board, move), move))
+            else:
+                quiet.append(move)
+        yield from _select(noisy)
+
+        # stage 3: killers that are legal quiet moves here
+        killers = [k for k in self.killers[ply] if k is not None and k in quiet]
+        for killer in killers:
+            quiet.remove(killer)
+            yield killer
+
+        # stage 4: remaining quiet moves by history
+        history = self.history
+        offset = 0 if color == "w" else 4096
+        yield from _select([(history[offset + (m[0] * 8 + m[1]) * 64 + m[2] * 8 + m[3]], m) for m in quiet])
+
+
+def _select(scored: List[Tuple[int, Move]]) -> Iterator[Move]:
+    #selection sort one step at a time: O(n) per move actually searched
+    while scored:
+        best = 0
+        for i in range(1, len(scored)):
+            if scored[i][0] > scored[best][0]:
+                best = i
+        scored[best], scored[-1] = scored[-1], scored[best]
+        yield scored.pop()[1]
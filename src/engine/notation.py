@@ -0,0 +1,123 @@
+import re
+from typing import List, Optional, Tuple
+
+from . import bitboard
+
+FILES = "abcdefgh"
+
+
+def square_name(row: int, col: int) -> str:
+    """(row, col) -> algebraic square, row 0 being rank 8."""
+    return f"{FILES[col]}{8 - row}"
+
+
+def move_name(move: Tuple) -> str:
+    """Coordinate notation for (row, col, new_row, new_col[, promotion]), e.g. e2e4 or a7a8q."""
+    r, c, nr, nc = move[:4]
+    promotion: Optional[str] = move[4] if len(move) > 4 else None
+    name = square_name(r, c) + square_name(nr, nc)
+    return name + promotion.lower() if promotion else name
+
+
+def parse_square(name: str) -> Tuple[int, int]:
+    """Algebraic square -> (row, col); raises ValueError for anything else."""
+    if len(name) != 2 or name[0] not in FILES or name[1] not in "12345678":
+        raise ValueError(f"invalid square: {name!r}")
+    return 8 - int(name[1]), FILES.index(name[0])
+
+
+def parse_move_name(name: str) -> Tuple[int, int, int, int, Optional[str]]:
+    """Inverse of move_name: e2e4 -> (6, 4, 4, 4, None), a7a8q -> (1, 0, 0, 0, "Q")."""
+    if len(name) not in (4, 5) or (len(name) == 5 and name[4] not in "qrbn"):
+        raise ValueError(f"invalid move: {name!r}")
+    r, c = parse_square(name[:2])
+    nr, nc = parse_square(name[2:4])
+    return r, c, nr, nc, name[4].upper() if len(name) == 5 else None
+
+
+#SAN: piece, optional from-file/from-rank, optional capture, target square, optional promotion
+_SAN = re.compile(r"^([NBRQK])?([a-h])?([1-8])?(x)?([a-h][1-8])(?:=?([NBRQ]))?$")
+
+
+def _origins(board_obj, piece: str) -> List[Tuple[int, int]]:
+    if board_obj.backend == "bitboard":
+        return bitboard.squares(board_obj.pieces[piece])
+    board = board_obj.board
+    return [(r, c) for r in range(8) for c in range(8) if board[r][c] == piece]
+
+
+def parse_san(board_obj, legality, san: str) -> Tuple[int, int, int, int, Optional[str]]:
+    """Resolve a SAN move ("Nbd7", "exd6", "O-O", "e8=Q+") for the side to move into
+    (row, col, new_row, new_col, promotion). Raises ValueError if it is illegal or ambiguous.
+    """
+    color = board_obj.color
+    text = san.rstrip("+#!?")
+    if text in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        row = 7 if color == "w" else 0
+        new_col = 6 if len(text) == 3 else 2
+        if board_obj.board[row][4] == color + "K" and (row, new_col) in legality.filter_move(row, 4):
+            return row, 4, row, new_col, None
+        raise ValueError(f"illegal castling: {san}")
+    match = _SAN.match(text)
+    if match is None:
+        raise ValueError(f"unreadable SAN: {san}")
+    kind, from_file, from_rank, _, target, promotion = match.groups()
+    kind = kind or "P"
+    new_row, new_col = parse_square(target)
+    if kind == "P" and (new_row == 0 or new_row == 7) and promotion is None:
+        raise ValueError(f"promotion piece missing: {san}")
+    if promotion and kind != "P":
+        raise ValueError(f"only pawns promote: {san}")
+
+    check_info = legality.get_check_info(color)
+    found = []
+    for r, c in _origins(board_obj, color + kind):
+        if from_file is not None and c != FILES.index(from_file):
+            continue
+        if from_rank is not None and r != 8 - int(from_rank):
+            continue
+        if (new_row, new_col) in legality.filter_move(r, c, check_info):
+            found.append((r, c))
+    if not found:
+        raise ValueError(f"illegal move: {san}")
+    if len(found) > 1:
+        raise ValueError(f"ambiguous move: {san}")
+    r, c = found[0]
+    return r, c, new_row, new_col, promotion
+
+
+def move_san(board_obj, legality, move: Tuple) -> str:
+    """SAN for a legal move of the side to move, with + / # suffixes."""
+    r, c, nr, nc = move[:4]
+    promotion = move[4] if len(move) > 4 else None
+    board = board_obj.board
+    piece = board[r][c]
+    kind = piece[1]
+    capture = board[nr][nc] != "--" or (kind == "P" and c != nc)
+    if kind == "K" and abs(nc - c) == 2:
+        san = "O-O" if nc == 6 else "O-O-O"
+    elif kind == "P":
+        san = (FILES[c] + "x" if capture else "") + square_name(nr, nc)
+        if promotion:
+            san += "=" + promotion
+    else:
+        # other pieces of the same kind that could also go there
+        rivals = [(or_, oc) for or_, oc in _origins(board_obj, piece)
+                  if (or_, oc) != (r, c) and (nr, nc) in legality.filter_move(or_, oc)]
+        prefix = ""
+        if rivals:
+            if all(oc != c for _, oc in rivals):
+                prefix = FILES[c]
+            elif all(or_ != r for or_, _ in rivals):
+                prefix = str(8 - r)
+            else:
+                prefix = square_name(r, c)
+        san = kind + prefix + ("x" if capture else "") + square_name(nr, nc)
+    board_obj.save_move(r, c, nr, nc, promotion)
+    try:
+        enemy = board_obj.color
+        if legality.is_check(enemy):
+            san += "+" if legality.has_any_legal_move(enemy) else "#"
+    finally:
+        board_obj.undo_move()
+    return san
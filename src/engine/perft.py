@@ -0,0 +1,118 @@
+"""Perft (move path enumeration) for checking and timing the move generator.
+
+Run the standard suite and print JSON results:
+    python -m src.engine.perft
+Divide a single position:
+    python -m src.engine.perft --fen "<fen>" --depth 3 --divide
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .chess_board import Chess_Board, create_board
+from .legality import Legality
+from .notation import move_name
+
+#name, fen, depth, expected node count (https://www.chessprogramming.org/Perft_Results)
+POSITIONS: List[Tuple[str, str, int, int]] = [
+    ("startpos", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", 4, 197281),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", 3, 97862),
+    ("endgame_ep", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", 4, 43238),
+    ("promotions", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", 3, 9467),
+    ("castling_checks", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", 3, 62379),
+    ("middlegame", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10", 3, 89890),
+]
+
+
+def perft(board: Chess_Board, legality: Legality, depth: int) -> int:
+    if depth == 0:
+        return 1
+    moves = legality.get_all_legal_moves_with_promotions(board.color)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for r, c, nr, nc, promotion in moves:
+        board.save_move(r, c, nr, nc, promotion)
+        nodes += perft(board, legality, depth - 1)
+        board.undo_move()
+    return nodes
+
+
+def divide(board: Chess_Board, legality: Legality, depth: int) -> Dict[str, int]:
+    """Node count below each root move."""
+    counts = {}
+    for move in legality.get_all_legal_moves_with_promotions(board.color):
+        board.save_move(*move)
+        counts[move_name(move)] = perft(board, legality, depth - 1)
+        board.undo_move()
+    return counts
+
+
+def run_position(name: str, fen: str, depth: int, expected: Optional[int] = None, backend: str = "list") -> dict:
+    board = create_board(backend).load_fen(fen)
+    legality = Legality(board)
+    start = time.perf_counter()
+    nodes = perft(board, legality, depth)
+    seconds = time.perf_counter() - start
+    return {
+        "position": name,
+        "fen": fen,
+        "depth": depth,
+        "nodes": nodes,
+        "expected": expected,
+        "ok": expected is None or nodes == expected,
+        "seconds": round(seconds, 4),
+        "nps": int(nodes / seconds) if seconds > 0 else None,
+    }
+
+
+def run_suite(backend: str = "list", names: Optional[List[str]] = None, depth: Optional[int] = None) -> dict:
+    """Run the standard positions. Overriding `depth` drops the expected counts."""
+    results = []
+    for name, fen, default_depth, expected in POSITIONS:
+        if names and name not in names:
+            continue
+        if depth is None:
+            results.append(run_position(name, fen, default_depth, expected, backend))
+        else:
+            results.append(run_position(name, fen, depth, None, backend))
+    nodes = sum(r["nodes"] for r in results)
+    seconds = sum(r["seconds"] for r in results)
+    return {
+        "backend": backend,
+        "results": results,
+        "ok": all(r["ok"] for r in results),
+        "total_nodes": nodes,
+        "total_seconds": round(seconds, 4),
+        "nps": int(nodes / seconds) if seconds > 0 else None,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Perft / divide for the chess engine")
+    parser.add_argument("--backend", default="list", choices=["list", "bitboard"])
+    parser.add_argument("--fen", help="run a single position instead of the suite")
+    parser.add_argument("--depth", type=int, help="search depth (defaults to the suite depth)")
+    parser.add_argument("--position", action="append", help="only run these suite positions")
+    parser.add_argument("--divide", action="store_true", help="print node counts per root move")
+    args = parser.parse_args(argv)
+
+    if args.fen:
+        depth = args.depth or 3
+        if args.divide:
+            board = create_board(args.backend).load_fen(args.fen)
+            counts = divide(board, Legality(board), depth)
+            print(json.dumps({"fen": args.fen, "depth": depth, "moves": counts, "nodes": sum(counts.values())}, indent=2))
+            return 0
+        print(json.dumps(run_position("custom", args.fen, depth, None, args.backend), indent=2))
+        return 0
+
+    report = run_suite(args.backend, args.position, args.depth)
+    print(json.dumps(report, indent=2))
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""Streaming PGN reader and parallel replay through the engine.
+
+Validate an archive and print JSON throughput stats:
+    python -m src.engine.pgn games.pgn --workers 4
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .chess_board import create_board
+from .fen import START_FEN
+from .legality import Legality
+from .notation import parse_san
+
+#(index in the archive, tag pairs, raw movetext)
+Pgn_Game = Tuple[int, Dict[str, str], str]
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+
+_TAG = re.compile(r'^\[(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]\s*$')
+#comments, NAGs, variation brackets, and everything else as words
+_TOKEN = re.compile(r"\{[^}]*\}|;[^\n]*|\$\d+|[()]|[^\s(){};]+")
+_MOVE_NUMBER = re.compile(r"^\d+\.*")
+
+
+def read_games(lines: Iterable[str]) -> Iterator[Pgn_Game]:
+    """Yield games one at a time from PGN text lines; only the current game is held in memory."""
+    index = 0
+    tags: Dict[str, str] = {}
+    movetext: List[str] = []
+    open_comment = False
+    # a blank line after the tags: a tag line from here on starts a new game even with no movetext
+    tags_closed = False
+    for line in lines:
+        stripped = line.strip()
+        if not open_comment and stripped.startswith("["):
+            match = _TAG.match(stripped)
+            if match:
+                if movetext or tags_closed:
+                    yield index, tags, " ".join(movetext)
+                    index += 1
+                    tags, movetext = {}, []
+                tags_closed = False
+                tags[match.group(1)] = match.group(2).replace('\\"', '"').replace("\\\\", "\\")
+                continue
+        if stripped.startswith("%"):
+            continue    # escape line
+        if not stripped:
+            tags_closed = bool(tags)
+        else:
+            movetext.append(stripped)
+            # a brace comment may run over several lines and contain "[" at line start
+            open_comment = (open_comment + stripped.count("{") - stripped.count("}")) > 0
+    if movetext or tags:
+        yield index, tags, " ".join(movetext)
+
+
+def san_moves(movetext: str) -> Tuple[List[str], Optional[str]]:
+    """Main-line SAN moves and the result token, skipping comments, NAGs and variations."""
+    moves = []
+    depth = 0
+    for token in _TOKEN.findall(movetext):
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth = max(depth - 1, 0)
+        elif depth or token[0] in "{;$":
+            continue
+        elif token in RESULTS:
+            return moves, token
+        else:
+            token = _MOVE_NUMBER.sub("", token)
+            if token:
+                moves.append(token)
+    return moves, None
+
+
+def replay_game(board, legality: Legality, game: Pgn_Game) -> dict:
+    """Play one game's main line on `board`; any failure is reported, never raised."""
+    index, tags, movetext = game
+    plies = 0
+    try:
+        board.load_fen(tags["FEN"] if "FEN" in tags else START_FEN)
+        moves, result = san_moves(movetext)
+        for san in moves:
+            board.save_move(*parse_san(board, legality, san))
+            plies += 1
+        return {"index": index, "ok": True, "plies": plies, "result": result, "fen": board.to_fen()}
+    except Exception as e:
+        return {"index": index, "ok": False, "plies": plies, "error": f"ply {plies + 1}: {e}",
+                "white": tags.get("White"), "black": tags.get("Black")}
+
+
+def replay_chunk(games: List[Pgn_Game], backend: str = "list") -> List[dict]:
+    #process pool entry point: one board reused for the whole chunk
+    board = create_board(backend)
+    legality = Legality(board)
+    return [replay_game(board, legality, game) for game in games]
+
+
+def _chunks(games: Iterator[Pgn_Game], size: int) -> Iterator[List[Pgn_Game]]:
+    chunk = []
+    for game in games:
+        chunk.append(game)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def replay_archive(lines: Iterable[str], workers: int = 1, backend: str = "list", chunk_size: int = 64,
+                   max_errors: int = 20) -> dict:
+    """Replay every game and report throughput. With workers > 1, chunks of games go to a
+    process pool with at most two chunks per worker in flight, so memory stays bounded.
+    """
+    totals = {"games": 0, "ok": 0, "failed": 0, "plies": 0}
+    errors: List[dict] = []
+
+    def collect(results: List[dict]) -> None:
+        for r in results:
+            totals["games"] += 1
+            totals["plies"] += r["plies"]
+            if r["ok"]:
+                totals["ok"] += 1
+            else:
+                totals["failed"] += 1
+                if len(errors) < max_errors:
+                    errors.append(r)
+
+    start = time.perf_counter()
+    chunks = _chunks(read_games(lines), chunk_size)
+    if workers <= 1:
+        for chunk in chunks:
+            collect(replay_chunk(chunk, backend))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            for chunk in chunks:
+                pending.add(pool.submit(replay_chunk, chunk, backend))
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future.result())
+            for future in pending:
+                collect(future.result())
+    seconds = time.perf_counter() - start
+    errors.sort(key=lambda r: r["index"])
+    return {
+        "backend": backend,
+        "workers": workers,
+        **totals,
+        "seconds": round(seconds, 4),
+        "games_per_sec": round(totals["games"] / seconds, 1) if seconds > 0 else None,
+        "moves_per_sec": int(totals["plies"] / seconds) if seconds > 0 else None,
+        "errors": errors,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a PGN archive through the engine")
+    parser.add_argument("path", help="PGN file, or - for stdin")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="replay processes (default: CPU count; 1 = in this process)")
+    parser.add_argument("--backend", default="list", choices=["list", "bitboard"])
+    parser.add_argument("--chunk-size", type=int, default=64, help="games per task sent to a worker")
+    parser.add_argument("--max-errors", type=int, default=20, help="failed games to list in the report")
+    args = parser.parse_args(argv)
+
+    if args.path == "-":
+        report = replay_archive(sys.stdin, args.workers, args.backend, args.chunk_size, args.max_errors)
+    else:
+        with open(args.path, encoding="utf-8", errors="replace") as f:
+            report = replay_archive(f, args.workers, args.backend, args.chunk_size, args.max_errors)
+    print(json.dumps(report, indent=2))
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
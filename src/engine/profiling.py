@@ -0,0 +1,223 @@
+"""Opt-in profiling for engine calls.
+
+Profile_Capture (a context manager; profiled() is the decorator form) records a block with
+cProfile (a .prof file for pstats/snakeviz) or with a sampling thread that writes collapsed
+stacks ("a;b;c 12" per line, the input flamegraph.pl and speedscope take). Files go to
+ENGINE_PROFILE_DIR.
+
+With ENGINE_SLOW_CALLS=N, Engine.play_turn, get_game_status and search are timed and the N
+slowest calls are kept with the position they were made in (SLOW_CALLS). The wrappers are
+installed once at import, only when N > 0.
+"""
+import cProfile
+import functools
+import heapq
+import io
+import itertools
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, List, Optional, Tuple
+
+PROFILE_DIR = os.getenv("ENGINE_PROFILE_DIR", "profiles")
+SAMPLE_INTERVAL = float(os.getenv("ENGINE_SAMPLE_INTERVAL", "0.001"))
+MODES = ("cprofile", "sample")
+
+_file_ids = itertools.count()
+
+
+class Sampler:
+    """Samples one thread's Python stack every `interval` seconds from a helper thread.
+    Stacks stop at `root` (the frame that started profiling) when given, so frames above it
+    don't pad every line of the flamegraph."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL, root=None):
+        self.thread_id = thread_id
+        self.root = root
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="engine-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.splitext(os.path.basename(code.co_filename))[0]}:{code.co_name}")
+                if frame is self.root:
+                    break
+                frame = frame.f_back
+            if stack:
+                # collapsed stacks run root first
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Profile_Capture:
+    """Profile the enclosed block on the current thread and write the result to `directory`."""
+
+    def __init__(self, mode: str = "sample", label: str = "engine", directory: str = PROFILE_DIR,
+                 interval: float = SAMPLE_INTERVAL):
+        if mode not in MODES:
+            raise ValueError(f"unknown profile mode: {mode} (use {' or '.join(MODES)})")
+        self.mode = mode
+        self.label = label
+        self.directory = directory
+        self.interval = interval
+        self.path: Optional[str] = None
+        self.seconds = 0.0
+        self._profiler: Optional[cProfile.Profile] = None
+        self._sampler: Optional[Sampler] = None
+
+    def __enter__(self) -> "Profile_Capture":
+        if self.mode == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._sampler = Sampler(threading.get_ident(), self.interval, sys._getframe(1))
+            self._sampler.start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.seconds = time.perf_counter() - self._start
+        if self._profiler is not None:
+            self._profiler.disable()
+        else:
+            self._sampler.stop()
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.label}-{os.getpid()}-{next(_file_ids)}"
+        if self._profiler is not None:
+            self.path = os.path.join(self.directory, name + ".prof")
+            self._profiler.dump_stats(self.path)
+        else:
+            self.path = os.path.join(self.directory, name + ".folded")
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(self._sampler.collapsed())
+
+    def summary(self, limit: int = 10) -> dict:
+        """Path, duration and the top entries: functions by cumulative time (cprofile) or the
+        hottest stacks (sample)."""
+        if self._profiler is not None:
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+            top = [line for line in out.getvalue().splitlines() if line.strip()][-limit:]
+        else:
+            top = [f"{stack} {count}" for stack, count in self._sampler.stacks.most_common(limit)]
+        return {"mode": self.mode, "path": self.path, "seconds": round(self.seconds, 4), "top": top}
+
+
+def profiled(mode: str = "sample", label: Optional[str] = None, directory: str = PROFILE_DIR):
+    """Decorator: profile every call of the function."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with Profile_Capture(mode, label or fn.__name__, directory):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def run_profiled(mode: str, label: str, directory: str, fn: Callable, *args):
+    """(fn(*args), profile summary). Module level, so process pools can run it."""
+    capture = Profile_Capture(mode, label, directory)
+    with capture:
+        result = fn(*args)
+    return result, capture.summary()
+
+
+class Slow_Calls:
+    """The `capacity` slowest calls seen, kept in a min-heap so a fast call costs one compare."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.heap: List[Tuple[float, int, dict]] = []
+        self.lock = threading.Lock()
+        self._ids = itertools.count()
+
+    def qualifies(self, seconds: float) -> bool:
+        return len(self.heap) < self.capacity or seconds > self.heap[0][0]
+
+    def add(self, seconds: float, entry: dict) -> None:
+        with self.lock:
+            item = (seconds, next(self._ids), entry)
+            if len(self.heap) < self.capacity:
+                heapq.heappush(self.heap, item)
+            elif seconds > self.heap[0][0]:
+                heapq.heapreplace(self.heap, item)
+
+    def entries(self) -> List[dict]:
+        with self.lock:
+            return [entry for _, _, entry in sorted(self.heap, key=lambda item: -item[0])]
+
+    def clear(self) -> None:
+        with self.lock:
+            self.heap = []
+
+
+SLOW_CALLS = Slow_Calls(int(os.getenv("ENGINE_SLOW_CALLS", "0")))
+
+
+def _position_before(engine, name: str, args: tuple, kwargs: dict, history_len: int) -> str:
+    board = engine.board
+    if name == "play_turn" and len(board.history) > history_len:
+        # the move went through: step back to where it was asked (slow path only)
+        board.undo_move()
+        try:
+            return board.to_fen()
+        finally:
+            board.save_move(*args, **kwargs)
+    return board.to_fen()
+
+
+def _watched(fn, name: str):
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        history_len = len(self.board.history)
+        start = time.perf_counter()
+        result = fn(self, *args, **kwargs)
+        seconds = time.perf_counter() - start
+        if SLOW_CALLS.qualifies(seconds):
+            SLOW_CALLS.add(seconds, {
+                "call": name,
+                "seconds": round(seconds, 6),
+                "fen": _position_before(self, name, args, kwargs, history_len),
+                "args": [list(a) if isinstance(a, tuple) else a for a in args] + [f"{k}={v}" for k, v in kwargs.items()],
+                "at": time.time(),
+            })
+        return result
+    return wrapper
+
+
+_installed = False
+
+
+def install() -> None:
+    global _installed
+    if _installed:
+        return
+    from .engine import Engine
+
+    for name in ("play_turn", "get_game_status", "search"):
+        setattr(Engine, name, _watched(getattr(Engine, name), name))
+    _installed = True
+
+
+if SLOW_CALLS.capacity > 0:
+    install()
@@ -0,0 +1,260 @@
+import time
+from typing import Callable, List, Optional, Tuple
+
+from .evaluation import evaluate, PIECE_VALUES
+from .notation import move_name
+from .move_ordering import Move_Ordering
+from .transposition import Transposition_Table, shared_table, EXACT, LOWER, UPPER
+from .tablebase import Tablebase, shared_tablebase
+
+MATE_SCORE = 100000
+INFINITY = 1000000
+MAX_PLY = 64
+#used when neither a depth nor a movetime is given
+DEFAULT_DEPTH = 4
+#quiescence skips captures that can't lift the score to alpha even with this much to spare
+DELTA_MARGIN = 200
+
+Move = Tuple[int, int, int, int, Optional[str]]
+
+
+class Search_Timeout(Exception):
+    """Raised inside the tree when the movetime budget runs out."""
+
+
+class Search:
+    """Negamax alpha-beta with iterative deepening over Legality and the board's make/undo."""
+
+    def __init__(self, board, legality, tt: Optional[Transposition_Table] = None,
+                 tablebase: Optional[Tablebase] = None):
+        self.board = board
+        self.legality = legality
+        # transposition table; the process-wide one is picked up on first search
+        self.tt = tt
+        # endgame tables scored exactly inside the tree; defaults to the CHESS_TB_DIR one
+        self.tablebase = tablebase or shared_tablebase()
+        self.tb_hits = 0
+        # killers and history survive across iterations (and decay between searches)
+        self.ordering = Move_Ordering()
+        self.nodes = 0
+        self.qnodes = 0
+        self.deadline = None
+        # pv_table[ply] holds the best line found from that ply
+        self.pv_table: List[List[Move]] = [[] for _ in range(MAX_PLY + 1)]
+
+    def search(self, depth: Optional[int] = None, movetime: Optional[float] = None,
+               on_iteration: Optional[Callable[[dict], None]] = None) -> dict:
+        """Search the current position.
+
+        depth: maximum iteration depth in plies; movetime: budget in seconds.
+        Depth 1 always completes so there is a move to play. Each finished iteration is
+        reported through `on_iteration` and collected in the result's "iterations".
+        """
+        if depth is None:
+            depth = MAX_PLY if movetime is not None else DEFAULT_DEPTH
+        start = time.perf_counter()
+        if self.tt is None:
+            self.tt = shared_table()
+        self.tt.new_search()
+        self.ordering.new_search()
+        self.nodes = 0
+        self.qnodes = 0
+        self.tb_hits = 0
+        self.deadline = None
+        best_move, best_score, pv = None, 0, []
+        iterations = []
+
+        for current in range(1, min(depth, MAX_PLY) + 1):
+            if movetime is not None and current > 1:
+                self.deadline = start + movetime
+            try:
+                score = self.negamax(current, -INFINITY, INFINITY, 0, pv[0] if pv else None)
+            except Search_Timeout:
+                break
+            pv = list(self.pv_table[0])
+            best_move, best_score = (pv[0] if pv else None), score
+            elapsed = time.perf_counter() - start
+            stats = {
+                "depth": current,
+                "score": score,
+                "nodes": self.nodes,
+                "qnodes": self.qnodes,
+                "nps": int(self.nodes / elapsed) if elapsed > 0 else None,
+                "time": round(elapsed, 4),
+                "pv": [move_name(m) for m in pv],
+            }
+            iterations.append(stats)
+            if on_iteration:
+                on_iteration(stats)
+            if best_move is None or abs(score) >= MATE_SCORE - MAX_PLY:
+                break   # no legal moves, or a forced mate was found
+            # the next iteration costs several times this one; don't start what can't finish
+            if movetime is not None and elapsed > movetime / 2:
+                break
+
+        elapsed = time.perf_counter() - start
+        return {
+            "best_move": best_move,
+            "move": move_name(best_move) if best_move else None,
+            "score": best_score,
+            "depth": iterations[-1]["depth"] if iterations else 0,
+            "pv": [move_name(m) for m in pv],
+            "nodes": self.nodes,
+            "qnodes": self.qnodes,
+            "nps": int(self.nodes / elapsed) if elapsed > 0 else None,
+            "time": round(elapsed, 4),
+            "iterations": iterations,
+            "tt": self.tt.stats(),
+            "tb_hits": self.tb_hits,
+            "book": False,
+        }
+
+    def negamax(self, depth: int, alpha: int, beta: int, ply: int, pv_move: Optional[Move] = None) -> int:
+        if depth == 0:
+            self.pv_table[ply] = []
+            return self.quiescence(alpha, beta, ply)
+        self.nodes += 1
+        if self.deadline is not None and self.nodes & 1023 == 0 and time.perf_counter() > self.deadline:
+            raise Search_Timeout()
+        self.pv_table[ply] = []
+        if ply >= MAX_PLY:
+            return evaluate(self.board)
+        if ply > 0 and self.tablebase is not None:
+            score = self.probe_tablebase(ply)
+            if score is not None:
+                return score
+
+        board = self.board
+        key = board.zobrist_key
+        entry = self.tt.probe(key)
+        hash_move = pv_move
+        if entry is not None:
+            tt_depth, bound, tt_score, tt_move = entry
+            hash_move = hash_move or tt_move
+            # never cut at the root, so the root always has a move and a PV
+            if ply > 0 and tt_depth >= depth:
+                tt_score = score_from_tt(tt_score, ply)
+                if bound == EXACT:
+                    return tt_score
+                if bound == LOWER and tt_score >= beta:
+                    return tt_score
+                if bound == UPPER and tt_score <= alpha:
+                    return tt_score
+
+        color = board.color
+        moves = self.legality.get_all_legal_moves_with_promotions(color)
+        if not moves:
+            # mated (prefer the longest defence / shortest mate) or stalemate
+            return -MATE_SCORE + ply if self.legality.is_check(color) else 0
+
+        alpha_orig = alpha
+        best_score, best_move = -INFINITY, None
+        for move in self.ordering.pick(board, moves, hash_move, ply):
+            board.save_move(*move)
+            try:
+                score = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                board.undo_move()
+            if score > best_score:
+                best_score, best_move = score, move
+            if score > alpha:
+                alpha = score
+                self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+                if alpha >= beta:
+                    if not move[4] and not self.ordering.is_capture(board.board, move):
+                        self.ordering.record_cutoff(move, color, ply, depth)
+                    break
+
+        if best_score >= beta:
+            bound = LOWER
+        elif best_score > alpha_orig:
+            bound = EXACT
+        else:
+            bound = UPPER
+        self.tt.store(key, depth, bound, score_to_tt(best_score, ply), best_move)
+        return best_score
+
+    def quiescence(self, alpha: int, beta: int, ply: int) -> int:
+        """Resolve captures and promotions below the horizon so leaves are quiet.
+        Out of check the side to move may stand pat; in check every evasion is searched.
+        """
+        self.nodes += 1
+        self.qnodes += 1
+        if self.deadline is not None and self.nodes & 1023 == 0 and time.perf_counter() > self.deadline:
+            raise Search_Timeout()
+        board = self.board
+        if ply >= MAX_PLY:
+            return evaluate(board)
+        if self.tablebase is not None:
+            score = self.probe_tablebase(ply)
+            if score is not None:
+                return score
+
+        color = board.color
+        in_check = self.legality.is_check(color)
+        if in_check:
+            moves = self.legality.get_all_legal_moves_with_promotions(color)
+            if not moves:
+                return -MATE_SCORE + ply
+            stand_pat = best_score = -INFINITY
+        else:
+            stand_pat = best_score = evaluate(board)
+            if stand_pat >= beta:
+                return stand_pat
+            if stand_pat > alpha:
+                alpha = stand_pat
+            moves = self.legality.get_all_legal_captures(color)
+
+        for move in self.ordering.pick(board, moves, None, ply):
+            if not in_check and not move[4]:
+                # delta pruning: even winning this piece for free leaves us below alpha
+                victim = board.board[move[2]][move[3]]
+                gain = PIECE_VALUES[victim[1]] if victim != "--" else PIECE_VALUES["P"]
+                if stand_pat + gain + DELTA_MARGIN <= alpha:
+                    continue
+            board.save_move(*move)
+            try:
+                score = -self.quiescence(-beta, -alpha, ply + 1)
+            finally:
+                board.undo_move()
+            if score > best_score:
+                best_score = score
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+        return best_score
+
+    def probe_tablebase(self, ply: int) -> Optional[int]:
+        """Exact score from the endgame tables, as a mate score counted from the root, or None."""
+        board = self.board
+        # phase counts N/B 1, R 2, Q 4: more than two non-king pieces can't be below 9
+        if board.phase > 8:
+            return None
+        hit = self.tablebase.probe(board)
+        if hit is None:
+            return None
+        self.tb_hits += 1
+        wdl, dtm = hit
+        if wdl > 0:
+            return MATE_SCORE - ply - dtm
+        if wdl < 0:
+            return -MATE_SCORE + ply + dtm
+        return 0
+
+
+#mate scores are stored relative to the node so they stay valid when reached at another ply
+def score_to_tt(score: int, ply: int) -> int:
+    if score >= MATE_SCORE - MAX_PLY:
+        return score + ply
+    if score <= -MATE_SCORE + MAX_PLY:
+        return score - ply
+    return score
+
+
+def score_from_tt(score: int, ply: int) -> int:
+    if score >= MATE_SCORE - MAX_PLY:
+        return score - ply
+    if score <= -MATE_SCORE + MAX_PLY:
+        return score + ply
+    return score
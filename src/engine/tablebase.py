@@ -0,0 +1,504 @@
+"""Endgame tablebases for up to four pieces (kings included), built by retrograde analysis.
+
+A table covers one material set, named white pieces "v" black pieces ("KQvK", "KRvKP").
+It holds one signed byte per index, where
+    index = side * 64**n + sq_0 * 64**(n-1) + ... + sq_(n-1)
+with side 0 = white to move and sq_i = row*8+col of the i-th piece in name order. Values are
+from the side to move: 0 draw, d+1 win in d plies, -(d+1) lost in d plies (-1: checkmated),
+ILLEGAL for impossible placements. Only the stronger side is stored as white; the other
+orientation is probed by mirroring the board. Positions with castling rights or a possible
+en passant capture aren't covered.
+
+Generate (subtables first, automatically) and probe:
+    python -m src.engine.tablebase generate KQvK KRvK KPvK --workers 8
+    python -m src.engine.tablebase generate --all 3
+    python -m src.engine.tablebase probe --fen "8/8/8/4k3/8/8/8/KQ6 w - - 0 1"
+"""
+import argparse
+import itertools
+import json
+import mmap
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .bitboard import KING_ATTACKS, KNIGHT_ATTACKS, PAWN_ATTACKS, bishop_attacks, rook_attacks
+from .zobrist import castle_rights
+
+ILLEGAL = -128
+#generation only: not resolved yet (wins never reach 127: 4-piece mates are far shorter)
+_UNKNOWN = 127
+MAX_PIECES = 4
+ORDER = "KQRBNP"
+STRENGTH = {"K": 0, "Q": 9, "R": 5, "B": 3, "N": 3, "P": 1}
+
+#table files live here for Engine/Search; unset means no tablebases
+TB_DIR = os.getenv("CHESS_TB_DIR", "")
+#indices per task handed to a worker
+CHUNK = 1 << 15
+
+Piece_Squares = List[Tuple[str, int]]
+
+
+def parse_material(name: str) -> List[str]:
+    """"KQvK" -> ["wK", "wQ", "bK"]."""
+    white, _, black = name.upper().partition("V")
+    if not white.startswith("K") or not black.startswith("K") or any(k not in ORDER for k in white + black):
+        raise ValueError(f"invalid material: {name}")
+    return ["w" + k for k in white] + ["b" + k for k in black]
+
+
+def material_name(pieces: List[str]) -> str:
+    side = lambda color: "".join(sorted((p[1] for p in pieces if p[0] == color), key=ORDER.index))
+    return side("w") + "v" + side("b")
+
+
+def _flipped(name: str) -> str:
+    white, black = name.split("v")
+    return black + "v" + white
+
+
+def canonical(name: str) -> str:
+    """The orientation that is stored: stronger side white, ties broken by piece order."""
+    white, black = name.split("v")
+    rank = lambda side: (sum(STRENGTH[k] for k in side), [-ORDER.index(k) for k in side])
+    return name if rank(white) >= rank(black) else _flipped(name)
+
+
+def _attacks(piece: str, sq: int, occupied: int) -> int:
+    kind = piece[1]
+    if kind == "K":
+        return KING_ATTACKS[sq]
+    if kind == "N":
+        return KNIGHT_ATTACKS[sq]
+    if kind == "B":
+        return bishop_attacks(sq, occupied)
+    if kind == "R":
+        return rook_attacks(sq, occupied)
+    if kind == "Q":
+        return rook_attacks(sq, occupied) | bishop_attacks(sq, occupied)
+    return PAWN_ATTACKS[piece[0]][sq]
+
+
+def _attacked(pieces: List[str], sqs: List[int], target: int, by: str, occupied: int, skip: int = -1) -> bool:
+    for i, piece in enumerate(pieces):
+        if i != skip and piece[0] == by and _attacks(piece, sqs[i], occupied) >> target & 1:
+            return True
+    return False
+
+
+def _bits(bb: int) -> Iterator[int]:
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+class Table:
+    """One material set, backed by a file (mmap) or a bytearray while generating."""
+
+    def __init__(self, name: str, data):
+        self.name = name
+        self.pieces = parse_material(name)
+        self.n = len(self.pieces)
+        self.data = data
+
+    def index(self, side: int, sqs: List[int]) -> int:
+        idx = side
+        for sq in sqs:
+            idx = idx * 64 + sq
+        return idx
+
+    def decode(self, idx: int) -> Tuple[int, List[int]]:
+        sqs = []
+        for _ in range(self.n):
+            idx, sq = divmod(idx, 64)
+            sqs.append(sq)
+        return idx, sqs[::-1]
+
+    def value(self, idx: int) -> int:
+        v = self.data[idx]
+        return v - 256 if v > 127 else v    # bytes are unsigned
+
+
+class Tablebase:
+    """Table files in one directory, opened on first use."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.tables: Dict[str, Optional[Table]] = {}
+        names = [f[:-3] for f in os.listdir(directory) if f.endswith(".tb")] if os.path.isdir(directory) else []
+        self.max_pieces = max((len(parse_material(n)) for n in names), default=2)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name + ".tb")
+
+    def table(self, name: str) -> Optional[Table]:
+        if name not in self.tables:
+            table = None
+            if os.path.exists(self.path(name)):
+                with open(self.path(name), "rb") as f:
+                    table = Table(name, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            self.tables[name] = table
+        return self.tables[name]
+
+    def probe_pieces(self, placed: Piece_Squares, side: str) -> Optional[int]:
+        """Table value for `side` to move with these (piece, square) pairs, or None if no table."""
+        if len(placed) == 2:
+            return 0    # bare kings
+        name = material_name([p for p, _ in placed])
+        stored = canonical(name)
+        if stored != name:
+            # mirror: swap colors, flip ranks
+            placed = [(("b" if p[0] == "w" else "w") + p[1], sq ^ 56) for p, sq in placed]
+            side = "b" if side == "w" else "w"
+        table = self.table(stored)
+        if table is None:
+            return None
+        remaining = list(placed)
+        sqs = []
+        for piece in table.pieces:
+            for i, (p, sq) in enumerate(remaining):
+                if p == piece:
+                    sqs.append(sq)
+                    del remaining[i]
+                    break
+        return table.value(table.index(0 if side == "w" else 1, sqs))
+
+    def probe(self, board_obj) -> Optional[Tuple[int, int]]:
+        """(wdl, dtm) for the side to move: wdl 1/0/-1, dtm in plies (0 when drawn or mated).
+        None when the position isn't covered."""
+        board = board_obj.board
+        if board_obj.backend == "bitboard":
+            if bin(board_obj.occupied).count("1") > self.max_pieces:
+                return None
+        elif 64 - sum(row.count("--") for row in board) > self.max_pieces:
+            return None
+        if castle_rights(board_obj.has_moved):
+            return None
+        color = board_obj.color
+        ep = board_obj.en_passant_target
+        if ep is not None:
+            pawn_row = ep[0] + 1 if color == "w" else ep[0] - 1
+            if any(0 <= c < 8 and board[pawn_row][c] == color + "P" for c in (ep[1] - 1, ep[1] + 1)):
+                return None
+        placed = [(board[r][c], r * 8 + c) for r in range(8) for c in range(8) if board[r][c] != "--"]
+        value = self.probe_pieces(placed, color)
+        if value is None or value == ILLEGAL:
+            return None
+        if value > 0:
+            return 1, value - 1
+        if value < 0:
+            return -1, -value - 1
+        return 0, 0
+
+
+_shared_tablebase = None
+
+
+def shared_tablebase() -> Optional[Tablebase]:
+    """Process-wide tablebase from CHESS_TB_DIR; None when unset."""
+    global _shared_tablebase
+    if _shared_tablebase is None and TB_DIR:
+        _shared_tablebase = Tablebase(TB_DIR)
+    return _shared_tablebase
+
+
+# ----- generation -----
+
+#per worker process: the table being built and the tablebase for its subtables
+_job: Dict[str, object] = {}
+
+
+def _init_job(name: str, directory: str) -> None:
+    _job["table"] = Table(name, None)
+    _job["tb"] = Tablebase(directory)
+
+
+def _moves(table: Table, tb: Tablebase, side: int, sqs: List[int]):
+    """Forward moves: ("in", index) inside this table, ("out", value for the opponent) for
+    captures and promotions, which leave it. Yields nothing for illegal moves."""
+    pieces = table.pieces
+    color = "wb"[side]
+    enemy = "wb"[1 - side]
+    occupied = own = 0
+    for piece, sq in zip(pieces, sqs):
+        occupied |= 1 << sq
+        if piece[0] == color:
+            own |= 1 << sq
+    king = pieces.index(color + "K")
+    for i, piece in enumerate(pieces):
+        if piece[0] != color:
+            continue
+        sq = sqs[i]
+        if piece[1] == "P":
+            step = -8 if color == "w" else 8
+            targets = PAWN_ATTACKS[color][sq] & occupied & ~own
+            if not occupied >> (sq + step) & 1:
+                targets |= 1 << (sq + step)
+                if sq >> 3 == (6 if color == "w" else 1) and not occupied >> (sq + 2 * step) & 1:
+                    targets |= 1 << (sq + 2 * step)
+        else:
+            targets = _attacks(piece, sq, occupied) & ~own
+        for t in _bits(targets):
+            captured = sqs.index(t) if occupied >> t & 1 else -1
+            moved = list(sqs)
+            moved[i] = t
+            after = (occupied & ~(1 << sq)) | (1 << t)
+            if _attacked(pieces, moved, moved[king], enemy, after, skip=captured):
+                continue
+            promotes = piece[1] == "P" and t >> 3 in (0, 7)
+            if captured < 0 and not promotes:
+                yield "in", table.index(1 - side, moved)
+                continue
+            placed = [(p, s) for j, (p, s) in enumerate(zip(pieces, moved)) if j != captured]
+            for promotion in ("Q", "R", "B", "N") if promotes else (None,):
+                if promotion:
+                    placed[i if captured < 0 or captured > i else i - 1] = (color + promotion, t)
+                value = tb.probe_pieces(placed, enemy)
+                if value is None:
+                    raise RuntimeError(f"{table.name} needs a missing subtable for {material_name([p for p, _ in placed])}")
+                yield "out", value
+
+
+def _legal(table: Table, side: int, sqs: List[int]) -> bool:
+    if len(set(sqs)) != len(sqs):
+        return False
+    pieces = table.pieces
+    for piece, sq in zip(pieces, sqs):
+        if piece[1] == "P" and sq >> 3 in (0, 7):
+            return False
+    occupied = 0
+    for sq in sqs:
+        occupied |= 1 << sq
+    waiting = "wb"[1 - side]
+    return not _attacked(pieces, sqs, sqs[pieces.index(waiting + "K")], "wb"[side], occupied)
+
+
+def _init_chunk(start: int):
+    """First pass over [start, start+CHUNK): illegal/mate/stalemate, how many moves each position
+    has left to refute, and the levels at which its exits resolve it."""
+    table, tb = _job["table"], _job["tb"]
+    stop = min(start + CHUNK, 2 * 64 ** table.n)
+    values = array("b", [_UNKNOWN]) * (stop - start)
+    remaining = array("B", [0]) * (stop - start)
+    # (level, index) pairs as flat arrays: big tables have millions of exits
+    wins, losses = array("L"), array("L")
+    for idx in range(start, stop):
+        side, sqs = table.decode(idx)
+        if not _legal(table, side, sqs):
+            values[idx - start] = ILLEGAL
+            continue
+        count = 0
+        blocked = False     # a drawing exit: this position can't be lost
+        for kind, payload in _moves(table, tb, side, sqs):
+            if kind == "in":
+                count += 1
+            elif payload < 0:
+                # opponent lost in -payload-1 plies after this exit, so we win one ply later
+                wins.extend((-payload, idx))
+                blocked = True
+            elif payload > 0:
+                count += 1
+                losses.extend((payload, idx))
+            else:
+                blocked = True
+        if count == 0 and not blocked:
+            color = "wb"[side]
+            pieces = table.pieces
+            occupied = 0
+            for sq in sqs:
+                occupied |= 1 << sq
+            in_check = _attacked(pieces, sqs, sqs[pieces.index(color + "K")], "wb"[1 - side], occupied)
+            values[idx - start] = -1 if in_check else 0
+            continue
+        remaining[idx - start] = min(count + blocked, 255)
+    return start, values.tobytes(), remaining.tobytes(), wins, losses
+
+
+def _predecessors(indices: List[int]) -> array:
+    """Every index one non-capturing, non-promoting move before each of `indices` (legal or not)."""
+    table = _job["table"]
+    pieces = table.pieces
+    found = array("L")
+    for idx in indices:
+        side, sqs = table.decode(idx)
+        mover = "wb"[1 - side]
+        occupied = 0
+        for sq in sqs:
+            occupied |= 1 << sq
+        for i, piece in enumerate(pieces):
+            if piece[0] != mover:
+                continue
+            sq = sqs[i]
+            if piece[1] == "P":
+                back = 8 if mover == "w" else -8
+                origins = 0
+                row = sq >> 3
+                if (row <= 5 if mover == "w" else row >= 2) and not occupied >> (sq + back) & 1:
+                    origins |= 1 << (sq + back)
+                    if row == (4 if mover == "w" else 3) and not occupied >> (sq + 2 * back) & 1:
+                        origins |= 1 << (sq + 2 * back)
+            else:
+                # leapers and sliders move the same way backwards
+                origins = _attacks(piece, sq, occupied) & ~occupied
+            for origin in _bits(origins):
+                moved = list(sqs)
+                moved[i] = origin
+                found.append(table.index(1 - side, moved))
+    return found
+
+
+def _split(items: List[int], size: int) -> List[List[int]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def generate_table(name: str, directory: str, workers: int = 1, log=print) -> dict:
+    """Build one table (its subtables must already exist) and write <directory>/<name>.tb."""
+    name = canonical(name)
+    table = Table(name, None)
+    size = 2 * 64 ** table.n
+    start_time = time.perf_counter()
+    values = array("b", [_UNKNOWN]) * size
+    remaining = bytearray(size)
+    win_events: Dict[int, array] = {}
+    loss_events: Dict[int, array] = {}
+
+    pool = ProcessPoolExecutor(workers, initializer=_init_job, initargs=(name, directory)) if workers > 1 else None
+    if pool is None:
+        _init_job(name, directory)
+    run = pool.map if pool is not None else map
+    try:
+        for start, chunk_values, chunk_remaining, wins, losses in run(_init_chunk, range(0, size, CHUNK)):
+            values[start:start + CHUNK] = array("b", chunk_values)
+            remaining[start:start + CHUNK] = chunk_remaining
+            for events, pairs in ((win_events, wins), (loss_events, losses)):
+                for i in range(0, len(pairs), 2):
+                    events.setdefault(pairs[i], array("L")).append(pairs[i + 1])
+
+        # level-by-level retrograde: positions resolved at `level` decide their predecessors at level+1
+        lost = [i for i in range(size) if values[i] == -1]
+        won: List[int] = []
+        level = 0
+        last_event = max(list(win_events) + list(loss_events), default=0)
+        while lost or won or level < last_event:
+            next_won, next_lost = [], []
+            for preds in run(_predecessors, _split(lost, 4096)):
+                for q in preds:
+                    if values[q] == _UNKNOWN:
+                        values[q] = level + 2       # win in level+1 plies
+                        next_won.append(q)
+            for q in win_events.pop(level + 1, ()):
+                if values[q] == _UNKNOWN:
+                    values[q] = level + 2
+                    next_won.append(q)
+            refuted = itertools.chain.from_iterable(run(_predecessors, _split(won, 4096)))
+            for q in itertools.chain(refuted, loss_events.pop(level + 1, ())):
+                if values[q] == _UNKNOWN:
+                    remaining[q] -= 1
+                    if remaining[q] == 0:
+                        values[q] = -(level + 2)    # lost in level+1 plies
+                        next_lost.append(q)
+            won, lost = next_won, next_lost
+            level += 1
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    counts = {"win": 0, "draw": 0, "loss": 0, "illegal": 0}
+    longest = 0
+    for i in range(size):
+        v = values[i]
+        if v == _UNKNOWN:
+            values[i] = v = 0
+        elif v > 0:
+            longest = max(longest, v - 1)
+        counts["illegal" if v == ILLEGAL else "win" if v > 0 else "loss" if v < 0 else "draw"] += 1
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, name + ".tb"), "wb") as f:
+        values.tofile(f)
+    report = {"table": name, **counts, "max_dtm": longest, "seconds": round(time.perf_counter() - start_time, 2)}
+    log(json.dumps(report))
+    return report
+
+
+def subtables(name: str) -> List[str]:
+    """Canonical names of the tables reachable from `name` by one capture or promotion."""
+    pieces = parse_material(name)
+    found = set()
+    for i, piece in enumerate(pieces):
+        if piece[1] == "K":
+            continue
+        rest = pieces[:i] + pieces[i + 1:]
+        if len(rest) > 2:
+            found.add(canonical(material_name(rest)))
+        if piece[1] == "P":
+            for promotion in "QRBN":
+                found.add(canonical(material_name(rest + [piece[0] + promotion])))
+    return sorted(found)
+
+
+def generate(names: List[str], directory: str, workers: int = 1, force: bool = False, log=print) -> List[dict]:
+    """Generate tables and, first, everything they depend on; existing files are kept unless `force`."""
+    if not names:
+        raise ValueError("no tables requested")
+    done, order = set(), []
+
+    def visit(name: str) -> None:
+        name = canonical(name)
+        if name in done:
+            return
+        if len(parse_material(name)) > MAX_PIECES:
+            raise ValueError(f"{name}: at most {MAX_PIECES} pieces")
+        done.add(name)
+        for sub in subtables(name):
+            visit(sub)
+        order.append(name)
+
+    for name in names:
+        visit(name)
+    reports = []
+    for name in order:
+        if force and name in {canonical(n) for n in names} or not os.path.exists(os.path.join(directory, name + ".tb")):
+            reports.append(generate_table(name, directory, workers, log))
+    return reports
+
+
+def all_materials(pieces: int) -> List[str]:
+    """Every canonical material set with this many pieces."""
+    found = set()
+    for extra in itertools.combinations_with_replacement("QRBNP" * 2, pieces - 2):
+        for split in range(len(extra) + 1):
+            found.add(canonical(material_name(["wK", "bK"] + ["w" + k for k in extra[:split]] + ["b" + k for k in extra[split:]])))
+    return sorted(found)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Endgame tablebases")
+    sub = parser.add_subparsers(dest="command", required=True)
+    gen = sub.add_parser("generate", help="build tables (and the subtables they need)")
+    gen.add_argument("tables", nargs="*", help='material sets such as "KQvK" or "KRvKP"')
+    gen.add_argument("--all", type=int, choices=[3, 4], help="every table with this many pieces")
+    gen.add_argument("--dir", default=TB_DIR or "tablebases")
+    gen.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    gen.add_argument("--force", action="store_true", help="rebuild the named tables even if present")
+    probe = sub.add_parser("probe", help="look up a position")
+    probe.add_argument("--fen", required=True)
+    probe.add_argument("--dir", default=TB_DIR or "tablebases")
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        names = list(args.tables) + (all_materials(args.all) if args.all else [])
+        generate(names, args.dir, args.workers, args.force)
+        return 0
+    from .chess_board import create_board
+    result = Tablebase(args.dir).probe(create_board().load_fen(args.fen))
+    print(json.dumps({"fen": args.fen, "result": None if result is None else {"wdl": result[0], "dtm": result[1]}}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
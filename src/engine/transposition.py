@@ -0,0 +1,126 @@
+import os
+from array import array
+from typing import Optional, Tuple
+
+#bound types
+EXACT, LOWER, UPPER = 0, 1, 2
+
+#bytes per entry: one 64-bit key word and one 64-bit data word
+ENTRY_BYTES = 16
+DEFAULT_MB = float(os.getenv("CHESS_TT_MB", "16"))
+
+#data word layout (low to high): score+offset 22 bits | depth 7 | bound 2 | age 6 | move 15
+_SCORE_OFFSET = 1 << 21
+_PROMOTIONS = [None, "Q", "R", "B", "N"]
+_MASK64 = (1 << 64) - 1
+
+
+def encode_move(move) -> int:
+    if move is None:
+        return 0
+    r, c, nr, nc, promotion = move
+    return (r * 8 + c) | (nr * 8 + nc) << 6 | _PROMOTIONS.index(promotion) << 12
+
+
+def decode_move(code: int):
+    if code == 0:
+        return None
+    frm, to = code & 63, (code >> 6) & 63
+    return (frm >> 3, frm & 7, to >> 3, to & 7, _PROMOTIONS[code >> 12])
+
+
+class Transposition_Table:
+    """Fixed-size, array-backed hash of search results keyed by Chess_Board.zobrist_key.
+
+    Entries live in two-slot buckets. A store replaces the slot already holding the same
+    position, otherwise the slot left over from an older search, otherwise the shallower one.
+    The key word is saved xored with the data word, so an entry torn by a concurrent writer
+    just reads as a miss.
+    """
+
+    def __init__(self, size_mb: float = DEFAULT_MB):
+        self.resize(size_mb)
+
+    def resize(self, size_mb: float) -> None:
+        entries = max(2, int(size_mb * 1024 * 1024) // ENTRY_BYTES)
+        # round down to a power of two so the bucket index is a mask
+        entries = 1 << (entries.bit_length() - 1)
+        self.size_mb = entries * ENTRY_BYTES / (1024 * 1024)
+        self.entries = entries
+        self.bucket_mask = (entries - 1) & ~1
+        self.keys = array("Q", bytes(8 * entries))
+        self.data = array("Q", bytes(8 * entries))
+        self.age = 0
+        self.probes = self.hits = self.stores = self.overwrites = 0
+
+    def clear(self) -> None:
+        self.resize(self.size_mb)
+
+    def new_search(self) -> None:
+        """Mark entries from earlier searches as stale so they are replaced first."""
+        self.age = (self.age + 1) & 63
+
+    def probe(self, key: int) -> Optional[Tuple[int, int, int, Optional[tuple]]]:
+        """Return (depth, bound, score, move) stored for `key`, or None."""
+        self.probes += 1
+        index = key & self.bucket_mask
+        for slot in (index, index + 1):
+            data = self.data[slot]
+            if data and self.keys[slot] ^ data == key:
+                self.hits += 1
+                return ((data >> 22) & 127, (data >> 29) & 3,
+                        (data & 0x3FFFFF) - _SCORE_OFFSET, decode_move(data >> 37))
+        return None
+
+    def store(self, key: int, depth: int, bound: int, score: int, move=None) -> None:
+        index = key & self.bucket_mask
+        slot = None
+        for candidate in (index, index + 1):
+            data = self.data[candidate]
+            if not data or self.keys[candidate] ^ data == key:
+                slot = candidate
+                break
+        if slot is None:
+            # both taken by other positions: evict a stale one, else the shallower one
+            first, second = self.data[index], self.data[index + 1]
+            first_stale = (first >> 31) & 63 != self.age
+            second_stale = (second >> 31) & 63 != self.age
+            if first_stale != second_stale:
+                slot = index if first_stale else index + 1
+            else:
+                slot = index if (first >> 22) & 127 <= (second >> 22) & 127 else index + 1
+            self.overwrites += 1
+        elif self.data[slot] and move is None:
+            # keep the best move we already know for this position
+            move = decode_move(self.data[slot] >> 37)
+        data = ((score + _SCORE_OFFSET) | min(depth, 127) << 22 | bound << 29
+                | self.age << 31 | encode_move(move) << 37)
+        self.data[slot] = data
+        self.keys[slot] = (key ^ data) & _MASK64
+        self.stores += 1
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.probes if self.probes else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "size_mb": self.size_mb,
+            "entries": self.entries,
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": round(self.hit_rate, 4),
+            "stores": self.stores,
+            "overwrites": self.overwrites,
+        }
+
+
+_shared_table: Optional[Transposition_Table] = None
+
+
+def shared_table() -> Transposition_Table:
+    """Process-wide table (sized by CHESS_TT_MB), so memory stays fixed however many games run."""
+    global _shared_table
+    if _shared_table is None:
+        _shared_table = Transposition_Table(DEFAULT_MB)
+    return _shared_table
@@ -0,0 +1,48 @@
+import random
+from typing import Dict
+
+#fixed seed so keys are stable across processes (caches and stored games can share them)
+_rng = random.Random(0x5EED_C0DE)
+
+PIECE_KEYS: Dict[str, list] = {
+    piece: [_rng.getrandbits(64) for _ in range(64)]
+    for piece in ["wP", "wN", "wB", "wR", "wQ", "wK", "bP", "bN", "bB", "bR", "bQ", "bK"]
+}
+#xored in when black is to move
+SIDE_KEY = _rng.getrandbits(64)
+#one key per castling-rights combination (see castle_rights)
+CASTLE_KEYS = [_rng.getrandbits(64) for _ in range(16)]
+#one key per en passant file
+EP_KEYS = [_rng.getrandbits(64) for _ in range(8)]
+
+
+def castle_rights(has_moved) -> int:
+    """Pack the castling rights implied by has_moved into 4 bits: K=1, Q=2, k=4, q=8."""
+    rights = 0
+    if has_moved["wK"] == 0:
+        if has_moved["wR2"] == 0:
+            rights |= 1
+        if has_moved["wR1"] == 0:
+            rights |= 2
+    if has_moved["bK"] == 0:
+        if has_moved["bR2"] == 0:
+            rights |= 4
+        if has_moved["bR1"] == 0:
+            rights |= 8
+    return rights
+
+
+def compute_key(board_obj) -> int:
+    """Hash a position from scratch. Chess_Board keeps the same value up to date incrementally."""
+    key = 0
+    for row in range(8):
+        for col in range(8):
+            piece = board_obj.board[row][col]
+            if piece != "--":
+                key ^= PIECE_KEYS[piece][row * 8 + col]
+    if board_obj.color == "b":
+        key ^= SIDE_KEY
+    key ^= CASTLE_KEYS[castle_rights(board_obj.has_moved)]
+    if board_obj.en_passant_target is not None:
+        key ^= EP_KEYS[board_obj.en_passant_target[1]]
+    return key
@@ -0,0 +1,212 @@
+import asyncio
+import secrets
+import time
+from typing import Dict, List, Optional
+
+from src.engine.chess_board import create_board
+from src.engine.engine import Engine
+from src.engine.notation import move_name
+from src.server.workers import Engine_Pool, Pool_Saturated
+
+#what /analyze can report per position
+ANALYSES = ("status", "moves", "best_move")
+
+
+class Too_Many_Jobs(Exception):
+    """Every analysis slot is taken by a running job; the caller should answer 429."""
+
+
+#worker entry points: plain data in and out, so they run on threads or processes alike
+def analyze_position(fen: str, options: dict) -> dict:
+    """One position's requested analyses; a bad FEN is reported, never raised."""
+    try:
+        board = create_board(options.get("backend", "list")).load_fen(fen)
+    except ValueError as e:
+        return {"fen": fen, "error": str(e), "code": "invalid_fen"}
+    engine = Engine(board)
+    result = {"fen": fen}
+    include = options["include"]
+    if "status" in include:
+        status, winner = engine.get_game_status()
+        result["game_status"] = {"status": status, "winner": winner}
+        result["endgame"] = engine.probe_tablebase()
+    if "moves" in include:
+        result["legal_moves"] = [move_name(m) for m in engine.legality.get_all_legal_moves_with_promotions(board.color)]
+    if "best_move" in include:
+        search = engine.search(depth=options.get("depth"), movetime=options.get("movetime"))
+        result["best_move"] = {k: search[k] for k in ("move", "score", "depth", "pv", "nodes", "nps", "time", "book")}
+    return result
+
+
+def analyze_chunk(items: List[tuple], options: dict) -> List[dict]:
+    """Analyze (index, fen) pairs. With options["stop_at"] (epoch seconds) the worker stops
+    there itself: positions it hasn't started are left out and searches get the time left."""
+    stop_at = options.get("stop_at")
+    results = []
+    for index, fen in items:
+        if stop_at is not None:
+            remaining = stop_at - time.time()
+            if remaining <= 0:
+                break
+            options = {**options, "movetime": min(options.get("movetime") or remaining, remaining)}
+        results.append({"index": index, **analyze_position(fen, options)})
+    return results
+
+
+class Analysis_Job:
+    """A batch of positions worked through in chunks on the engine pool.
+
+    Results are kept by position and in completion order (`finished`), so pollers can ask for
+    everything after the last one they saw and streams can follow along.
+    """
+
+    def __init__(self, positions: List[str], options: dict, deadline: float):
+        self.job_id = secrets.token_urlsafe(12)
+        self.positions = positions
+        self.options = options
+        self.deadline_seconds = deadline
+        self.created = time.time()
+        self.finished_at: Optional[float] = None
+        self.status = "queued"
+        self.results: List[Optional[dict]] = [None] * len(positions)
+        self.finished: List[dict] = []
+        self.task: Optional[asyncio.Task] = None
+        self._update = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "expired", "cancelled")
+
+    def _record(self, results: List[dict]) -> None:
+        if self.status == "cancelled":
+            return
+        for result in results:
+            if self.results[result["index"]] is None:
+                self.results[result["index"]] = result
+                self.finished.append(result)
+        self._notify()
+
+    def _notify(self) -> None:
+        # wake everyone waiting and start a fresh event for the next update
+        self._update.set()
+        self._update = asyncio.Event()
+
+    async def wait(self, seen: int) -> None:
+        """Return once there are more than `seen` finished results or the job has ended."""
+        while len(self.finished) <= seen and not self.done:
+            await self._update.wait()
+
+    async def run(self, pool: Engine_Pool, slots: asyncio.Semaphore) -> None:
+        self.status = "running"
+        # searches are long: hand them out one by one so the deadline cuts in between
+        size = 1 if "best_move" in self.options["include"] else 16
+        indexed = list(enumerate(self.positions))
+        chunks = [indexed[i:i + size] for i in range(0, len(indexed), size)]
+        # wall clock, so worker processes can check it too
+        options = {**self.options, "stop_at": time.time() + self.deadline_seconds}
+
+        async def run_chunk(chunk):
+            async with slots:
+                while time.time() < options["stop_at"]:
+                    try:
+                        # the worker honours the deadline, so waiting for it keeps the slot (and the
+                        # pool's count) busy exactly as long as the worker is
+                        results = await pool.compute(analyze_chunk, chunk, options)
+                    except Pool_Saturated:
+                        # interactive games come first; try again shortly
+                        await asyncio.sleep(0.05)
+                        continue
+                    self._record(results)
+                    return
+
+        try:
+            await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+            missed = [i for i, r in enumerate(self.results) if r is None]
+            if missed:
+                self._record([{"index": i, "fen": self.positions[i], "error": "deadline exceeded",
+                               "code": "deadline_exceeded"} for i in missed])
+            self.status = "expired" if missed else "done"
+        except asyncio.CancelledError:
+            self.status = "cancelled"
+            raise
+        finally:
+            self.finished_at = self.finished_at or time.time()
+            self._notify()
+
+    def summary(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "total": len(self.positions),
+            "completed": len(self.finished),
+            "created": self.created,
+            "finished_at": self.finished_at,
+            "deadline": self.deadline_seconds,
+        }
+
+
+class Analysis_Jobs:
+    """Running and recently finished analysis jobs. At most `max_jobs` run at once, and all
+    of them together keep at most one chunk per engine worker in flight."""
+
+    def __init__(self, pool: Engine_Pool, max_jobs: int = 8, ttl_seconds: float = 600.0):
+        self.pool = pool
+        self.max_jobs = max_jobs
+        self.ttl_seconds = ttl_seconds
+        self.jobs: Dict[str, Analysis_Job] = {}
+        self.slots = asyncio.Semaphore(pool.workers)
+        self.completed = 0
+        self.cancelled = 0
+
+    def _purge(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        for job_id in [j for j, job in self.jobs.items() if job.done and job.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    def _finished(self, task: asyncio.Task) -> None:
+        if task.cancelled():
+            self.cancelled += 1
+        else:
+            self.completed += 1
+
+    def submit(self, positions: List[str], options: dict, deadline: float) -> Analysis_Job:
+        self._purge()
+        if sum(not job.done for job in self.jobs.values()) >= self.max_jobs:
+            raise Too_Many_Jobs()
+        job = Analysis_Job(positions, options, deadline)
+        job.task = asyncio.get_running_loop().create_task(job.run(self.pool, self.slots))
+        job.task.add_done_callback(self._finished)
+        self.jobs[job.job_id] = job
+        return job
+
+    async def run_inline(self, positions: List[str], options: dict, deadline: float) -> Analysis_Job:
+        """Run a small batch within the request; it shares the worker slots but isn't stored."""
+        job = Analysis_Job(positions, options, deadline)
+        await job.run(self.pool, self.slots)
+        return job
+
+    def get(self, job_id: str) -> Optional[Analysis_Job]:
+        self._purge()
+        return self.jobs.get(job_id)
+
+    def cancel(self, job: Analysis_Job) -> None:
+        if job.done:
+            return
+        # chunks already on a worker finish there; their results are dropped
+        job.status = "cancelled"
+        job.finished_at = time.time()
+        job._notify()
+        if job.task is not None:
+            job.task.cancel()
+
+    def shutdown(self) -> None:
+        for job in self.jobs.values():
+            self.cancel(job)
+
+    def stats(self) -> dict:
+        return {
+            "running": sum(not job.done for job in self.jobs.values()),
+            "stored": len(self.jobs),
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+        }
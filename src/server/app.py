@@ -1,15 +1,16 @@
+import json
 import os
 import time
 from contextlib import asynccontextmanager
-from typing import Optional
+from typing import List, Optional
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
 
 # ----- Environment -----
 ENV = os.getenv("ENV", "development")  # Default to development for local
@@ -27,10 +28,51 @@ ALLOWED_ORIGINS = [FRONTEND_ORIGIN] if IS_PRODUCTION else [
   FRONTEND_ORIGIN
 ]
 
+# Position backend for new games: "list" (8x8 strings) or "bitboard"
+BOARD_BACKEND = os.getenv("BOARD_BACKEND", "list")
+
+# Upper bound (seconds) on engine thinking time for /ai/move
+AI_MAX_MOVETIME = float(os.getenv("AI_MAX_MOVETIME", "1.0"))
+
+# Live game limits: games idle longer than the TTL, or least recently used beyond the caps, are evicted
+MAX_GAMES = int(os.getenv("MAX_GAMES", "5000"))
+GAME_TTL_SECONDS = float(os.getenv("GAME_TTL_SECONDS", str(6 * 3600)))
+MAX_GAMES_MEMORY_MB = float(os.getenv("MAX_GAMES_MEMORY_MB", "256"))
+
+# Engine work runs off the event loop: "thread" or "process" pool, worker count, and how many
+# calls may wait for a worker before requests get 503
+ENGINE_POOL = os.getenv("ENGINE_POOL", "thread")
+ENGINE_WORKERS = int(os.getenv("ENGINE_WORKERS", "0")) or None
+ENGINE_QUEUE = int(os.getenv("ENGINE_QUEUE", "32"))
+
+# Where games survive restarts: "sqlite:///path.db" or "none", and how often queued writes are flushed
+GAME_STORE = os.getenv("GAME_STORE", "sqlite:///games.sqlite3")
+GAME_FLUSH_INTERVAL = float(os.getenv("GAME_FLUSH_INTERVAL", "0.5"))
+
+# /analyze: batches up to ANALYZE_INLINE_MAX positions are answered in the request, bigger ones
+# (up to ANALYZE_MAX_POSITIONS) become jobs; at most ANALYZE_MAX_JOBS run at once, each within
+# its deadline (default / cap, seconds), and finished jobs are kept ANALYZE_JOB_TTL seconds
+ANALYZE_INLINE_MAX = int(os.getenv("ANALYZE_INLINE_MAX", "16"))
+ANALYZE_MAX_POSITIONS = int(os.getenv("ANALYZE_MAX_POSITIONS", "1000"))
+ANALYZE_MAX_JOBS = int(os.getenv("ANALYZE_MAX_JOBS", "8"))
+ANALYZE_DEADLINE = float(os.getenv("ANALYZE_DEADLINE", "60"))
+ANALYZE_MAX_DEADLINE = float(os.getenv("ANALYZE_MAX_DEADLINE", "600"))
+ANALYZE_JOB_TTL = float(os.getenv("ANALYZE_JOB_TTL", "600"))
+
 # ----- Hot-reload friendly imports -----
 if os.getenv("ENV") != "development":
-    from src.engine.chess_board import Chess_Board
+    from src.engine.chess_board import Chess_Board, create_board
     from src.engine.engine import Engine
+    from src.engine.fen import parse_fen
+    from src.engine.notation import move_name
+    from src.server.sessions import Game_Store
+    from src.server.persistence import Write_Behind, open_repository
+    from src.server.channels import board_diff
+    from src.server.workers import Engine_Pool, Pool_Saturated
+    from src.server.analysis import ANALYSES, Analysis_Jobs, Too_Many_Jobs, analyze_position
+    from src.server import metrics
+    from src.engine import profiling
+    from src.server.profiling import Profile_Middleware, is_admin
 else:
     import importlib
     from importlib import util
@@ -41,16 +83,53 @@ else:
         return getattr(module, class_name)
 
     Chess_Board = dynamic_import("src.engine.chess_board", "Chess_Board")
+    create_board = dynamic_import("src.engine.chess_board", "create_board")
     Engine = dynamic_import("src.engine.engine", "Engine")
+    parse_fen = dynamic_import("src.engine.fen", "parse_fen")
+    move_name = dynamic_import("src.engine.notation", "move_name")
+    Game_Store = dynamic_import("src.server.sessions", "Game_Store")
+    Write_Behind = dynamic_import("src.server.persistence", "Write_Behind")
+    open_repository = dynamic_import("src.server.persistence", "open_repository")
+    board_diff = dynamic_import("src.server.channels", "board_diff")
+    Engine_Pool = dynamic_import("src.server.workers", "Engine_Pool")
+    Pool_Saturated = dynamic_import("src.server.workers", "Pool_Saturated")
+    ANALYSES = dynamic_import("src.server.analysis", "ANALYSES")
+    Analysis_Jobs = dynamic_import("src.server.analysis", "Analysis_Jobs")
+    Too_Many_Jobs = dynamic_import("src.server.analysis", "Too_Many_Jobs")
+    analyze_position = dynamic_import("src.server.analysis", "analyze_position")
+    metrics = importlib.import_module("src.server.metrics")
+    profiling = importlib.import_module("src.engine.profiling")
+    Profile_Middleware = dynamic_import("src.server.profiling", "Profile_Middleware")
+    is_admin = dynamic_import("src.server.profiling", "is_admin")
+
+def new_game():
+    board = create_board(BOARD_BACKEND)
+    return board, Engine(board)
 
 # ----- Lifespan -----
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     app.state.start_time = time.time()
-    app.state.board = Chess_Board()
-    app.state.engine = Engine(app.state.board)
+    # nothing is loaded here: stored games are rebuilt on their first request
+    repository = open_repository(GAME_STORE)
+    writer = Write_Behind(repository, GAME_FLUSH_INTERVAL) if repository is not None else None
+    if writer is not None:
+        writer.start()
+    app.state.pool = Engine_Pool(ENGINE_POOL, ENGINE_WORKERS, ENGINE_QUEUE)
+    app.state.games = Game_Store(
+        new_game,
+        max_games=MAX_GAMES,
+        ttl_seconds=GAME_TTL_SECONDS,
+        max_memory_bytes=int(MAX_GAMES_MEMORY_MB * 1024 * 1024),
+        writer=writer,
+        pool=app.state.pool,
+    )
+    app.state.analysis = Analysis_Jobs(app.state.pool, ANALYZE_MAX_JOBS, ANALYZE_JOB_TTL)
     yield
-    # cleanup here if needed
+    app.state.analysis.shutdown()
+    app.state.pool.shutdown()
+    if writer is not None:
+        await writer.close()
 
 app = FastAPI(
     title="Chess Engine API",
@@ -65,6 +144,14 @@ app = FastAPI(
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])  # tighten later if desired
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 
+# Per-route latency and in-flight requests for /metrics (METRICS=0 leaves the middleware out)
+request_metrics = metrics.Request_Metrics()
+if metrics.ENABLED:
+    app.add_middleware(metrics.Metrics_Middleware, metrics=request_metrics)
+
+# X-Profile: sample|cprofile (with X-Admin-Token) profiles a request's engine calls; inert without ADMIN_TOKEN
+app.add_middleware(Profile_Middleware)
+
 # IMPORTANT: Do NOT force HTTPS here on Render; the platform handles TLS.
 # For reference, we intentionally DO NOT add HTTPSRedirectMiddleware.
 
@@ -75,7 +162,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Length", "X-Request-ID"],
+    expose_headers=["Content-Length", "X-Request-ID", "X-Profile-Files"],
     max_age=600
 )
 
@@ -97,6 +184,42 @@ class MoveBody(BaseModel):
     class Config:
         json_schema_extra = {"example": {"from_row":6,"from_col":4,"to_row":4,"to_col":4,"promotion":None}}
 
+class AiMoveBody(BaseModel):
+    movetime: Optional[float] = None
+    depth: Optional[int] = None
+
+    class Config:
+        json_schema_extra = {"example": {"movetime":0.5,"depth":None}}
+
+class NewGameBody(BaseModel):
+    fen: Optional[str] = None
+
+    class Config:
+        json_schema_extra = {"example": {"fen":"rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"}}
+
+class AnalyzeBody(BaseModel):
+    positions: List[str]
+    include: List[str] = ["status"]
+    depth: Optional[int] = None
+    movetime: Optional[float] = None
+    deadline: Optional[float] = None
+    background: bool = False
+
+    class Config:
+        json_schema_extra = {"example": {"positions":["rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"],
+                                         "include":["status","moves","best_move"],"depth":3,"deadline":30}}
+
+class ProfileBody(BaseModel):
+    fen: str
+    include: List[str] = ["status"]
+    mode: str = "sample"
+    depth: Optional[int] = None
+    movetime: Optional[float] = None
+
+    class Config:
+        json_schema_extra = {"example": {"fen":"8/8/8/4k3/8/8/4P3/4K3 w - - 0 1","include":["best_move"],
+                                         "mode":"cprofile","depth":6}}
+
 class CoordBody(BaseModel):
     row: int
     col: int
@@ -104,45 +227,57 @@ class CoordBody(BaseModel):
         json_schema_extra = {"example": {"row":1,"col":0}}
 
 # ----- Routes -----
-@app.get("/health")
-async def health_check():
-    return {"status":"healthy","timestamp":time.time(),"uptime":time.time()-app.state.start_time,"environment":ENV}
+async def get_game(game_id: str):
+    game = await app.state.games.get(game_id)
+    if game is None:
+        raise HTTPException(status_code=404, detail={"error":"Game not found","code":"game_not_found"})
+    return game
 
-@app.get("/state")
-async def get_state():
-    board = app.state.board
-    engine = app.state.engine
-    status, winner = engine.get_game_status()
+async def game_state(game):
+    # callers hold game.lock
+    board = game.board
+    status, winner = await app.state.pool.status(game)
     return {
-        "board": board.board,
+        "game_id": game.game_id,
+        "version": game.version,
+        "board": [row[:] for row in board.board],
         "turn": board.color,
         "history_len": len(board.history),
-        "has_moved": board.has_moved,
-        "game_status": {"status": status, "winner": winner}
+        "has_moved": dict(board.has_moved),
+        "fen": board.to_fen(),
+        "game_status": {"status": status, "winner": winner},
+        # exact result from the endgame tables (a single mmap read), or None
+        "endgame": game.engine.probe_tablebase(),
     }
 
-@app.post("/reset")
-async def reset():
-    app.state.board.reset_board()
-    app.state.engine.reset()
-    return await get_state()
+async def snapshot(game):
+    async with game.lock:
+        return {"type": "snapshot", **(await game_state(game))}
 
-@app.post("/undo")
-async def undo():
-    try:
-        app.state.engine.undo()
-        return await get_state()
-    except IndexError:
-        raise HTTPException(status_code=400, detail={"error":"No moves to undo","code":"no_moves_to_undo"})
-
-@app.post("/legal")
-async def legal(coord: CoordBody):
-    if not (0 <= coord.row < 8 and 0 <= coord.col < 8):
-        raise HTTPException(status_code=400, detail={"error":"Invalid coordinates","code":"invalid_coordinates"})
-    return {"legal_moves": app.state.engine.legality.get_legal_moves(coord.row, coord.col)}
+async def apply_change(game, fn, *args):
+    """Run a mutating engine call and push the resulting delta to the game's subscribers.
+    Callers hold game.lock. Returns (fn's result, delta or None if nothing changed)."""
+    before = [row[:] for row in game.board.board]
+    history_len = len(game.board.history)
+    result = await app.state.pool.call(fn, *args)
+    changes = board_diff(before, game.board.board)
+    if not changes and len(game.board.history) == history_len:
+        return result, None
+    app.state.games.update_size(game)
+    game.version += 1
+    status, winner = await app.state.pool.status(game)
+    delta = {
+        "type": "delta",
+        "version": game.version,
+        "changes": changes,
+        "turn": game.board.color,
+        "history_len": len(game.board.history),
+        "game_status": {"status": status, "winner": winner}
+    }
+    game.channel.publish(delta)
+    return result, delta
 
-@app.post("/move")
-async def move(mv: MoveBody):
+def parse_move(mv: MoveBody):
     if not (0 <= mv.from_row < 8 and 0 <= mv.from_col < 8 and 0 <= mv.to_row < 8 and 0 <= mv.to_col < 8):
         raise HTTPException(status_code=400, detail="Out of bounds")
     promotion = None
@@ -151,17 +286,344 @@ async def move(mv: MoveBody):
         if p not in {"Q","R","B","N"}:
             raise HTTPException(status_code=400, detail="Invalid promotion piece")
         promotion = p
-    success, msg = app.state.engine.play_turn(mv.from_row, mv.from_col, mv.to_row, mv.to_col, promotion)
+    return mv.from_row, mv.from_col, mv.to_row, mv.to_col, promotion
+
+async def play_move(game, move):
+    # callers hold game.lock
+    (success, msg), delta = await apply_change(game, game.engine.play_turn, *move)
     if not success:
         raise HTTPException(status_code=400, detail=msg)
-    status, winner = app.state.engine.get_game_status()
-    return {
-        "ok": True,
-        "message": msg,
-        "board": app.state.board.board,
-        "turn": app.state.board.color,
-        "game_status": {"status": status, "winner": winner}
+    game.moves.append(move_name(move))
+    app.state.games.save(game)
+    return msg, delta
+
+async def undo_move(game):
+    # callers hold game.lock
+    try:
+        _, delta = await apply_change(game, game.engine.undo)
+    except IndexError:
+        raise HTTPException(status_code=400, detail={"error":"No moves to undo","code":"no_moves_to_undo"})
+    if delta is not None:
+        game.moves.pop()
+        app.state.games.save(game)
+
+async def reset_game(game):
+    # callers hold game.lock
+    await apply_change(game, game.engine.reset)
+    game.start_fen = game.board.to_fen()
+    game.moves = []
+    app.state.games.save(game)
+
+@app.get("/health")
+async def health_check():
+    return {"status":"healthy","timestamp":time.time(),"uptime":time.time()-app.state.start_time,"environment":ENV,
+            "games":app.state.games.stats(),"engine_pool":app.state.pool.stats(),
+            "analysis":app.state.analysis.stats()}
+
+@app.post("/games")
+async def create_game(body: Optional[NewGameBody] = None):
+    if body and body.fen:
+        try:
+            position = parse_fen(body.fen)
+            game = app.state.games.create(position)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail={"error":str(e),"code":"invalid_fen"})
+    else:
+        game = app.state.games.create()
+    async with game.lock:
+        return await game_state(game)
+
+@app.delete("/games/{game_id}")
+async def delete_game(game_id: str):
+    if not await app.state.games.delete(game_id):
+        raise HTTPException(status_code=404, detail={"error":"Game not found","code":"game_not_found"})
+    return {"ok": True}
+
+@app.get("/games/{game_id}/state")
+async def get_state(game_id: str):
+    game = await get_game(game_id)
+    async with game.lock:
+        return await game_state(game)
+
+@app.post("/games/{game_id}/reset")
+async def reset(game_id: str):
+    game = await get_game(game_id)
+    async with game.lock:
+        await reset_game(game)
+        return await game_state(game)
+
+@app.post("/games/{game_id}/undo")
+async def undo(game_id: str):
+    game = await get_game(game_id)
+    async with game.lock:
+        await undo_move(game)
+        return await game_state(game)
+
+@app.post("/games/{game_id}/legal")
+async def legal(game_id: str, coord: CoordBody):
+    game = await get_game(game_id)
+    if not (0 <= coord.row < 8 and 0 <= coord.col < 8):
+        raise HTTPException(status_code=400, detail={"error":"Invalid coordinates","code":"invalid_coordinates"})
+    async with game.lock:
+        # filtered for king safety, same as the moves /move accepts
+        moves = await app.state.pool.call(game.engine.legality.filter_move, coord.row, coord.col)
+    return {"legal_moves": moves}
+
+@app.get("/games/{game_id}/moves")
+async def legal_move_map(game_id: str):
+    game = await get_game(game_id)
+    async with game.lock:
+        moves = await app.state.pool.call(game.engine.get_legal_move_map)
+        return {"version": game.version, "turn": game.board.color, "moves": moves}
+
+@app.post("/games/{game_id}/move")
+async def move(game_id: str, mv: MoveBody):
+    game = await get_game(game_id)
+    move = parse_move(mv)
+    async with game.lock:
+        msg, delta = await play_move(game, move)
+        return {
+            "ok": True,
+            "message": msg,
+            "version": game.version,
+            "board": [row[:] for row in game.board.board],
+            "turn": game.board.color,
+            "game_status": delta["game_status"]
+        }
+
+@app.post("/games/{game_id}/ai/move")
+async def ai_move(game_id: str, body: Optional[AiMoveBody] = None):
+    game = await get_game(game_id)
+    body = body or AiMoveBody()
+    if body.depth is not None and body.depth < 1:
+        raise HTTPException(status_code=400, detail="Depth must be at least 1")
+    movetime = min(body.movetime or AI_MAX_MOVETIME, AI_MAX_MOVETIME)
+    async with game.lock:
+        result = await app.state.pool.search(game, depth=body.depth, movetime=movetime)
+        best = result["best_move"]
+        if best is None:
+            raise HTTPException(status_code=400, detail="No legal moves")
+        try:
+            _, delta = await play_move(game, best)
+        except HTTPException as e:
+            raise HTTPException(status_code=500, detail=e.detail)
+        return {
+            "ok": True,
+            "move": result["move"],
+            "search": {k: result[k] for k in ("score", "depth", "pv", "nodes", "qnodes", "nps", "time", "book")},
+            "version": game.version,
+            "board": [row[:] for row in game.board.board],
+            "turn": game.board.color,
+            "game_status": delta["game_status"]
+        }
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    if not metrics.ENABLED:
+        raise HTTPException(status_code=404, detail={"error":"Metrics are disabled","code":"not_found"})
+
+    def gauges():
+        games = app.state.games.stats()
+        pool = app.state.pool.stats()
+        analysis = app.state.analysis.stats()
+        return {
+            "chess_live_games": ("Games held in memory.", games["live_games"]),
+            "chess_game_memory_bytes": ("Estimated memory of live games.", games["memory_bytes"]),
+            "chess_game_evictions_total": ("Games evicted since start.", games["evictions"]),
+            "chess_socket_subscribers": ("Open game WebSockets.",
+                                         sum(len(game.channel) for game in app.state.games.games.values())),
+            "chess_engine_pool_pending": ("Engine calls running or queued.", pool["pending"]),
+            "chess_engine_pool_rejected_total": ("Engine calls refused with 503 since start.", pool["rejected"]),
+            "chess_analysis_jobs_running": ("Batch analysis jobs running.", analysis["running"]),
+            "chess_uptime_seconds": ("Seconds since start.", round(time.time() - app.state.start_time, 3)),
+        }
+
+    return PlainTextResponse(metrics.render(request_metrics, gauges), media_type="text/plain; version=0.0.4")
+
+# ----- Admin: profiling -----
+# Needs ADMIN_TOKEN set on the server and sent back in X-Admin-Token; without it these routes don't exist
+def require_admin(request: Request):
+    if not is_admin(request.headers.get("x-admin-token")):
+        raise HTTPException(status_code=404, detail={"error":"Resource not found","code":"not_found"})
+
+@app.get("/admin/slow-calls", include_in_schema=False)
+async def slow_calls(request: Request):
+    """The slowest engine calls in this process (ENGINE_SLOW_CALLS of them), slowest first."""
+    require_admin(request)
+    return {"capacity": profiling.SLOW_CALLS.capacity, "calls": profiling.SLOW_CALLS.entries()}
+
+@app.delete("/admin/slow-calls", include_in_schema=False)
+async def clear_slow_calls(request: Request):
+    require_admin(request)
+    profiling.SLOW_CALLS.clear()
+    return {"capacity": profiling.SLOW_CALLS.capacity, "calls": []}
+
+@app.post("/admin/profile", include_in_schema=False)
+async def profile_position(request: Request, body: ProfileBody):
+    """Analyze one position (e.g. a slow call's FEN) under the profiler; returns the analysis and the dump."""
+    require_admin(request)
+    if body.mode not in profiling.MODES:
+        raise HTTPException(status_code=400, detail={"error":f"mode must be one of {', '.join(profiling.MODES)}",
+                                                     "code":"invalid_mode"})
+    unknown = [name for name in body.include if name not in ANALYSES]
+    if unknown or not body.include:
+        raise HTTPException(status_code=400, detail={"error":f"include must list some of {', '.join(ANALYSES)}",
+                                                     "code":"invalid_include"})
+    if body.depth is not None and body.depth < 1:
+        raise HTTPException(status_code=400, detail="Depth must be at least 1")
+    options = {
+        "include": list(dict.fromkeys(body.include)),
+        "backend": BOARD_BACKEND,
+        "depth": body.depth,
+        "movetime": min(body.movetime or AI_MAX_MOVETIME, AI_MAX_MOVETIME),
+    }
+    result, profile = await app.state.pool.compute(profiling.run_profiled, body.mode, "analyze",
+                                                   profiling.PROFILE_DIR, analyze_position, body.fen, options)
+    return {"result": result, "profile": {**profile, "file": os.path.basename(profile["path"])}}
+
+@app.get("/admin/profiles", include_in_schema=False)
+async def list_profiles(request: Request):
+    require_admin(request)
+    directory = profiling.PROFILE_DIR
+    names = sorted(os.listdir(directory), reverse=True) if os.path.isdir(directory) else []
+    return {"directory": directory,
+            "profiles": [{"file": name, "bytes": os.path.getsize(os.path.join(directory, name))}
+                         for name in names if name.endswith((".prof", ".folded"))]}
+
+@app.get("/admin/profiles/{name}", include_in_schema=False)
+async def download_profile(request: Request, name: str):
+    require_admin(request)
+    path = os.path.join(profiling.PROFILE_DIR, os.path.basename(name))
+    if not name.endswith((".prof", ".folded")) or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail={"error":"Profile not found","code":"profile_not_found"})
+    return FileResponse(path, media_type="text/plain" if name.endswith(".folded") else "application/octet-stream")
+
+# ----- Batch analysis -----
+def get_job(job_id: str):
+    job = app.state.analysis.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail={"error":"Analysis job not found","code":"job_not_found"})
+    return job
+
+@app.post("/analyze")
+async def analyze(body: AnalyzeBody):
+    if not body.positions:
+        raise HTTPException(status_code=400, detail={"error":"No positions given","code":"no_positions"})
+    if len(body.positions) > ANALYZE_MAX_POSITIONS:
+        raise HTTPException(status_code=400, detail={"error":f"At most {ANALYZE_MAX_POSITIONS} positions per request",
+                                                     "code":"too_many_positions"})
+    unknown = [name for name in body.include if name not in ANALYSES]
+    if unknown or not body.include:
+        raise HTTPException(status_code=400, detail={"error":f"include must list some of {', '.join(ANALYSES)}",
+                                                     "code":"invalid_include"})
+    if body.depth is not None and body.depth < 1:
+        raise HTTPException(status_code=400, detail="Depth must be at least 1")
+    if body.deadline is not None and body.deadline <= 0:
+        raise HTTPException(status_code=400, detail="Deadline must be positive")
+    options = {
+        "include": list(dict.fromkeys(body.include)),
+        "backend": BOARD_BACKEND,
+        "depth": body.depth,
+        "movetime": min(body.movetime or AI_MAX_MOVETIME, AI_MAX_MOVETIME),
     }
+    deadline = min(body.deadline or ANALYZE_DEADLINE, ANALYZE_MAX_DEADLINE)
+    if len(body.positions) <= ANALYZE_INLINE_MAX and not body.background:
+        job = await app.state.analysis.run_inline(body.positions, options, deadline)
+        summary = job.summary()
+        del summary["job_id"]
+        return {**summary, "results": job.results}
+    job = app.state.analysis.submit(body.positions, options, deadline)
+    return JSONResponse(status_code=202, content={
+        **job.summary(),
+        "results_url": f"/analyze/{job.job_id}",
+        "stream_url": f"/analyze/{job.job_id}/stream",
+    })
+
+@app.get("/analyze/{job_id}")
+async def analysis_results(job_id: str, since: int = 0):
+    """Results finished after the first `since` ones, in completion order; pass `next` back as `since`."""
+    job = get_job(job_id)
+    since = max(since, 0)
+    results = job.finished[since:]
+    return {**job.summary(), "results": results, "next": since + len(results)}
+
+@app.get("/analyze/{job_id}/stream")
+async def analysis_stream(job_id: str):
+    """Newline-delimited JSON: one {"type": "result"} line per position as it finishes, then {"type": "end"}."""
+    job = get_job(job_id)
+
+    async def lines():
+        seen = 0
+        while True:
+            await job.wait(seen)
+            for result in job.finished[seen:]:
+                yield json.dumps({"type": "result", **result}) + "\n"
+            seen = len(job.finished)
+            if job.done:
+                yield json.dumps({"type": "end", **job.summary()}) + "\n"
+                return
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.delete("/analyze/{job_id}")
+async def cancel_analysis(job_id: str):
+    job = get_job(job_id)
+    app.state.analysis.cancel(job)
+    return job.summary()
+
+# ----- WebSocket -----
+# Client messages: {"type":"move", from_row, from_col, to_row, to_col, promotion?}, {"type":"undo"},
+# {"type":"reset"} and {"type":"resync"}. The server pushes a "snapshot" on connect and on resync,
+# a "delta" (changed squares, turn, status, version) after every change made through any route,
+# and {"type":"error", error, code} when a request fails.
+def socket_error(detail):
+    if isinstance(detail, dict):
+        return {"type": "error", **detail}
+    return {"type": "error", "error": str(detail), "code": "bad_request"}
+
+@app.websocket("/games/{game_id}/ws")
+async def game_socket(ws: WebSocket, game_id: str):
+    try:
+        game = await app.state.games.get(game_id)
+    except Pool_Saturated:
+        await ws.close(code=1013)   # try again later
+        return
+    if game is None:
+        await ws.close(code=4404)
+        return
+    await ws.accept()
+    sub = game.channel.subscribe(ws, lambda: snapshot(game))
+    try:
+        while True:
+            msg = await ws.receive_json()
+            kind = msg.get("type") if isinstance(msg, dict) else None
+            # touch the game so an active socket keeps it from expiring
+            if app.state.games.get_live(game_id) is not game:
+                await ws.send_json(socket_error({"error":"Game not found","code":"game_not_found"}))
+                break
+            if kind == "resync":
+                game.channel.resync(sub)
+                continue
+            try:
+                async with game.lock:
+                    if kind == "move":
+                        await play_move(game, parse_move(MoveBody(**msg)))
+                    elif kind == "undo":
+                        await undo_move(game)
+                    elif kind == "reset":
+                        await reset_game(game)
+                    else:
+                        raise HTTPException(status_code=400, detail={"error":"Unknown message type","code":"unknown_message"})
+            except HTTPException as e:
+                await ws.send_json(socket_error(e.detail))
+            except ValidationError:
+                await ws.send_json(socket_error({"error":"Invalid move message","code":"invalid_message"}))
+            except Pool_Saturated:
+                await ws.send_json(socket_error({"error":"Engine busy, retry shortly","code":"engine_busy"}))
+    except (WebSocketDisconnect, ValueError):
+        pass
+    finally:
+        game.channel.unsubscribe(sub)
 
 @app.get("/", include_in_schema=False)
 async def root():
@@ -183,8 +645,20 @@ async def http_exception_handler(request: Request, exc: HTTPException):
                  "code": getattr(exc, "code", "unknown_error"), "path": request.url.path}
     )
 
+@app.exception_handler(Pool_Saturated)
+async def pool_saturated_handler(request: Request, exc: Exception):
+    return JSONResponse(status_code=503, headers={"Retry-After": "1"},
+                        content={"error":"Engine busy, retry shortly","code":"engine_busy","path": request.url.path})
+
+@app.exception_handler(Too_Many_Jobs)
+async def too_many_jobs_handler(request: Request, exc: Exception):
+    return JSONResponse(status_code=429, headers={"Retry-After": "5"},
+                        content={"error":"Too many analysis jobs running","code":"too_many_jobs","path": request.url.path})
+
 @app.exception_handler(404)
 async def not_found_handler(request: Request, exc: Exception):
+    if isinstance(exc, HTTPException) and isinstance(exc.detail, dict):
+        return JSONResponse(status_code=404, content=exc.detail)   # e.g. game_not_found
     return JSONResponse(status_code=404, content={"error":"Resource not found","code":"not_found"})
 
 @app.exception_handler(500)
@@ -0,0 +1,109 @@
+import asyncio
+import traceback
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from starlette.websockets import WebSocketDisconnect
+
+from src.server.workers import Pool_Saturated
+
+try:
+    from websockets.exceptions import ConnectionClosed
+except ImportError:     # uvicorn without the websockets package
+    ConnectionClosed = WebSocketDisconnect
+
+#a subscriber this many messages behind is dropped back to a single full snapshot
+MAX_BACKLOG = 16
+
+#close code for a sender that failed on the server side (RFC 6455 "internal error")
+INTERNAL_ERROR = 1011
+
+#outbox markers
+_RESYNC = object()
+_CLOSE = object()
+
+
+def board_diff(before: List[List[str]], after: List[List[str]]) -> List[list]:
+    """[row, col, piece] for every square that differs."""
+    return [[r, c, after[r][c]] for r in range(8) for c in range(8) if before[r][c] != after[r][c]]
+
+
+class _Subscriber:
+    def __init__(self, ws, snapshot: Callable[[], Awaitable[dict]]):
+        self.ws = ws
+        self.snapshot = snapshot
+        self.outbox: "asyncio.Queue" = asyncio.Queue()
+        self.task: Optional[asyncio.Task] = None
+
+    async def run(self) -> None:
+        # one sender per socket, so a slow client never blocks publish()
+        try:
+            while True:
+                message = await self.outbox.get()
+                if message is _CLOSE:
+                    await self.ws.close(code=4404)
+                    return
+                if message is _RESYNC:
+                    try:
+                        message = await self.snapshot()
+                    except Pool_Saturated:
+                        # the client still holds its old state; it can ask again
+                        message = {"type": "error", "error": "Engine busy, send resync to retry", "code": "engine_busy"}
+                await self.ws.send_json(message)
+        except (WebSocketDisconnect, ConnectionClosed):
+            # socket went away; the receive loop cleans up
+            pass
+        except Exception:
+            # anything else would leave an open socket that silently stops updating
+            print(f"game socket sender failed:\n{traceback.format_exc()}")
+            try:
+                await self.ws.close(code=INTERNAL_ERROR)
+            except Exception:
+                pass
+
+
+class Game_Channel:
+    """WebSocket subscribers of one game.
+
+    publish() queues a message for every subscriber without waiting. A subscriber whose outbox
+    grows past `max_backlog` has it replaced by one full snapshot taken when it is next sent.
+    """
+
+    def __init__(self, max_backlog: int = MAX_BACKLOG):
+        self.max_backlog = max_backlog
+        self.subscribers: Dict[int, _Subscriber] = {}
+
+    def __len__(self) -> int:
+        return len(self.subscribers)
+
+    def subscribe(self, ws, snapshot: Callable[[], Awaitable[dict]]) -> _Subscriber:
+        sub = _Subscriber(ws, snapshot)
+        sub.outbox.put_nowait(_RESYNC)
+        sub.task = asyncio.get_running_loop().create_task(sub.run())
+        self.subscribers[id(sub)] = sub
+        return sub
+
+    def unsubscribe(self, sub: _Subscriber) -> None:
+        if self.subscribers.pop(id(sub), None) is not None and sub.task is not None:
+            sub.task.cancel()
+
+    def resync(self, sub: _Subscriber) -> None:
+        self._reset_outbox(sub, _RESYNC)
+
+    def publish(self, message: dict) -> None:
+        for sub in self.subscribers.values():
+            if sub.outbox.qsize() >= self.max_backlog:
+                self._reset_outbox(sub, _RESYNC)
+            else:
+                sub.outbox.put_nowait(message)
+
+    def close(self) -> None:
+        """Tell every subscriber the game is gone (evicted or deleted)."""
+        for sub in self.subscribers.values():
+            self._reset_outbox(sub, _CLOSE)
+        self.subscribers.clear()
+
+    @staticmethod
+    def _reset_outbox(sub: _Subscriber, marker) -> None:
+        while not sub.outbox.empty():
+            sub.outbox.get_nowait()
+        sub.outbox.put_nowait(marker)
@@ -0,0 +1,121 @@
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from src.engine import instrument
+
+#request metrics and /metrics; off with METRICS=0 (then the middleware isn't even added)
+ENABLED = os.getenv("METRICS", "1") != "0"
+
+#seconds; engine searches are capped at AI_MAX_MOVETIME, so the top buckets catch them
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+
+def _format_labels(names: Iterable[str], values: Labels) -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, rendered in Prometheus text format."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        # labels -> [count per bucket (non-cumulative, +Inf last), sum]
+        self.series: Dict[Labels, list] = {}
+
+    def observe(self, labels: Labels, value: float) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self.series.items()):
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                running += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                names = self.label_names + ("le",)
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (le,))} {running}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {running}")
+        return lines
+
+
+class Request_Metrics:
+    """Per-route latency and in-flight requests. Routes are labelled by their template
+    ("/games/{game_id}/move"), never the raw path, so game ids don't create series."""
+
+    def __init__(self):
+        self.latency = Histogram("http_request_duration_seconds", "HTTP request latency by route.",
+                                 ("method", "route", "status"))
+        self.in_flight = 0
+
+    def render(self) -> List[str]:
+        return self.latency.render() + [
+            "# HELP http_requests_in_flight HTTP requests being served.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+        ]
+
+
+class Metrics_Middleware:
+    """Plain ASGI middleware (no per-request Request object) feeding Request_Metrics."""
+
+    def __init__(self, app, metrics: Request_Metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        metrics = self.metrics
+        status = [500]
+
+        async def send_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            metrics.in_flight -= 1
+            # the router leaves the matched route in the scope
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            metrics.latency.observe((scope["method"], path, str(status[0])), time.perf_counter() - start)
+
+
+def _sample(name: str, kind: str, help_text: str, value) -> List[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+
+
+def render(requests: Request_Metrics, gauges: Callable[[], Dict[str, Tuple[str, float]]]) -> str:
+    """The whole exposition: request metrics, server state read at scrape time (`gauges()`:
+    name -> (help, value); names ending in _total are counters) and the engine counters."""
+    lines = requests.render()
+    for name, (help_text, value) in gauges().items():
+        lines += _sample(name, "counter" if name.endswith("_total") else "gauge", help_text, value)
+    if instrument.ENABLED:
+        for key, value in instrument.COUNTERS.items():
+            lines += _sample(f"chess_engine_{key}_total", "counter", f"Engine {key.replace('_', ' ')}.", value)
+        lines += _sample("chess_engine_last_search_nps", "gauge", "Nodes per second of the latest search.",
+                         instrument.LAST["search_nps"])
+    return "\n".join(lines) + "\n"
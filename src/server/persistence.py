@@ -0,0 +1,182 @@
+import asyncio
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+#a saved game: {"game_id", "start_fen", "moves" (list of move names), "snapshot" (packed
+#current position), "version", "updated"}
+Game_Record = dict
+
+
+class Game_Repository(ABC):
+    """Where games outlive the process. Subclasses implement save_batch/load (and close if they
+    hold resources); reads and writes both run on Write_Behind's single thread."""
+
+    @abstractmethod
+    def save_batch(self, records: Iterable[Game_Record], deletes: Iterable[str]) -> None:
+        ...
+
+    @abstractmethod
+    def load(self, game_id: str) -> Optional[Game_Record]:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class Sqlite_Repository(Game_Repository):
+    """One row per game, in WAL mode."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.writer = self._connect()
+        self.writer.execute("PRAGMA journal_mode=WAL")
+        self.writer.execute(
+            "CREATE TABLE IF NOT EXISTS games ("
+            " game_id TEXT PRIMARY KEY, start_fen TEXT NOT NULL, moves TEXT NOT NULL,"
+            " snapshot BLOB NOT NULL, version INTEGER NOT NULL, updated REAL NOT NULL)"
+        )
+        self.writer.commit()
+        self.reader = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        # a crash may lose the last batch, never corrupt the file
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def save_batch(self, records, deletes) -> None:
+        with self.writer:
+            self.writer.executemany(
+                "INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?, ?, ?)",
+                [(r["game_id"], r["start_fen"], " ".join(r["moves"]), r["snapshot"], r["version"], r["updated"])
+                 for r in records],
+            )
+            self.writer.executemany("DELETE FROM games WHERE game_id = ?", [(game_id,) for game_id in deletes])
+
+    def load(self, game_id: str) -> Optional[Game_Record]:
+        row = self.reader.execute(
+            "SELECT start_fen, moves, snapshot, version, updated FROM games WHERE game_id = ?", (game_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        start_fen, moves, snapshot, version, updated = row
+        return {"game_id": game_id, "start_fen": start_fen, "moves": moves.split(),
+                "snapshot": bytes(snapshot), "version": version, "updated": updated}
+
+    def close(self) -> None:
+        self.writer.close()
+        self.reader.close()
+
+
+def open_repository(url: str) -> Optional[Game_Repository]:
+    """"sqlite:///path/to/file.db" or "none" (games live in memory only)."""
+    if url in ("", "none"):
+        return None
+    if url.startswith("sqlite:///"):
+        return Sqlite_Repository(url[len("sqlite:///"):])
+    raise ValueError(f"unknown game store: {url}")
+
+
+class Write_Behind:
+    """Batches game writes off the request path.
+
+    mark() only records the latest state of a game in memory; a background task hands
+    everything dirty to the repository every `flush_interval` seconds (sooner once `max_batch`
+    games are waiting), so many moves on one game between flushes cost a single write.
+    """
+
+    def __init__(self, repository: Game_Repository, flush_interval: float = 0.5, max_batch: int = 256):
+        self.repository = repository
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        # game_id -> latest record, or None for a pending delete
+        self.dirty: Dict[str, Optional[Game_Record]] = {}
+        # the batch being written right now, still authoritative until it commits
+        self.inflight: Dict[str, Optional[Game_Record]] = {}
+        # sqlite connections stay on one thread
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="game-writer")
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.written = 0
+        self.errors = 0
+
+    def start(self) -> None:
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def mark(self, record: Game_Record) -> None:
+        self.dirty[record["game_id"]] = record
+        if len(self.dirty) >= self.max_batch:
+            self.wakeup.set()
+
+    def discard(self, game_id: str) -> None:
+        self.dirty[game_id] = None
+
+    async def load(self, game_id: str) -> Optional[Game_Record]:
+        """Latest state of a game: a write still waiting here wins over the repository, which
+        is read on the writer thread."""
+        for pending in (self.dirty, self.inflight):
+            if game_id in pending:
+                return pending[game_id]
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.repository.load, game_id)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self.dirty:
+            return
+        batch, self.dirty = self.dirty, {}
+        self.inflight = batch
+        records = [r for r in batch.values() if r is not None]
+        deletes = [game_id for game_id, r in batch.items() if r is None]
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.repository.save_batch, records, deletes)
+        except Exception as e:
+            # keep the batch for the next round unless newer state arrived meanwhile
+            self.errors += 1
+            for game_id, record in batch.items():
+                self.dirty.setdefault(game_id, record)
+            print(f"game store write failed ({len(batch)} games): {e!r}")
+            return
+        finally:
+            self.inflight = {}
+        self.batches += 1
+        self.written += len(batch)
+
+    async def close(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+        self.executor.shutdown(wait=True)
+        self.repository.close()
+
+    def stats(self) -> dict:
+        return {"pending": len(self.dirty), "batches": self.batches, "written": self.written, "errors": self.errors}
+
+
+def snapshot_record(session) -> Game_Record:
+    return {
+        "game_id": session.game_id,
+        "start_fen": session.start_fen,
+        "moves": list(session.moves),
+        "snapshot": session.board.pack(),
+        "version": session.version,
+        "updated": time.time(),
+    }
@@ -0,0 +1,56 @@
+import hmac
+import os
+from contextvars import ContextVar
+from typing import List, Optional
+
+from src.engine import profiling
+
+#admin surface (X-Profile header, /admin routes); off unless ADMIN_TOKEN is set
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+class Profile_Request:
+    """One request's ask to profile its engine calls; `profiles` collects their summaries."""
+
+    def __init__(self, mode: str, directory: str = profiling.PROFILE_DIR):
+        self.mode = mode
+        self.directory = directory
+        self.profiles: List[dict] = []
+
+
+#set by Profile_Middleware for the request's task; Engine_Pool reads it when submitting work
+PROFILE: ContextVar[Optional[Profile_Request]] = ContextVar("engine_profile", default=None)
+
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+class Profile_Middleware:
+    """Plain ASGI middleware: "X-Profile: sample|cprofile" with a valid X-Admin-Token profiles
+    every engine call the request makes. The dump paths come back in X-Profile-Files."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        mode = headers.get(b"x-profile", b"").decode("latin-1").lower()
+        token = headers.get(b"x-admin-token", b"").decode("latin-1")
+        if mode not in profiling.MODES or not is_admin(token):
+            return await self.app(scope, receive, send)
+        request = Profile_Request(mode)
+
+        async def send_files(message):
+            if message["type"] == "http.response.start" and request.profiles:
+                files = ",".join(os.path.basename(p["path"]) for p in request.profiles)
+                message = dict(message, headers=list(message.get("headers", [])) + [(b"x-profile-files", files.encode())])
+            await send(message)
+
+        reset = PROFILE.set(request)
+        try:
+            await self.app(scope, receive, send_files)
+        finally:
+            PROFILE.reset(reset)
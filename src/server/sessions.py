@@ -0,0 +1,220 @@
+import asyncio
+import secrets
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from src.engine.fen import START_FEN
+from src.engine.notation import parse_move_name
+from src.server.channels import Game_Channel
+from src.server.persistence import Write_Behind, snapshot_record
+from src.server.workers import Engine_Pool
+
+#rough per-game footprint used for the memory cap (board, dicts, Legality/Engine objects)
+GAME_BASE_BYTES = 16 * 1024
+#an engine that has searched also holds move-ordering tables
+SEARCHER_BYTES = 80 * 1024
+#one undo record (changed squares, flags, key) per played move
+HISTORY_RECORD_BYTES = 400
+
+
+class Game_Session:
+    def __init__(self, game_id: str, board, engine):
+        self.game_id = game_id
+        self.board = board
+        self.engine = engine
+        self.created = time.time()
+        self.last_access = self.created
+        self.size_bytes = 0
+        # serializes every engine call on this game
+        self.lock = asyncio.Lock()
+        # bumped on every change pushed to WebSocket subscribers
+        self.version = 0
+        self.channel = Game_Channel()
+        # what persistence replays: the starting position and the moves played since
+        self.start_fen = START_FEN
+        self.moves = []
+
+
+class Game_Store:
+    """In-memory games keyed by ID, least recently used first.
+
+    A game is evicted when it has been idle longer than `ttl_seconds`, or to make room once
+    `max_games` or the estimated `max_memory_bytes` would be exceeded. With a `writer`, every
+    saved game is also persisted, and an evicted or pre-restart game is rebuilt from storage
+    the first time it is asked for: the read runs on the writer's thread and the move replay
+    on the engine `pool`, so neither blocks the event loop.
+    """
+
+    def __init__(self, factory: Callable[[], tuple], max_games: int = 5000,
+                 ttl_seconds: float = 6 * 3600, max_memory_bytes: int = 256 * 1024 * 1024,
+                 writer: Optional[Write_Behind] = None, pool: Optional[Engine_Pool] = None):
+        # factory() -> (board, engine) for a new game
+        self.factory = factory
+        self.writer = writer
+        self.pool = pool
+        # game_id -> restore in progress, so concurrent requests share one replay
+        self.restoring: Dict[str, asyncio.Task] = {}
+        self.restored = 0
+        self.max_games = max_games
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_bytes = max_memory_bytes
+        self.games: "OrderedDict[str, Game_Session]" = OrderedDict()
+        self.memory_bytes = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.games)
+
+    def __contains__(self, game_id: str) -> bool:
+        return game_id in self.games
+
+    def create(self, position=None) -> Game_Session:
+        """New game from the start position, or from `position` (see Chess_Board.load_position)."""
+        self.evict_expired()
+        board, engine = self.factory()
+        game_id = secrets.token_urlsafe(12)
+        session = Game_Session(game_id, board, engine)
+        if position is not None:
+            board.load_position(position)
+            session.start_fen = board.to_fen()
+        # snapshot first: a position that can't be stored raises before the game is kept
+        record = snapshot_record(session)
+        self._add(session)
+        if self.writer is not None:
+            self.writer.mark(record)
+        return session
+
+    async def get(self, game_id: str) -> Optional[Game_Session]:
+        """Return the game, restoring it from storage if needed, or None if unknown."""
+        session = self.get_live(game_id)
+        if session is not None or self.writer is None:
+            return session
+        task = self.restoring.get(game_id)
+        if task is None:
+            task = self.restoring[game_id] = asyncio.ensure_future(self._restore(game_id))
+            task.add_done_callback(lambda _: self.restoring.pop(game_id, None))
+        return await asyncio.shield(task)
+
+    def get_live(self, game_id: str) -> Optional[Game_Session]:
+        """Return the game if it is in memory and mark it as most recently used."""
+        self.evict_expired()
+        session = self.games.get(game_id)
+        if session is None:
+            return None
+        session.last_access = time.time()
+        self.games.move_to_end(game_id)
+        return session
+
+    def save(self, session: Game_Session) -> None:
+        """Queue the game's current state for persistence (no-op without a writer).
+        Only the live copy is saved: a session that was dropped or evicted and restored
+        again must not overwrite what the live copy has stored since."""
+        if self.writer is not None and self.games.get(session.game_id) is session:
+            self.writer.mark(snapshot_record(session))
+
+    async def delete(self, game_id: str) -> bool:
+        found = self._drop(game_id)
+        if self.writer is not None:
+            found = found or await self.writer.load(game_id) is not None
+            self.writer.discard(game_id)
+        return found
+
+    def _add(self, session: Game_Session) -> None:
+        self.games[session.game_id] = session
+        self.update_size(session)
+
+    def _drop(self, game_id: str) -> bool:
+        session = self.games.pop(game_id, None)
+        if session is None:
+            return False
+        self.memory_bytes -= session.size_bytes
+        session.channel.close()
+        return True
+
+    async def _restore(self, game_id: str) -> Optional[Game_Session]:
+        record = await self.writer.load(game_id)
+        if record is None:
+            return None
+        session = Game_Session(game_id, *self.factory())
+        if self.pool is not None:
+            await self.pool.call(self._replay, session, record)
+        else:
+            self._replay(session, record)
+        if game_id in self.games or self.writer.dirty.get(game_id, record) is None:
+            # created meanwhile by another path, or deleted while we were replaying
+            return self.games.get(game_id)
+        self._add(session)
+        self.restored += 1
+        return session
+
+    def _replay(self, session: Game_Session, record: dict) -> None:
+        # engine work: runs on the pool; replaying a few hundred moves takes milliseconds
+        game_id, board, engine = session.game_id, session.board, session.engine
+        try:
+            board.load_fen(record["start_fen"])
+            for name in record["moves"]:
+                success, msg = engine.play_turn(*parse_move_name(name))
+                if not success:
+                    raise ValueError(f"stored move {name} rejected: {msg}")
+            if board.pack() != record["snapshot"]:
+                raise ValueError("replayed moves don't reach the stored position")
+            session.start_fen = record["start_fen"]
+            session.moves = list(record["moves"])
+        except ValueError as e:
+            # keep the position, lose the undo history
+            print(f"game {game_id}: {e}; restoring from snapshot")
+            board.load_packed(record["snapshot"])
+            session.start_fen = board.to_fen()
+        session.version = record["version"]
+
+    def update_size(self, session: Game_Session) -> None:
+        """Re-estimate a game's footprint after it changed (moves played, engine searched)."""
+        if self.games.get(session.game_id) is not session:
+            return      # deleted while the change ran; its bytes were already released
+        size = GAME_BASE_BYTES + HISTORY_RECORD_BYTES * len(session.board.history)
+        if session.engine.has_searcher:
+            size += SEARCHER_BYTES
+        self.memory_bytes += size - session.size_bytes
+        session.size_bytes = size
+        self._enforce_limits(keep=session.game_id)
+
+    def evict_expired(self) -> int:
+        # the front of the OrderedDict is the least recently used game
+        cutoff = time.time() - self.ttl_seconds
+        expired = []
+        for game_id, session in self.games.items():
+            if session.last_access >= cutoff:
+                break
+            # a game whose lock is held is mid-request (e.g. a long search): leave it
+            if not session.lock.locked():
+                expired.append(game_id)
+        for game_id in expired:
+            self._evict(game_id)
+        return len(expired)
+
+    def _enforce_limits(self, keep: Optional[str] = None) -> None:
+        while len(self.games) > self.max_games or self.memory_bytes > self.max_memory_bytes:
+            # least recently used first, never the game being served or one mid-request
+            game_id = next((game_id for game_id, session in self.games.items()
+                            if game_id != keep and not session.lock.locked()), None)
+            if game_id is None:
+                break   # over the cap until those requests finish
+            self._evict(game_id)
+
+    def _evict(self, game_id: str) -> None:
+        # memory only: a persisted game comes back on its next request
+        self._drop(game_id)
+        self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "live_games": len(self.games),
+            "max_games": self.max_games,
+            "memory_bytes": self.memory_bytes,
+            "max_memory_bytes": self.max_memory_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "evictions": self.evictions,
+            "restored": self.restored,
+            "persistence": self.writer.stats() if self.writer is not None else None,
+        }
@@ -0,0 +1,123 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from src.engine import instrument, profiling
+from src.engine.engine import Engine
+from src.server.profiling import PROFILE
+
+
+class Pool_Saturated(Exception):
+    """Every worker is busy and the wait queue is full; the caller should answer 503."""
+
+
+#process-pool entry points: they get a pickled copy of the board, so they must not mutate games
+def _worker_status(board):
+    return Engine(board).get_game_status()
+
+
+def _worker_search(board, depth, movetime):
+    result = Engine(board).search(depth=depth, movetime=movetime)
+    result.pop("iterations", None)
+    return result
+
+
+class Engine_Pool:
+    """Runs engine work off the event loop.
+
+    In "thread" mode everything runs on one thread pool against the live game objects.
+    In "process" mode read-only work (status, search) goes to worker processes with a copy of
+    the board, and mutations still run on threads since they must change the game in place.
+    At most `workers + max_queue` calls may be pending; beyond that Pool_Saturated is raised.
+    """
+
+    def __init__(self, mode: str = "thread", workers: Optional[int] = None, max_queue: int = 32):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"unknown engine pool mode: {mode}")
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 2
+        self.max_pending = self.workers + max_queue
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.threads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="engine")
+        self.processes = ProcessPoolExecutor(max_workers=self.workers) if mode == "process" else None
+
+    async def _submit(self, executor, fn, *args):
+        # only touched from the event loop thread, so a plain counter is enough
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise Pool_Saturated()
+        profile = PROFILE.get()
+        if profile is not None:
+            # an admin asked to profile this request: run the call under the profiler, in the worker
+            label = getattr(getattr(fn, "func", fn), "__name__", "call").strip("_")
+            fn, args = profiling.run_profiled, (profile.mode, label, profile.directory, fn) + args
+        loop = asyncio.get_running_loop()
+        future = executor.submit(fn, *args)
+        self.pending += 1
+        # a caller that stops waiting (timeout, cancelled job) doesn't stop a running worker, so the
+        # call stays counted until the worker is actually done with it
+        future.add_done_callback(lambda _: self._finished(loop))
+        result = await asyncio.wrap_future(future)
+        if profile is not None:
+            result, summary = result
+            profile.profiles.append(summary)
+        self.completed += 1
+        return result
+
+    def _finished(self, loop) -> None:
+        # runs on the worker thread: hop back to the loop, unless the server already stopped
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            pass
+
+    def _release(self) -> None:
+        self.pending -= 1
+
+    async def call(self, fn, *args):
+        """Run `fn(*args)` on a thread; use for anything that mutates a game."""
+        return await self._submit(self.threads, fn, *args)
+
+    async def compute(self, fn, *args):
+        """Run a function of plain data (no live game objects) on a worker process, or on a
+        thread in thread mode. `fn` must be importable at module level."""
+        return await self._submit(self.processes or self.threads, fn, *args)
+
+    async def status(self, game):
+        # callers hold game.lock, so the position can't change under the cached answer
+        cached = game.engine.cached_game_status()
+        if cached is not None:
+            return cached
+        if self.processes is not None:
+            status = await self._submit(self.processes, _worker_status, game.board)
+            game.engine.remember_game_status(status)
+            return status
+        return await self._submit(self.threads, game.engine.get_game_status)
+
+    async def search(self, game, depth: Optional[int] = None, movetime: Optional[float] = None) -> dict:
+        if self.processes is not None:
+            result = await self._submit(self.processes, _worker_search, game.board, depth, movetime)
+            if instrument.ENABLED:
+                # the worker counted it in its own process
+                instrument.record_search(result)
+            return result
+        return await self._submit(self.threads, functools.partial(game.engine.search, depth=depth, movetime=movetime))
+
+    def shutdown(self) -> None:
+        self.threads.shutdown(wait=False, cancel_futures=True)
+        if self.processes is not None:
+            self.processes.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
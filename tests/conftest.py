@@ -0,0 +1,7 @@
+import os
+import sys
+
+#let `pytest` run from anywhere: the engine and server import as src.*
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+BACKENDS = ("list", "bitboard")
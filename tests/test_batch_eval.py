@@ -0,0 +1,46 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.engine import batch_eval
+from src.engine.chess_board import create_board
+from src.engine.evaluation import evaluate
+from src.engine.perft import POSITIONS
+
+from conftest import BACKENDS
+
+
+def flip(text: str) -> str:
+    """The same position with colours swapped and the board mirrored top to bottom."""
+    placement, color, castling, ep = text.split()[:4]
+    placement = "/".join(reversed(placement.split("/"))).swapcase()
+    castling = "".join(sorted(castling.swapcase())) if castling != "-" else "-"
+    if ep != "-":
+        ep = ep[0] + ("6" if ep[1] == "3" else "3")
+    return f"{placement} {'b' if color == 'w' else 'w'} {castling} {ep} 0 1"
+
+
+BASE = [f for _, f, _, _ in POSITIONS] + [
+    # doubled and isolated pawns on one side only, and a lone-king endgame
+    "4k3/pp6/8/8/8/2P5/2P4P/4K3 w - - 0 1",
+    "4k3/8/8/8/8/8/8/QQ2K3 b - - 0 1",
+    "rnb1kbnr/pppp1ppp/8/4p3/5PPq/8/PPPPP2P/RNBQKBNR w KQkq - 1 3",
+]
+FENS = BASE + [flip(f) for f in BASE]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_batch_matches_scalar_evaluate(backend):
+    boards = [create_board(backend).load_fen(f) for f in FENS]
+    expected = [evaluate(board) for board in boards]
+    assert any(score < 0 for score in expected) and any(score > 0 for score in expected)
+
+    for codes, black in (batch_eval.encode_fens(FENS),
+                         batch_eval.encode_packed([board.pack() for board in boards]),
+                         batch_eval.encode_boards(boards)):
+        assert batch_eval.evaluate_batch(codes, black).tolist() == expected
+
+
+def test_evaluate_fens_batches():
+    scores = np.concatenate(list(batch_eval.evaluate_fens(FENS, batch_size=5)))
+    assert scores.tolist() == [evaluate(create_board().load_fen(f)) for f in FENS]
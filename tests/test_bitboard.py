@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from src.engine.chess_board import create_board
+from src.engine.legality import Legality
+from src.engine.perft import POSITIONS
+
+POSITIONS_EXTRA = [
+    "4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1",              # en passant
+    "8/8/8/K2pP2r/8/8/8/7k w - d6 0 1",               # en passant exposing the king on the rank
+    "4k3/8/8/8/4q3/8/4R3/4K3 w - - 0 1",              # pinned rook
+    "4k3/8/8/8/1b6/8/3P4/4K2r w - - 0 1",             # double check
+    "r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1",           # castling
+    "r3k2r/8/8/8/8/5n2/8/R3K2R w KQkq - 0 1",         # castling out of check
+]
+
+
+def positions(seed, plies=30):
+    """The suite FENs and random continuations of them, as (list board, bitboard board) pairs."""
+    rng = random.Random(seed)
+    for fen in [p[1] for p in POSITIONS] + POSITIONS_EXTRA:
+        boards = (create_board("list").load_fen(fen), create_board("bitboard").load_fen(fen))
+        yield boards
+        legality = Legality(boards[0])
+        for _ in range(plies):
+            moves = legality.get_all_legal_moves_with_promotions(boards[0].color)
+            if not moves:
+                break
+            move = rng.choice(moves)
+            for board in boards:
+                board.save_move(*move)
+            yield boards
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_bitboard_generator_matches_list_board(seed):
+    for list_board, bit_board in positions(seed):
+        slow, fast = Legality(list_board), Legality(bit_board)
+        color = list_board.color
+        assert sorted(fast.get_all_legal_moves_with_promotions(color)) == \
+            sorted(slow.get_all_legal_moves_with_promotions(color)), list_board.to_fen()
+        assert sorted(fast.get_all_legal_captures(color)) == sorted(slow.get_all_legal_captures(color))
+        assert fast.has_any_legal_move(color) == slow.has_any_legal_move(color)
+        assert fast.is_check(color) == slow.is_check(color)
+        for row in range(8):
+            for col in range(8):
+                if list_board.board[row][col][0] == color:
+                    assert sorted(fast.filter_move(row, col)) == sorted(slow.filter_move(row, col))
+
+
+def test_check_info_masks():
+    board = create_board("bitboard").load_fen("4k3/8/8/8/4q3/8/4R3/4K3 w - - 0 1")
+    king, checkers, evasions, pins = board.check_info("w")
+    assert king == 7 * 8 + 4 and checkers == 0
+    # the rook on e2 stays on the e-file between its king and the queen (e2, e3, e4)
+    assert pins == {6 * 8 + 4: (1 << 6 * 8 + 4) | (1 << 5 * 8 + 4) | (1 << 4 * 8 + 4)}
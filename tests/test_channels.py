@@ -0,0 +1,74 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from src.server import app as server
+from src.server.channels import Game_Channel
+from src.server.workers import Pool_Saturated
+
+
+def test_subscriber_gets_deltas_and_resyncs(monkeypatch):
+    monkeypatch.setattr(server, "GAME_STORE", "none")
+    with TestClient(server.app) as client:
+        game_id = client.post("/games").json()["game_id"]
+        with client.websocket_connect(f"/games/{game_id}/ws") as ws:
+            first = ws.receive_json()
+            assert first["type"] == "snapshot" and first["version"] == 0
+
+            # a move made over HTTP reaches the socket as a delta
+            move = {"from_row": 6, "from_col": 4, "to_row": 4, "to_col": 4}
+            assert client.post(f"/games/{game_id}/move", json=move).status_code == 200
+            delta = ws.receive_json()
+            assert delta["type"] == "delta" and delta["version"] == 1
+            assert delta["turn"] == "b"
+            assert sorted(tuple(c[:2]) for c in delta["changes"]) == [(4, 4), (6, 4)]
+
+            ws.send_json({"type": "resync"})
+            again = ws.receive_json()
+            assert again["type"] == "snapshot" and again["version"] == 1
+            assert again["fen"] == client.get(f"/games/{game_id}/state").json()["fen"]
+
+
+class Fake_Socket:
+    def __init__(self):
+        self.sent = []
+        self.closed = None
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+    async def close(self, code=1000):
+        self.closed = code
+
+
+def test_busy_resync_sends_an_error_and_keeps_serving():
+    async def run():
+        calls = []
+
+        async def snapshot():
+            calls.append(1)
+            if len(calls) == 1:
+                raise Pool_Saturated()
+            return {"type": "snapshot"}
+
+        async def broken():
+            raise KeyError("boom")
+
+        channel = Game_Channel()
+        ws = Fake_Socket()
+        sub = channel.subscribe(ws, snapshot)
+        await asyncio.sleep(0)
+        channel.publish({"type": "delta", "version": 1})
+        channel.resync(sub)
+        await asyncio.sleep(0.01)
+        assert [m["type"] for m in ws.sent] == ["error", "snapshot"]
+        assert ws.sent[0]["code"] == "engine_busy" and ws.closed is None
+
+        # any other failure closes the socket instead of leaving it silently stale
+        other = Fake_Socket()
+        channel.subscribe(other, broken)
+        await asyncio.sleep(0.01)
+        assert other.closed == 1011 and other.sent == []
+        channel.unsubscribe(sub)
+
+    asyncio.run(run())
@@ -0,0 +1,123 @@
+import struct
+
+import pytest
+
+from src.engine import fen
+from src.engine.chess_board import create_board
+from src.engine.engine import Engine
+from src.engine.perft import POSITIONS
+
+from conftest import BACKENDS
+
+FENS = [f for _, f, _, _ in POSITIONS] + [
+    "4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1",
+    "r3k2r/8/8/8/8/8/8/R3K2R b Kq - 12 40",
+    "8/P7/8/8/8/8/7p/k6K w - - 99 120",
+]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("text", FENS)
+def test_fen_round_trip(backend, text):
+    board = create_board(backend).load_fen(text)
+    assert board.to_fen() == text
+    assert fen.parse_fen(board.to_fen()) == fen.parse_fen(text)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("text", FENS)
+def test_pack_round_trip(backend, text):
+    board = create_board(backend).load_fen(text)
+    data = board.pack()
+    assert len(data) == fen.PACKED_SIZE
+    assert fen.unpack(data) == fen.parse_fen(text)
+    restored = create_board(backend).load_packed(data)
+    assert restored.to_fen() == text
+    assert restored.zobrist_key == board.zobrist_key
+
+
+def test_missing_fields_default():
+    assert create_board().load_fen("4k3/8/8/8/8/8/8/4K3").to_fen() == "4k3/8/8/8/8/8/8/4K3 w - - 0 1"
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "4k3/8/8/8/8/8/4K3 w - - 0 1",                    # 7 ranks
+    "4k3/8/8/8/8/8/8/4K2 w - - 0 1",                  # short rank
+    "4k3/8/8/8/8/8/8/4X3 w - - 0 1",                  # unknown piece
+    "4k3/8/8/8/8/8/8/4K3 x - - 0 1",                  # side to move
+    "4k3/8/8/8/8/8/8/4K3 w X - 0 1",                  # castling letter
+    "4k3/8/8/8/8/8/8/4K3 w - e4 0 1",                 # en passant rank
+    "4k3/8/8/8/8/8/3PP3/4K3 w - e3 0 1",              # en passant behind white's pawn, white to move
+    "4k3/8/8/8/8/8/8/4K3 b - e6 0 1",                 # and the same for black
+    "4k3/8/8/8/8/8/8/4K3 w - - x 1",                  # counters
+    "4k3/8/8/8/8/8/8/4K3 w - - -1 1",                 # negative halfmove clock
+    "4k3/8/8/8/8/8/8/4K3 w - - 0 0",                  # fullmove below 1
+    "QQQQQQQQ/QQQQQQQQ/QQQQQQQQ/QQQQQQQQ/QQQQQQQQ/8/k7/K7 w - - 0 1",   # 42 pieces
+    "8/8/8/8/8/8/8/4K3 w - - 0 1",                    # no black king
+    "4k3/8/8/8/8/8/8/3KK3 w - - 0 1",                 # two white kings
+])
+def test_invalid_fen_raises(text):
+    with pytest.raises(ValueError):
+        fen.parse_fen(text)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_castling_right_without_rook_is_dropped(backend):
+    board = create_board(backend).load_fen("4k3/8/8/8/8/8/8/4K3 w K - 0 1")
+    assert board.to_fen() == "4k3/8/8/8/8/8/8/4K3 w - - 0 1"
+    success, _ = Engine(board).play_turn(7, 4, 7, 6)
+    assert not success
+    assert board.board[7][5] == "--"
+
+
+def test_castling_rights_need_home_squares():
+    # white's queen-side rook and black's king-side rook are missing
+    _, _, has_moved, _, _, _ = fen.parse_fen("r3k3/8/8/8/8/8/8/1R2K2R w KQkq - 0 1")
+    assert fen.castle_rights(has_moved) == 1 | 8
+
+
+def test_unpack_rejects_bad_data():
+    with pytest.raises(ValueError):
+        fen.unpack(b"\x00" * (fen.PACKED_SIZE - 1))
+    with pytest.raises(ValueError):
+        # occupancy claims all 64 squares
+        fen.unpack(b"\xff" * 8 + b"\x11" * 16 + b"\x00" * 6)
+
+
+def packed(rows, flags=0, ep=0):
+    occupancy, nibbles = 0, []
+    for sq in range(64):
+        piece = rows[sq >> 3][sq & 7]
+        if piece != "--":
+            occupancy |= 1 << sq
+            nibbles.append(fen.PIECE_CODES[piece])
+    nibbles += [0] * (32 - len(nibbles))
+    pieces = bytes((nibbles[i] << 4) | nibbles[i + 1] for i in range(0, 32, 2))
+    return struct.pack(fen.PACKED_FORMAT, occupancy, pieces, flags, ep, 0, 1)
+
+
+def test_unpack_checks_placement():
+    rows = fen.parse_fen("4k3/8/8/8/8/8/8/4K3")[0]
+    rows[7][4] = "--"
+    with pytest.raises(ValueError):
+        create_board().load_packed(packed(rows))
+    rows[7][4] = rows[7][3] = "wK"
+    with pytest.raises(ValueError):
+        fen.unpack(packed(rows))
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_unpack_drops_castling_rights_off_home_squares(backend):
+    # king on d1 with KQkq claimed: only black's rights are real
+    rows = fen.parse_fen("r3k2r/8/8/8/8/8/8/R2K3R")[0]
+    board = create_board(backend).load_packed(packed(rows, flags=15 << 1))
+    assert board.to_fen() == "r3k2r/8/8/8/8/8/8/R2K3R w kq - 0 1"
+    assert (7, 6) not in Engine(board).legality.filter_move(7, 3)
+
+
+def test_unpack_rejects_bad_en_passant_file():
+    rows = fen.parse_fen("4k3/8/8/8/8/8/8/4K3")[0]
+    assert fen.unpack(packed(rows, ep=8))[3] == (2, 7)
+    with pytest.raises(ValueError):
+        fen.unpack(packed(rows, ep=9))
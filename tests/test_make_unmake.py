@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from src.engine import evaluation, zobrist
+from src.engine.chess_board import Chess_Board, create_board
+from src.engine.legality import Legality
+from src.engine.perft import POSITIONS, perft
+
+from conftest import BACKENDS
+
+FENS = [fen for _, fen, _, _ in POSITIONS]
+
+
+def random_walk(board, plies, seed):
+    """Play up to `plies` random legal moves, yielding after each one."""
+    rng = random.Random(seed)
+    legality = Legality(board)
+    for _ in range(plies):
+        moves = legality.get_all_legal_moves_with_promotions(board.color)
+        if not moves:
+            return
+        board.save_move(*rng.choice(moves))
+        yield board
+
+
+def state(board):
+    return (board.to_fen(), [row[:] for row in board.board], board.zobrist_key,
+            board.eval_mg, board.eval_eg, board.phase, {c: f[:] for c, f in board.pawn_files.items()})
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("fen", FENS)
+def test_make_unmake_round_trip(backend, fen):
+    board = create_board(backend).load_fen(fen)
+    before = state(board)
+    for seed in range(5):
+        for _ in random_walk(board, 40, seed):
+            pass
+        while board.history:
+            board.undo_move()
+        assert state(board) == before
+    assert board.to_fen() == fen
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("fen", FENS)
+def test_incremental_state_matches_recompute(backend, fen):
+    board = create_board(backend).load_fen(fen)
+    for seed in range(3):
+        for _ in random_walk(board, 60, seed):
+            assert board.zobrist_key == zobrist.compute_key(board)
+            fresh = create_board(backend).load_fen(board.to_fen())
+            assert (board.eval_mg, board.eval_eg, board.phase) == (fresh.eval_mg, fresh.eval_eg, fresh.phase)
+            assert board.pawn_files == fresh.pawn_files
+            assert evaluation.evaluate(board) == evaluation.evaluate(fresh)
+            if backend == "bitboard":
+                assert (board.pieces, board.occupancy, board.occupied) == (fresh.pieces, fresh.occupancy, fresh.occupied)
+        while board.history:
+            board.undo_move()
+            assert board.zobrist_key == zobrist.compute_key(board)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_debug_zobrist_perft(backend, monkeypatch):
+    # CHESS_DEBUG_ZOBRIST: every make/undo recomputes the key and raises on drift
+    monkeypatch.setattr(Chess_Board, "debug_zobrist", True)
+    for name, fen, _, _ in POSITIONS:
+        board = create_board(backend).load_fen(fen)
+        perft(board, Legality(board), 2)
+        assert board.to_fen() == fen, name
@@ -0,0 +1,36 @@
+import pytest
+
+from src.engine.chess_board import create_board
+from src.engine.legality import Legality
+from src.engine.perft import POSITIONS, divide, perft
+
+from conftest import BACKENDS
+
+#shallow node counts for the suite positions (same source as perft.POSITIONS)
+SHALLOW = {
+    "startpos": (20, 400, 8902),
+    "kiwipete": (48, 2039, 97862),
+    "endgame_ep": (14, 191, 2812),
+    "promotions": (6, 264, 9467),
+    "castling_checks": (44, 1486, 62379),
+    "middlegame": (46, 2079, 89890),
+}
+CASES = [(name, fen, depth + 1, nodes)
+         for name, fen, _, _ in POSITIONS for depth, nodes in enumerate(SHALLOW[name])]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("name, fen, depth, expected", CASES, ids=[f"{c[0]}-d{c[2]}" for c in CASES])
+def test_perft(backend, name, fen, depth, expected):
+    board = create_board(backend).load_fen(fen)
+    assert perft(board, Legality(board), depth) == expected
+    assert board.to_fen() == fen
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_divide_sums_to_perft(backend):
+    _, fen, _, _ = POSITIONS[1]
+    board = create_board(backend).load_fen(fen)
+    counts = divide(board, Legality(board), 2)
+    assert len(counts) == 48
+    assert sum(counts.values()) == 2039
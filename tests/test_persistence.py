@@ -0,0 +1,109 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from src.engine.chess_board import create_board
+from src.engine.engine import Engine
+from src.engine.notation import move_name
+from src.server import app as server
+from src.server.persistence import Sqlite_Repository, Write_Behind
+from src.server.sessions import Game_Store
+from src.server.workers import Engine_Pool
+
+
+def new_game():
+    board = create_board()
+    return board, Engine(board)
+
+
+def open_store(path, pool=None):
+    writer = Write_Behind(Sqlite_Repository(path), flush_interval=60)
+    writer.start()
+    return Game_Store(new_game, writer=writer, pool=pool)
+
+
+MOVES = ((6, 4, 4, 4, None), (1, 4, 3, 4, None), (7, 6, 5, 5, None))
+
+
+def test_store_restores_a_game_after_restart(tmp_path):
+    path = str(tmp_path / "games.sqlite3")
+
+    async def run():
+        pool = Engine_Pool("thread", workers=1)
+        store = open_store(path, pool)
+        session = store.create()
+        for move in MOVES:
+            assert session.engine.play_turn(*move)[0]
+            session.moves.append(move_name(move))
+            session.version += 1
+        store.save(session)
+        fen = session.board.to_fen()
+        await store.writer.close()
+
+        # a new process: nothing in memory, the game comes back from SQLite on first use
+        store = open_store(path, pool)
+        assert session.game_id not in store
+        first, second = await asyncio.gather(store.get(session.game_id), store.get(session.game_id))
+        assert first is second is not None
+        assert first.board.to_fen() == fen
+        assert first.moves == session.moves and first.version == 3
+        assert store.restored == 1
+        first.engine.undo()
+        assert first.board.to_fen() == "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e6 0 2"
+        assert await store.get("unknown") is None
+        assert await store.delete(session.game_id)
+        await store.writer.close()
+        pool.shutdown()
+
+    asyncio.run(run())
+
+
+def test_game_survives_server_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "GAME_STORE", f"sqlite:///{tmp_path / 'games.sqlite3'}")
+    with TestClient(server.app) as client:
+        game_id = client.post("/games").json()["game_id"]
+        for move in ({"from_row": 6, "from_col": 4, "to_row": 4, "to_col": 4},
+                     {"from_row": 1, "from_col": 2, "to_row": 3, "to_col": 2}):
+            assert client.post(f"/games/{game_id}/move", json=move).status_code == 200
+        before = client.get(f"/games/{game_id}/state").json()
+    # shutdown flushed the queued writes
+    with TestClient(server.app) as client:
+        assert game_id not in server.app.state.games
+        after = client.get(f"/games/{game_id}/state").json()
+        assert after["fen"] == before["fen"]
+        assert server.app.state.games.restored == 1
+        assert client.post(f"/games/{game_id}/undo").status_code == 200
+        assert client.get(f"/games/{game_id}/state").json()["fen"] == \
+            "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"
+
+
+def test_stale_copy_does_not_overwrite_restored_game(tmp_path):
+    path = str(tmp_path / "games.sqlite3")
+
+    async def run():
+        store = open_store(path)
+        store.max_games = 1
+        stale = store.create()
+        store.create()
+        assert stale.game_id not in store
+
+        # the next request restores a fresh copy and plays on it
+        live = await store.get(stale.game_id)
+        assert live is not stale
+        assert live.engine.play_turn(*MOVES[0])[0]
+        live.moves.append(move_name(MOVES[0]))
+        store.save(live)
+
+        # a request still holding the evicted copy finishes afterwards
+        assert stale.engine.play_turn(6, 3, 4, 3)[0]
+        stale.moves.append(move_name((6, 3, 4, 3)))
+        store.save(stale)
+        await store.writer.close()
+
+        store = open_store(path)
+        restored = await store.get(stale.game_id)
+        assert restored.moves == live.moves
+        assert restored.board.to_fen() == live.board.to_fen()
+        await store.writer.close()
+
+    asyncio.run(run())
@@ -0,0 +1,90 @@
+import pytest
+
+from src.engine.chess_board import create_board
+from src.engine.legality import Legality
+from src.engine.notation import move_san, parse_san
+from src.engine.pgn import read_games, replay_archive, replay_game, san_moves
+
+from conftest import BACKENDS
+
+ARCHIVE = """[Event "A"]
+[White "Tags only"]
+[Result "*"]
+
+[Event "B"]
+[White "Opening"]
+
+1. e4 e5 2. Nf3 {a comment
+[with a bracket at the start of a line} Nc6 (2... d6 3. d4) 3. Bb5 $1 a6 *
+
+[Event "C"]
+[White "Broken"]
+
+1. e4 e5 2. Ke3 *
+[Event "D"]
+[FEN "4k3/8/8/8/8/8/8/4K2R w K - 0 1"]
+
+1. O-O Kd7 2. Rd1+ 1-0
+"""
+
+
+def test_read_games_splits_on_tag_blocks():
+    games = list(read_games(ARCHIVE.splitlines(True)))
+    assert [tags["Event"] for _, tags, _ in games] == ["A", "B", "C", "D"]
+    assert [index for index, _, _ in games] == [0, 1, 2, 3]
+    assert games[0][1] == {"Event": "A", "White": "Tags only", "Result": "*"}
+    assert games[0][2] == ""
+
+
+def test_san_moves_skips_comments_variations_and_nags():
+    _, _, movetext = list(read_games(ARCHIVE.splitlines(True)))[1]
+    assert san_moves(movetext) == (["e4", "e5", "Nf3", "Nc6", "Bb5", "a6"], "*")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_bad_game_does_not_stop_the_batch(backend):
+    report = replay_archive(ARCHIVE.splitlines(True), backend=backend)
+    assert (report["games"], report["ok"], report["failed"]) == (4, 3, 1)
+    assert report["plies"] == 0 + 6 + 2 + 3
+    (error,) = report["errors"]
+    assert error["index"] == 2 and error["white"] == "Broken" and error["error"].startswith("ply 3:")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_replay_game_reaches_the_final_position(backend):
+    board = create_board(backend)
+    game = list(read_games(ARCHIVE.splitlines(True)))[3]
+    result = replay_game(board, Legality(board), game)
+    assert result["ok"] and result["result"] == "1-0"
+    assert result["fen"] == "8/3k4/8/8/8/8/8/3R2K1 b - - 3 2"
+
+
+#(FEN, SAN, move): each SAN must parse to the move and move_san must write it back
+SAN_CASES = [
+    ("4k3/8/8/8/8/8/4K3/R6R w - - 0 1", "Rad1", (7, 0, 7, 3, None)),          # file
+    ("4k3/R7/8/8/8/8/8/R3K3 w - - 0 1", "R1a4", (7, 0, 4, 0, None)),          # rank
+    ("8/8/8/7k/8/Q7/8/Q1Q1K3 w - - 0 1", "Qa1b2", (7, 0, 6, 1, None)),        # square
+    ("4k3/1P6/8/8/8/8/8/4K3 w - - 0 1", "b8=Q+", (1, 1, 0, 1, "Q")),
+    ("r3k3/1P6/8/8/8/8/8/4K3 w - - 0 1", "bxa8=N", (1, 1, 0, 0, "N")),
+    ("4k3/8/8/8/8/8/8/R3K2R w KQ - 0 1", "O-O", (7, 4, 7, 6, None)),
+    ("r3k2r/8/8/8/8/8/8/4K3 b kq - 0 1", "O-O-O", (0, 4, 0, 2, None)),
+    ("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1", "exd6", (3, 4, 2, 3, None)),
+    ("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1", "Ra8#", (7, 0, 0, 0, None)),
+]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("fen, san, move", SAN_CASES)
+def test_san_round_trip(backend, fen, san, move):
+    board = create_board(backend).load_fen(fen)
+    legality = Legality(board)
+    assert parse_san(board, legality, san) == move
+    assert move_san(board, legality, move) == san
+    assert board.to_fen() == fen
+
+
+@pytest.mark.parametrize("san", ["Rd1", "Kf4", "b8", "Nb8=Q", "Zz9"])
+def test_parse_san_rejects(san):
+    board = create_board().load_fen("4k3/1P6/8/8/8/8/4K3/R6R w - - 0 1")
+    with pytest.raises(ValueError):
+        parse_san(board, Legality(board), san)
@@ -0,0 +1,94 @@
+import pytest
+
+from src.engine.chess_board import create_board
+from src.engine.legality import Legality
+from src.engine.search import MATE_SCORE, Search, score_from_tt, score_to_tt
+from src.engine.transposition import (EXACT, LOWER, UPPER, Transposition_Table, decode_move,
+                                      encode_move)
+
+from conftest import BACKENDS
+
+KEY = 0x9D39247E33776D41
+
+
+@pytest.mark.parametrize("move", [
+    None, (0, 0, 0, 1, None), (6, 4, 4, 4, None), (7, 7, 0, 0, None),
+    (1, 0, 0, 0, "Q"), (1, 7, 0, 6, "R"), (6, 3, 7, 3, "B"), (6, 0, 7, 1, "N"),
+])
+def test_move_encoding_round_trip(move):
+    code = encode_move(move)
+    assert 0 <= code < 1 << 15
+    assert decode_move(code) == move
+
+
+@pytest.mark.parametrize("score", [0, 1, -1, 350, -2750, MATE_SCORE - 1, MATE_SCORE - 40,
+                                   -MATE_SCORE + 3, -(1 << 21)])
+@pytest.mark.parametrize("bound", [EXACT, LOWER, UPPER])
+def test_entry_round_trip(score, bound):
+    tt = Transposition_Table(1)
+    tt.store(KEY, 9, bound, score, (1, 4, 0, 4, "Q"))
+    assert tt.probe(KEY) == (9, bound, score, (1, 4, 0, 4, "Q"))
+    # same bucket, different position
+    assert tt.probe(KEY ^ 1 << 40) is None
+
+
+def test_depth_is_capped_and_best_move_kept():
+    tt = Transposition_Table(1)
+    tt.store(KEY, 300, LOWER, 12, (6, 4, 4, 4, None))
+    assert tt.probe(KEY) == (127, LOWER, 12, (6, 4, 4, 4, None))
+    # a later store without a move keeps the one already known
+    tt.store(KEY, 3, UPPER, -5)
+    assert tt.probe(KEY) == (3, UPPER, -5, (6, 4, 4, 4, None))
+
+
+def test_bucket_replacement():
+    tt = Transposition_Table(0)     # a single two-slot bucket
+    assert tt.entries == 2
+    deep, shallow, new = KEY, KEY + 2, KEY + 4
+    tt.store(deep, 8, EXACT, 1)
+    tt.store(shallow, 2, EXACT, 2)
+    tt.store(new, 5, EXACT, 3)
+    assert tt.probe(shallow) is None and tt.probe(deep) and tt.probe(new)
+    # entries from an older search go first, however deep
+    tt.new_search()
+    tt.store(shallow, 1, EXACT, 4)
+    assert tt.probe(shallow) == (1, EXACT, 4, None)
+    assert (tt.probe(deep) is None) != (tt.probe(new) is None)
+    assert tt.overwrites == 2
+
+
+@pytest.mark.parametrize("score", [0, 420, -420, MATE_SCORE - 3, -MATE_SCORE + 6])
+def test_mate_scores_are_stored_relative_to_the_node(score):
+    assert score_from_tt(score_to_tt(score, 5), 5) == score
+    if abs(score) > MATE_SCORE - 64:
+        # the same mate found 5 plies from the root is 5 plies nearer from the node
+        assert abs(score_to_tt(score, 5)) == abs(score) + 5
+
+
+def search(fen, depth, tt, backend="list"):
+    board = create_board(backend).load_fen(fen)
+    return Search(board, Legality(board), tt=tt).search(depth=depth)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_finds_mate_in_one(backend):
+    result = search("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1", 4, Transposition_Table(1), backend)
+    assert result["move"] == "a1a8"
+    assert result["score"] == MATE_SCORE - 1
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_quiescence_sees_the_recapture(backend):
+    # Qxd5 wins a pawn at depth 1 unless the search looks at exd5
+    result = search("4k3/8/4p3/3p4/8/8/8/3QK3 w - - 0 1", 1, Transposition_Table(1), backend)
+    assert result["move"] != "d1d5"
+    assert result["qnodes"] > 0
+
+
+@pytest.mark.parametrize("fen", [
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "4k3/8/8/8/8/8/4P3/4K3 w - - 0 1",
+])
+def test_table_size_does_not_change_the_score(fen):
+    assert search(fen, 4, Transposition_Table(16))["score"] == search(fen, 4, Transposition_Table(0))["score"]
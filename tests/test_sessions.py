@@ -0,0 +1,42 @@
+import asyncio
+
+from src.engine.chess_board import create_board
+from src.engine.engine import Engine
+from src.server.sessions import Game_Store
+
+
+def new_game():
+    board = create_board()
+    return board, Engine(board)
+
+
+def test_eviction_skips_games_mid_request():
+    async def run():
+        store = Game_Store(new_game, max_games=1)
+        a = store.create()
+        async with a.lock:
+            b = store.create()
+            # A is busy: over the cap until its request is done
+            assert a.game_id in store and b.game_id in store
+        store.update_size(b)
+        assert a.game_id not in store and len(store) == 1
+
+        # a change finishing on the evicted game must not count against the live ones
+        assert a.engine.play_turn(6, 4, 4, 4)[0]
+        store.update_size(a)
+        assert store.memory_bytes == sum(s.size_bytes for s in store.games.values())
+
+    asyncio.run(run())
+
+
+def test_expired_games_are_kept_while_locked():
+    async def run():
+        store = Game_Store(new_game, ttl_seconds=60)
+        a, b = store.create(), store.create()
+        a.last_access = b.last_access = 0
+        async with a.lock:
+            assert store.evict_expired() == 1
+        assert a.game_id in store and b.game_id not in store
+        assert store.evict_expired() == 1 and len(store) == 0
+
+    asyncio.run(run())
@@ -1,16 +1,19 @@
-import { useEffect, useState } from 'react'
-import { BoardState, PromotionPiece, getState, makeMove, undo, reset } from './api'
+import { useEffect, useRef, useState } from 'react'
+import { BoardState, GameMessage, GameSocket, MoveMap, PromotionPiece, applyDelta, getMoves, loadGame, makeMove, openGameSocket, undo, reset } from './api'
 import Board from './Board'
 
 export default function App() {
   const [state, setState] = useState<BoardState | null>(null)
   const [error, setError] = useState<string | null>(null)
   const [loading, setLoading] = useState(false)
+  const [moveMap, setMoveMap] = useState<MoveMap | null>(null)
+  // live channel for this game; the HTTP calls below are the fallback while it is down
+  const socket = useRef<GameSocket | null>(null)
 
   const load = async () => {
     setLoading(true)
     try {
-      const s = await getState()
+      const s = await loadGame()
       setState(s)
     } catch (e: any) {
       setError(e.message || 'Failed to load state')
@@ -23,12 +26,62 @@ export default function App() {
     load()
   }, [])
 
+  const gameId = state?.game_id
+  const version = state?.version
+  useEffect(() => {
+    if (!gameId || version === undefined) return
+    let current = true
+    getMoves(gameId)
+      .then((m) => { if (current) setMoveMap(m) })
+      .catch(() => { if (current) setMoveMap(null) })
+    return () => { current = false }
+  }, [gameId, version])
+
+  useEffect(() => {
+    if (!gameId) return
+    const onMessage = (msg: GameMessage) => {
+      if (msg.type === 'error') {
+        setError(msg.error)
+        return
+      }
+      if (msg.type === 'snapshot') {
+        const { type, ...snapshot } = msg
+        setState(snapshot)
+        return
+      }
+      setState((prev: BoardState | null) => {
+        if (!prev) return prev
+        const next = applyDelta(prev, msg)
+        // missed a delta: ask for a full snapshot and keep the current board until it arrives
+        if (!next) socket.current?.resync()
+        return next || prev
+      })
+      setError(null)
+    }
+    const ws = openGameSocket(gameId, onMessage, (code) => {
+      if (socket.current === ws) socket.current = null
+      // the server dropped the game; start a fresh one
+      if (code === 4404) load()
+    })
+    socket.current = ws
+    return () => {
+      socket.current = null
+      ws.close()
+    }
+  }, [gameId])
+
   const onMove = async (from: [number, number], to: [number, number], promotion?: PromotionPiece) => {
+    if (!state) return
+    if (socket.current?.isOpen()) {
+      socket.current.move(from[0], from[1], to[0], to[1], promotion)
+      return
+    }
     try {
-      const res = await makeMove(from[0], from[1], to[0], to[1], promotion)
+      const res = await makeMove(state.game_id, from[0], from[1], to[0], to[1], promotion)
       // Update the state with the complete response from the server
       setState((prev: BoardState | null) => (prev ? { 
         ...prev, 
+        version: res.version,
         board: res.board, 
         turn: res.turn, 
         history_len: prev.history_len + 1,
@@ -41,8 +94,13 @@ export default function App() {
   }
 
   const onUndo = async () => {
+    if (!state) return
+    if (socket.current?.isOpen()) {
+      socket.current.undo()
+      return
+    }
     try {
-      const newState = await undo();
+      const newState = await undo(state.game_id);
       setState(newState);
       setError(null);
     } catch (e: any) {
@@ -51,8 +109,13 @@ export default function App() {
   }
 
   const onReset = async () => {
+    if (!state) return
+    if (socket.current?.isOpen()) {
+      socket.current.reset()
+      return
+    }
     try {
-      const newState = await reset();
+      const newState = await reset(state.game_id);
       setState(newState);
       setError(null);
     } catch (e: any) {
@@ -85,7 +148,13 @@ export default function App() {
       ) : (
         <>
           <div className="status">Turn: {state.turn === 'w' ? 'White' : 'Black'}</div>
-          <Board board={state.board} turn={state.turn} onMove={onMove} />
+          <Board
+            gameId={state.game_id}
+            board={state.board}
+            turn={state.turn}
+            moveMap={moveMap && moveMap.version === state.version ? moveMap : null}
+            onMove={onMove}
+          />
         </>
       )}
       
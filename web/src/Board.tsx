@@ -1,15 +1,18 @@
 import { useEffect, useMemo, useState } from 'react'
-import { API_BASE, getLegal, PromotionPiece } from './api'
+import { API_BASE, MoveMap, getLegal, PromotionPiece, squareName } from './api'
 
 type Props = {
+  gameId: string
   board: string[][]
   turn: 'w' | 'b'
+  // legal moves for this position, when loaded; otherwise targets are fetched per click
+  moveMap: MoveMap | null
   onMove: (from: [number, number], to: [number, number], promotion?: PromotionPiece) => Promise<void> | void
 }
 
 const pieceImg = (code: string) => `${API_BASE}/assets/${code}.png`
 
-export default function Board({ board, turn, onMove }: Props) {
+export default function Board({ gameId, board, turn, moveMap, onMove }: Props) {
   const [selected, setSelected] = useState<[number, number] | null>(null)
   const [legal, setLegal] = useState<[number, number][]>([])
 
@@ -19,6 +22,13 @@ export default function Board({ board, turn, onMove }: Props) {
     setLegal([])
   }, [turn])
 
+  const targetsFrom = async (row: number, col: number): Promise<[number, number][]> => {
+    if (moveMap) {
+      return (moveMap.moves[squareName(row, col)]?.targets || []).map((t) => t.to)
+    }
+    return getLegal(gameId, row, col)
+  }
+
   const onSquareClick = async (row: number, col: number) => {
     const code = board[row][col]
     if (selected) {
@@ -43,7 +53,7 @@ export default function Board({ board, turn, onMove }: Props) {
       // if clicked another own piece, update selection
       if (code !== '--' && code[0] === turn) {
         setSelected([row, col])
-        const moves = await getLegal(row, col)
+        const moves = await targetsFrom(row, col)
         setLegal(moves)
         return
       }
@@ -55,7 +65,7 @@ export default function Board({ board, turn, onMove }: Props) {
     // no selection yet
     if (code !== '--' && code[0] === turn) {
       setSelected([row, col])
-      const moves = await getLegal(row, col)
+      const moves = await targetsFrom(row, col)
       setLegal(moves)
     }
   }
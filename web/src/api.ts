@@ -1,10 +1,13 @@
 export const API_BASE = import.meta.env.VITE_API_BASE||'http://localhost:8000';
 
 export type BoardState = {
+  game_id: string;
+  version: number;
   board: string[][];
   turn: 'w'|'b';
   history_len: number;
   has_moved: Record<string, number>;
+  fen: string;
   game_status: {status:'in_progress'|'checkmate'|'stalemate'; winner:'w'|'b'|null};
 };
 
@@ -26,13 +29,35 @@ const j = async (res:Response) => {
   return res.json();
 };
 
-export async function getState():Promise<BoardState>{
-  const res = await fetch(`${API_BASE}/state`, {method:'GET', cache:'no-store'});
+const GAME_KEY = 'chess_game_id';
+
+export const savedGameId = ():string|null => localStorage.getItem(GAME_KEY);
+
+export async function createGame():Promise<BoardState>{
+  const res = await fetch(`${API_BASE}/games`, {method:'POST', cache:'no-store'});
+  const state:BoardState = await j(res);
+  localStorage.setItem(GAME_KEY, state.game_id);
+  return state;
+}
+
+// Resume the game saved in this browser, or start a new one if the server no longer has it
+export async function loadGame():Promise<BoardState>{
+  const id = savedGameId();
+  if(id){
+    const res = await fetch(`${API_BASE}/games/${id}/state`, {method:'GET', cache:'no-store'});
+    if(res.ok){return res.json();}
+    if(res.status!==404){throw new Error(await parseErr(res));}
+  }
+  return createGame();
+}
+
+export async function getState(gameId:string):Promise<BoardState>{
+  const res = await fetch(`${API_BASE}/games/${gameId}/state`, {method:'GET', cache:'no-store'});
   return j(res);
 }
 
-export async function getLegal(row:number, col:number):Promise<[number, number][]>{
-  const res = await fetch(`${API_BASE}/legal`, {
+export async function getLegal(gameId:string, row:number, col:number):Promise<[number, number][]>{
+  const res = await fetch(`${API_BASE}/games/${gameId}/legal`, {
     method:'POST',
     headers:{'Content-Type':'application/json'},
     cache:'no-store',
@@ -43,8 +68,30 @@ export async function getLegal(row:number, col:number):Promise<[number, number][
   return data.legal_moves||data.moves||[];
 }
 
-export async function makeMove(from_row:number, from_col:number, to_row:number, to_col:number, promotion?:PromotionPiece){
-  const res = await fetch(`${API_BASE}/move`, {
+export type MoveTarget = {
+  to: [number, number];
+  square: string;
+  flags: ('capture'|'en_passant'|'castle'|'double_push'|'promotion')[];
+  promotions?: PromotionPiece[];
+};
+
+export type MoveMap = {
+  version: number;
+  turn: 'w'|'b';
+  // keyed by origin square name, e.g. "e2"
+  moves: Record<string, {from: [number, number]; targets: MoveTarget[]}>;
+};
+
+export const squareName = (row:number, col:number) => `${'abcdefgh'[col]}${8-row}`;
+
+// All legal moves for the side to move in one request; fetch once per ply
+export async function getMoves(gameId:string):Promise<MoveMap>{
+  const res = await fetch(`${API_BASE}/games/${gameId}/moves`, {method:'GET', cache:'no-store'});
+  return j(res);
+}
+
+export async function makeMove(gameId:string, from_row:number, from_col:number, to_row:number, to_col:number, promotion?:PromotionPiece){
+  const res = await fetch(`${API_BASE}/games/${gameId}/move`, {
     method:'POST',
     headers:{'Content-Type':'application/json'},
     cache:'no-store',
@@ -53,12 +100,61 @@ export async function makeMove(from_row:number, from_col:number, to_row:number,
   return j(res);
 }
 
-export async function undo():Promise<BoardState>{
-  const res = await fetch(`${API_BASE}/undo`, {method:'POST', cache:'no-store'});
+export async function undo(gameId:string):Promise<BoardState>{
+  const res = await fetch(`${API_BASE}/games/${gameId}/undo`, {method:'POST', cache:'no-store'});
   return j(res);
 }
 
-export async function reset():Promise<BoardState>{
-  const res = await fetch(`${API_BASE}/reset`, {method:'POST', cache:'no-store'});
+export async function reset(gameId:string):Promise<BoardState>{
+  const res = await fetch(`${API_BASE}/games/${gameId}/reset`, {method:'POST', cache:'no-store'});
   return j(res);
 }
+
+// ----- WebSocket game channel -----
+
+export type GameDelta = {
+  type: 'delta';
+  version: number;
+  changes: [number, number, string][];
+  turn: 'w'|'b';
+  history_len: number;
+  game_status: BoardState['game_status'];
+};
+
+export type GameMessage =
+  | ({type:'snapshot'} & BoardState)
+  | GameDelta
+  | {type:'error'; error:string; code:string};
+
+export type GameSocket = {
+  isOpen: () => boolean;
+  move: (from_row:number, from_col:number, to_row:number, to_col:number, promotion?:PromotionPiece) => void;
+  undo: () => void;
+  reset: () => void;
+  resync: () => void;
+  close: () => void;
+};
+
+export function openGameSocket(gameId:string, onMessage:(msg:GameMessage)=>void, onClose?:(code:number)=>void):GameSocket{
+  const ws = new WebSocket(`${API_BASE.replace(/^http/, 'ws')}/games/${gameId}/ws`);
+  const send = (msg:object) => { if(ws.readyState===WebSocket.OPEN){ws.send(JSON.stringify(msg));} };
+  ws.onmessage = (ev) => onMessage(JSON.parse(ev.data));
+  ws.onclose = (ev) => onClose?.(ev.code);
+  return {
+    isOpen: () => ws.readyState===WebSocket.OPEN,
+    move: (from_row, from_col, to_row, to_col, promotion) => send({type:'move', from_row, from_col, to_row, to_col, promotion}),
+    undo: () => send({type:'undo'}),
+    reset: () => send({type:'reset'}),
+    resync: () => send({type:'resync'}),
+    close: () => ws.close(),
+  };
+}
+
+// Apply a delta in order; returns null when versions skipped and a resync is needed
+export function applyDelta(state:BoardState, delta:GameDelta):BoardState|null{
+  if(delta.version<=state.version){return state;}
+  if(delta.version!==state.version+1){return null;}
+  const board = state.board.map(row => row.slice());
+  for(const [r, c, piece] of delta.changes){board[r][c] = piece;}
+  return {...state, version:delta.version, board, turn:delta.turn, history_len:delta.history_len, game_status:delta.game_status};
+}